@@ -1,71 +1,222 @@
 # analyze_logs.py
+"""
+Group drowsy alerts into episodes and write data/logs/episodes.csv.
+
+Runs incrementally by default: the byte offset reached in the event log and
+the still-open episode are kept in ``STATE_FILE``, so each run only streams
+the lines appended since the previous one and appends newly closed episodes
+to the CSV. Use ``--full`` to rebuild everything from scratch (also done
+automatically when the log was truncated or rotated). Like the dashboard's
+``EventTail``, rotation is detected from the file's inode. A hash of the
+bytes already read also catches a file replaced in place (copytruncate, or
+an inode reused), even when the new file is already longer than the saved
+offset.
+
+Logs are append-only and written in time order, so alerts are merged as
+they stream in rather than sorted.
+"""
+import argparse
+import hashlib
+import json
 import os
 import re
+import time
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
+
+from log_module import columnar_store
+from log_module.event_sink import DROWSINESS_DETECTED
 
-LOG_FILE = "data/logs/alerts.log"
+EVENTS_FILE = "data/logs/events.jsonl"
+LOG_FILE = "data/logs/alerts.log"   # legacy "<ts> | <state>" text log
 OUT_FILE = "data/logs/episodes.csv"
+STATE_FILE = "data/logs/.analyze_state.json"
 
 # Max gap (in seconds) between consecutive drowsy alerts to still be the same episode
 EPISODE_GAP_SECONDS = 5
 
-if not os.path.exists(LOG_FILE):
-    print("⚠️ No alerts.log found. Run the drowsiness detector first.")
-    raise SystemExit
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+COLUMNS = ["start", "end", "duration_sec"]
+HEAD_BYTES = 4096   # already-read prefix hashed to recognise the same file
 
 pattern = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\s*\|\s*(.+)$")
 
-rows = []
-with open(LOG_FILE, "r", encoding="utf-8") as f:
-    for line in f:
-        line = line.strip()
-        m = pattern.match(line)
-        if not m:
-            continue
-        ts_str, state = m.groups()
-        if state.strip() != "Drowsiness detected":
-            continue
-        try:
-            ts = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-            rows.append(ts)
-        except ValueError:
-            # Skip anything that isn't a full timestamp
+# ----------------------------
+# Line parsers: return the drowsy alert time (epoch seconds) or None
+# ----------------------------
+def parse_event_line(line):
+    """Structured events.jsonl line."""
+    try:
+        e = json.loads(line)
+    except ValueError:
+        return None
+    if e.get("type") != DROWSINESS_DETECTED or e.get("ts") is None:
+        return None
+    return float(e["ts"])
+
+def parse_legacy_line(line):
+    """Old regex-parsed alerts.log line."""
+    m = pattern.match(line.strip())
+    if not m:
+        return None
+    ts_str, state = m.groups()
+    if state.strip() != "Drowsiness detected":
+        return None
+    try:
+        return datetime.strptime(ts_str, TIME_FMT).timestamp()
+    except ValueError:
+        # Skip anything that isn't a full timestamp
+        return None
+
+# ----------------------------
+# Streaming
+# ----------------------------
+def iter_new_lines(path, offset):
+    """
+    Yield ``(line, end_offset)`` for complete lines after byte ``offset``.
+    A trailing line without a newline (still being written) is left for
+    the next run.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                return
+            offset += len(raw)
+            yield raw.decode("utf-8", errors="replace"), offset
+
+def iter_episodes(times, open_ep, gap=EPISODE_GAP_SECONDS):
+    """
+    Merge a stream of alert times into episodes using the gap rule.
+
+    ``open_ep`` is a one-element holder ``[[start, end] or None]`` carrying
+    the episode left open by the last run. Yields closed ``(start, end)``
+    episodes; the still-open one is left in ``open_ep[0]``.
+    """
+    for ts in times:
+        if open_ep[0] is not None and ts - open_ep[0][1] <= gap:
+            # same episode, extend
+            open_ep[0][1] = max(open_ep[0][1], ts)
             continue
+        if open_ep[0] is not None:
+            # close previous episode
+            yield tuple(open_ep[0])
+        # start new
+        open_ep[0] = [ts, ts]
+
+def episode_row(start, end):
+    return {
+        "start": datetime.fromtimestamp(start).strftime(TIME_FMT),
+        "end": datetime.fromtimestamp(end).strftime(TIME_FMT),
+        "duration_sec": max(1.0, end - start),
+    }
 
-if not rows:
-    print("✅ No drowsy alerts found in alerts.log (nothing to group).")
-    # Write an empty CSV with headers so downstream scripts don't crash
-    pd.DataFrame(columns=["start","end","duration_sec"]).to_csv(OUT_FILE, index=False)
-    raise SystemExit
-
-rows.sort()
-episodes = []
-start = rows[0]
-end = rows[0]
-
-for ts in rows[1:]:
-    if (ts - end).total_seconds() <= EPISODE_GAP_SECONDS:
-        # same episode, extend
-        end = ts
+# ----------------------------
+# State
+# ----------------------------
+def file_identity(path, offset):
+    """Inode plus a hash of the first ``min(offset, HEAD_BYTES)`` bytes (already read)."""
+    st = os.stat(path)
+    n = min(offset, HEAD_BYTES)
+    with open(path, "rb") as f:
+        head = f.read(n)
+    return {"inode": st.st_ino, "head_len": len(head),
+            "head_sha1": hashlib.sha1(head).hexdigest()}
+
+def load_state(source):
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("source") != source:
+        return None
+    try:
+        if os.path.getsize(source) < state.get("offset", 0):
+            # log truncated / rotated → rebuild
+            return None
+        if "inode" in state:
+            ident = file_identity(source, state["head_len"])
+            if ident["inode"] != state["inode"] or ident["head_sha1"] != state["head_sha1"]:
+                # A different file under the same name (rotated / replaced) → rebuild
+                return None
+    except OSError:
+        return None
+    return state
+
+def save_state(state):
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, STATE_FILE)
+
+# ----------------------------
+# Main
+# ----------------------------
+def analyze(full=False, now=None, use_store=True, vehicle=columnar_store.DEFAULT_VEHICLE):
+    if os.path.exists(EVENTS_FILE):
+        source, parse = EVENTS_FILE, parse_event_line
+    elif os.path.exists(LOG_FILE):
+        source, parse = LOG_FILE, parse_legacy_line
     else:
-        # close previous episode
-        duration = max(1.0, (end - start).total_seconds())
-        episodes.append({"start": start, "end": end, "duration_sec": duration})
-        # start new
-        start = ts
-        end = ts
+        print("⚠️ No events.jsonl or alerts.log found. Run the drowsiness detector first.")
+        return None
+
+    state = None if full else load_state(source)
+    if state is None or not os.path.exists(OUT_FILE):
+        state = {"source": source, "offset": 0, "open_episode": None}
+        # Write an empty CSV with headers so downstream scripts don't crash
+        os.makedirs(os.path.dirname(OUT_FILE), exist_ok=True)
+        pd.DataFrame(columns=COLUMNS).to_csv(OUT_FILE, index=False)
+        if use_store and columnar_store._ARROW_OK:
+            # Rebuilding from offset 0: don't double-append this vehicle's episodes
+            columnar_store.ColumnarStore().drop_vehicle("episodes", vehicle)
 
-# append final episode
-duration = max(1.0, (end - start).total_seconds())
-episodes.append({"start": start, "end": end, "duration_sec": duration})
+    offset = state["offset"]
 
-episodes_df = pd.DataFrame(episodes)
-episodes_df["start"] = episodes_df["start"].dt.strftime("%Y-%m-%d %H:%M:%S")
-episodes_df["end"] = episodes_df["end"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    def alert_times():
+        nonlocal offset
+        for line, offset in iter_new_lines(source, state["offset"]):
+            ts = parse(line)
+            if ts is not None:
+                yield ts
 
-os.makedirs(os.path.dirname(OUT_FILE), exist_ok=True)
-episodes_df.to_csv(OUT_FILE, index=False)
+    open_ep = [state["open_episode"]]
+    closed = [episode_row(s, e) for s, e in iter_episodes(alert_times(), open_ep)]
+
+    # An open episode can't be extended once the gap has passed in real time
+    now = time.time() if now is None else now
+    if open_ep[0] is not None and now - open_ep[0][1] > EPISODE_GAP_SECONDS:
+        closed.append(episode_row(*open_ep[0]))
+        open_ep[0] = None
+
+    if closed:
+        closed_df = pd.DataFrame(closed, columns=COLUMNS)
+        closed_df.to_csv(OUT_FILE, mode="a", header=False, index=False)
+        if use_store and columnar_store._ARROW_OK:
+            # Typed, date/vehicle-partitioned copy for fleet queries
+            columnar_store.ColumnarStore().append_episodes(closed_df, vehicle=vehicle)
+
+    save_state({"source": source, "offset": offset, "open_episode": open_ep[0],
+                **file_identity(source, offset)})
+
+    new_bytes = offset - state["offset"]
+    if closed:
+        print(f"✅ {len(closed)} new episode(s) appended to {OUT_FILE} ({new_bytes} new bytes read)")
+        print(pd.DataFrame(closed, columns=COLUMNS).head())
+    else:
+        print(f"✅ No new closed episodes ({new_bytes} new bytes read).")
+    if open_ep[0] is not None:
+        print("⏳ One episode still open; it will be written on a later run.")
+    return closed
 
-print(f"✅ Episodes saved to {OUT_FILE}")
-print(episodes_df.head())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Group drowsy alerts into episodes")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore saved state and rebuild episodes.csv from the whole log")
+    parser.add_argument("--no-store", action="store_true",
+                        help="don't append episodes to the columnar store")
+    parser.add_argument("--vehicle", default=columnar_store.DEFAULT_VEHICLE,
+                        help="vehicle partition for the columnar store")
+    args = parser.parse_args()
+    analyze(full=args.full, use_store=not args.no_store, vehicle=args.vehicle)
@@ -0,0 +1,182 @@
+# audio_module/alert_engine.py
+"""
+Non-blocking alert audio.
+
+Tones are rendered once into float32 buffers when the service starts and are
+played by a background worker, so ``play()`` returns immediately and never
+stalls the vision loop. Repeated triggers of a tone that is already queued,
+playing, or played within ``coalesce_secs`` are merged into one.
+
+Output goes through a sink: sounddevice, winsound (Windows), or the in-memory
+``NullSink`` used for headless runs and tests.
+"""
+import queue
+import threading
+from time import monotonic
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+
+# name -> (frequency Hz, duration s, volume 0..1)
+TONES = {
+    "beep":  (880, 0.45, 0.4),   # drowsiness detector alert
+    "alert": (440, 0.20, 0.5),   # driver_safety / audio_capture alert
+    "chime": (1000, 0.50, 0.4),  # legacy winsound beep
+}
+
+# ----------------------------
+# Tone rendering
+# ----------------------------
+class Tone:
+    def __init__(self, name, freq, duration, volume, fs=SAMPLE_RATE):
+        self.name = name
+        self.freq = freq
+        self.duration = duration
+        self.fs = fs
+        t = np.arange(int(fs * duration), dtype=np.float32) / fs
+        samples = volume * np.sin(2 * np.pi * freq * t)
+        # 5 ms fade in/out avoids clicks at the buffer edges
+        ramp = min(len(samples) // 2, int(fs * 0.005))
+        if ramp:
+            fade = np.linspace(0.0, 1.0, ramp, dtype=np.float32)
+            samples[:ramp] *= fade
+            samples[-ramp:] *= fade[::-1]
+        self.samples = samples.astype(np.float32)
+
+
+def render_tones(spec=None, fs=SAMPLE_RATE):
+    spec = TONES if spec is None else spec
+    return {name: Tone(name, f, d, v, fs) for name, (f, d, v) in spec.items()}
+
+# ----------------------------
+# Sinks
+# ----------------------------
+class NullSink:
+    """Records plays in memory instead of producing sound."""
+
+    def __init__(self):
+        self.played = []
+
+    def play(self, tone):
+        self.played.append((monotonic(), tone.name))
+
+
+class SoundDeviceSink:
+    def __init__(self):
+        import sounddevice as sd
+        self._sd = sd
+
+    def play(self, tone):
+        self._sd.play(tone.samples, tone.fs)
+        self._sd.wait()
+
+
+class WinsoundSink:
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+
+    def play(self, tone):
+        self._winsound.Beep(int(tone.freq), int(tone.duration * 1000))
+
+
+def default_sink():
+    """First working sink: sounddevice, then winsound, else NullSink."""
+    for cls in (SoundDeviceSink, WinsoundSink):
+        try:
+            return cls()
+        except Exception:
+            continue
+    return NullSink()
+
+# ----------------------------
+# Service
+# ----------------------------
+class AlertAudioService:
+    """
+    Background tone player.
+
+    play(name) enqueues and returns at once; a trigger is coalesced (dropped)
+    when the same tone is already pending/playing or started less than
+    ``coalesce_secs`` ago.
+    """
+
+    def __init__(self, sink=None, tones=None, coalesce_secs=1.0):
+        self.sink = sink if sink is not None else default_sink()
+        self.tones = tones if tones is not None else render_tones()
+        self.coalesce_secs = coalesce_secs
+        self.played = 0
+        self.coalesced = 0
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._busy = set()        # tones queued or playing
+        self._last_start = {}     # tone name -> monotonic start time
+        self._worker = threading.Thread(target=self._run, name="alert-audio", daemon=True)
+        self._worker.start()
+
+    def play(self, name="beep"):
+        """Request a tone without blocking. Returns True if it was queued."""
+        if name not in self.tones:
+            raise KeyError(f"unknown alert tone: {name!r}")
+        now = monotonic()
+        with self._lock:
+            last = self._last_start.get(name)
+            if name in self._busy or (last is not None and now - last < self.coalesce_secs):
+                self.coalesced += 1
+                return False
+            self._busy.add(name)
+        self._q.put(name)
+        return True
+
+    def _run(self):
+        while True:
+            name = self._q.get()
+            if name is None:
+                break
+            with self._lock:
+                self._last_start[name] = monotonic()
+            try:
+                self.sink.play(self.tones[name])
+                self.played += 1
+            except Exception:
+                # Don’t crash if audio device is unavailable
+                pass
+            finally:
+                with self._lock:
+                    self._busy.discard(name)
+                self._q.task_done()
+
+    def wait_idle(self):
+        """Block until every queued tone has played (tests / shutdown)."""
+        self._q.join()
+
+    def close(self):
+        self._q.put(None)
+        self._worker.join(timeout=2.0)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_alert_service():
+    """Process-wide service, created on first use with the default sink."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AlertAudioService()
+        return _service
+
+
+def set_alert_service(service):
+    """Install a service (e.g. ``AlertAudioService(NullSink())`` when headless)."""
+    global _service
+    with _service_lock:
+        _service = service
+    return service
+
+
+def play_alert_tone(name="beep"):
+    """Fire-and-forget helper used by the detectors."""
+    return get_alert_service().play(name)
@@ -1,6 +1,5 @@
-import winsound
+from audio_module.alert_engine import play_alert_tone
 
 def play_beep():
-    frequency = 1000  # Hz
-    duration = 500    # ms
-    winsound.Beep(frequency, duration)
+    # 1000 Hz / 500 ms beep, played off-thread (was blocking winsound.Beep)
+    play_alert_tone("chime")
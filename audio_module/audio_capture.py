@@ -1,9 +1,5 @@
-import sounddevice as sd
-import numpy as np
+from audio_module.alert_engine import play_alert_tone
 
 def play_alert():
-    fs = 44100
-    t = np.linspace(0, 0.2, int(fs*0.2), endpoint=False)
-    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
-    sd.play(tone, fs)
-    sd.wait()
+    # 440 Hz / 0.2 s tone, played off-thread (was sd.play + sd.wait)
+    play_alert_tone("alert")
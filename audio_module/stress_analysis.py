@@ -1,7 +1,412 @@
 # audio_module/stress_analysis.py
-def analyze_stress(audio_data):
+"""
+Streaming voice stress analysis.
+
+Audio flows from a source into a ``RingBuffer`` and is analysed on a worker
+thread that runs alongside the vision loop. Nothing touches disk.
+
+Sources:
+    MicSource   sounddevice InputStream callback (PortAudio)
+    WavSource   16-bit PCM WAV file, played in real time or as fast as possible
+
+Every ``1 / rate_hz`` seconds ``StressAnalyzer`` takes the last
+``window_secs`` of audio and computes frame-level features. Frames are
+``FRAME_SECS`` long with 50% overlap, and all frames are processed in one
+batch of NumPy FFTs:
+
+    rms        frame energy
+    zcr        zero-crossing rate
+    centroid   spectral centroid (Hz)
+    pitch      autocorrelation pitch (Hz, via the power spectrum), 0 if unvoiced
+
+It then maps them to a 0..1 stress score. The score measures how far
+energy, pitch, pitch variability and centroid sit above the speaker's own
+running baseline. Silence leaves the score unchanged.
+
+    python -m audio_module.stress_analysis data/test_record.wav
+    python -m audio_module.stress_analysis --mic
+"""
+import math
+import threading
+import time
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SECS = 0.032          # 512 samples @ 16 kHz
+WINDOW_SECS = 1.0           # audio per score
+RATE_HZ = 2.0               # scores per second
+RING_SECS = 5.0
+
+PITCH_MIN_HZ = 75.0
+PITCH_MAX_HZ = 400.0
+VOICED_CORR = 0.35          # normalized autocorrelation peak for a voiced frame
+SILENCE_RMS = 0.01          # windows quieter than this are not scored
+
+BASELINE_ALPHA = 0.02       # speaker baseline adaptation per score
+# z-score weights (feature above the baseline -> more stress)
+STRESS_WEIGHTS = {"rms": 0.3, "pitch": 0.35, "pitch_std": 0.2, "centroid": 0.15}
+STRESS_LEVELS = ((0.7, "high stress"), (0.4, "medium stress"), (0.0, "low stress"))
+
+
+# ----------------------------
+# Ring buffer
+# ----------------------------
+class RingBuffer:
     """
-    Dummy stress analysis based on audio
+    Single-producer / single-consumer float32 ring without locks.
+
+    The producer (audio callback) only writes ``_w`` and the consumer only
+    reads it, so plain int stores are enough under the GIL. Readers always
+    get the *latest* ``n`` samples; if the producer laps the consumer, old
+    audio is simply overwritten.
     """
-    # Placeholder: always return "low stress"
-    return "low stress"
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self._w = 0                    # total samples ever written
+
+    def write(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = len(samples)
+        if n >= self.capacity:
+            samples, n = samples[-self.capacity:], self.capacity
+        start = self._w % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        self._buf[:n - first] = samples[first:]
+        self._w += n                   # publish after the copy
+
+    @property
+    def written(self):
+        return self._w
+
+    def latest(self, n):
+        """Copy of the newest ``min(n, available)`` samples."""
+        w = self._w
+        n = min(int(n), w, self.capacity)
+        start = (w - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._buf[start:start + n].copy()
+        return np.concatenate([self._buf[start:], self._buf[:n - (self.capacity - start)]])
+
+
+# ----------------------------
+# Sources
+# ----------------------------
+class MicSource:
+    """Microphone via a sounddevice callback; needs PortAudio."""
+
+    def __init__(self, samplerate=SAMPLE_RATE, blocksize=512, device=None):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.device = device
+        self._stream = None
+
+    def start(self, ring):
+        import sounddevice as sd    # lazy: PortAudio is optional
+
+        def callback(indata, frames, t, status):
+            ring.write(indata[:, 0])
+
+        self._stream = sd.InputStream(samplerate=self.samplerate, blocksize=self.blocksize,
+                                      channels=1, dtype="float32", device=self.device,
+                                      callback=callback)
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    @property
+    def finished(self):
+        return False
+
+
+def read_wav(path):
+    """(mono float32 samples in [-1, 1], sample rate) from a 16-bit PCM WAV."""
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV is supported")
+        sr, ch = w.getframerate(), w.getnchannels()
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+    x = data.reshape(-1, ch).mean(axis=1) / 32768.0
+    return x.astype(np.float32), sr
+
+
+class WavSource:
+    """
+    WAV file as a stream: ``realtime=True`` feeds blocks at the file's pace
+    (like a microphone). ``realtime=False`` writes blocks without waiting.
+    The ring has no backpressure (it keeps the newest audio), so the
+    analyzer then sees little more than the end of the file. Use
+    ``analyze_file`` to score every window offline.
+    """
+
+    def __init__(self, path, blocksize=512, realtime=True, loop=False):
+        self.samples, self.samplerate = read_wav(path)
+        self.blocksize = blocksize
+        self.realtime = realtime
+        self.loop = loop
+        self._stop = threading.Event()
+        self._thread = None
+        self._done = False
+
+    def start(self, ring):
+        self._thread = threading.Thread(target=self._feed, args=(ring,), name="wav-source",
+                                        daemon=True)
+        self._thread.start()
+
+    def _feed(self, ring):
+        period = self.blocksize / self.samplerate
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            for i in range(0, len(self.samples), self.blocksize):
+                if self._stop.is_set():
+                    break
+                ring.write(self.samples[i:i + self.blocksize])
+                if self.realtime:
+                    next_t += period
+                    delay = next_t - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+            if not self.loop:
+                break
+        self._done = True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    @property
+    def finished(self):
+        return self._done
+
+
+# ----------------------------
+# Features
+# ----------------------------
+def frame_features(x, sr, frame_secs=FRAME_SECS):
+    """
+    Per-frame features for a mono signal, all frames in one FFT batch.
+
+    Returns a dict of (frames,) arrays: rms, zcr, centroid (Hz), pitch
+    (Hz, 0 when unvoiced).
+    """
+    n = int(sr * frame_secs)
+    hop = n // 2
+    x = np.asarray(x, dtype=np.float32)
+    if len(x) < n:
+        x = np.pad(x, (0, n - len(x)))
+    frames = np.lib.stride_tricks.sliding_window_view(x, n)[::hop]     # (F, n) view
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (n - 1)
+
+    windowed = (frames - frames.mean(axis=1, keepdims=True)) * np.hanning(n).astype(np.float32)
+    nfft = 2 * n                                       # zero-pad: linear autocorrelation
+    spec = np.fft.rfft(windowed, nfft, axis=1)
+    mag = np.abs(spec[:, :n // 2 + 1])
+    freqs = np.fft.rfftfreq(nfft, 1.0 / sr)[:n // 2 + 1]
+    centroid = (mag * freqs).sum(axis=1) / np.maximum(mag.sum(axis=1), 1e-12)
+
+    # Wiener-Khinchin: autocorrelation = IFFT(|X|^2)
+    ac = np.fft.irfft(np.abs(spec) ** 2, nfft, axis=1)[:, :n]
+    lo, hi = int(sr / PITCH_MAX_HZ), min(int(sr / PITCH_MIN_HZ), n - 1)
+    lag = lo + np.argmax(ac[:, lo:hi], axis=1)
+    rows = np.arange(len(ac))
+    peak = ac[rows, lag] / np.maximum(ac[:, 0], 1e-12)
+    # Parabolic interpolation around the peak for sub-sample lag
+    a, b, c = ac[rows, lag - 1], ac[rows, lag], ac[rows, np.minimum(lag + 1, n - 1)]
+    denom = a - 2 * b + c
+    frac = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / np.where(denom == 0, 1, denom), 0.0)
+    pitch = np.where((peak >= VOICED_CORR) & (rms >= SILENCE_RMS),
+                     sr / (lag + np.clip(frac, -0.5, 0.5)), 0.0)
+
+    return {"rms": rms, "zcr": zcr, "centroid": centroid, "pitch": pitch}
+
+
+def window_summary(feats):
+    """Window-level statistics of ``frame_features`` output."""
+    voiced = feats["pitch"][feats["pitch"] > 0]
+    return {
+        "rms": float(feats["rms"].mean()),
+        "zcr": float(feats["zcr"].mean()),
+        "centroid": float(feats["centroid"].mean()),
+        "pitch": float(voiced.mean()) if len(voiced) else 0.0,
+        "pitch_std": float(voiced.std()) if len(voiced) > 1 else 0.0,
+        "voiced": float(len(voiced) / max(len(feats["pitch"]), 1)),
+    }
+
+
+def stress_label(score):
+    return next(label for th, label in STRESS_LEVELS if score >= th)
+
+
+class StressScorer:
+    """Maps window summaries to 0..1 against a running per-speaker baseline."""
+
+    def __init__(self, alpha=BASELINE_ALPHA, weights=STRESS_WEIGHTS):
+        self.alpha = alpha
+        self.weights = weights
+        self._mean = {}
+        self._var = {}
+        self.score = 0.0
+
+    def update(self, summary):
+        if summary["rms"] < SILENCE_RMS:
+            return self.score                      # silence: keep the last score
+        z_sum = 0.0
+        for k, w in self.weights.items():
+            v = summary[k]
+            if k.startswith("pitch") and summary["pitch"] == 0.0:
+                continue                           # unvoiced window: no pitch evidence
+            if k not in self._mean:
+                self._mean[k], self._var[k] = v, (0.1 * v) ** 2 + 1e-12
+                continue
+            z = (v - self._mean[k]) / math.sqrt(self._var[k])
+            z_sum += w * max(0.0, min(z, 4.0))
+            d = v - self._mean[k]
+            self._mean[k] += self.alpha * d
+            self._var[k] = (1 - self.alpha) * (self._var[k] + self.alpha * d * d)
+        self.score = 1.0 - math.exp(-z_sum / 1.5)   # 0 at baseline, ->1 when far above
+        return self.score
+
+
+# ----------------------------
+# Analyzer thread
+# ----------------------------
+class StressAnalyzer:
+    """
+    Scores the latest ``window_secs`` of audio ``rate_hz`` times a second on
+    a daemon thread. ``latest`` holds the newest result; ``on_score(result)``
+    is called for each one.
+    """
+
+    def __init__(self, source, rate_hz=RATE_HZ, window_secs=WINDOW_SECS, on_score=None):
+        self.source = source
+        self.sr = source.samplerate
+        self.rate_hz = rate_hz
+        self.window_secs = window_secs
+        self.on_score = on_score
+        self.ring = RingBuffer(int(self.sr * max(RING_SECS, 2 * window_secs)))
+        self.scorer = StressScorer()
+        self.latest = None
+        self.scores = 0
+        self.busy_secs = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.source.start(self.ring)
+        self._thread = threading.Thread(target=self._run, name="stress-analyzer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.source.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        need = int(self.sr * self.window_secs)
+        last_written = 0
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            next_t += period
+            self._stop.wait(max(0.0, next_t - time.monotonic()))
+            written = self.ring.written
+            if written >= need and written != last_written:
+                last_written = written
+                self.score_once(self.ring.latest(need))
+            elif self.source.finished:
+                break
+
+    def score_once(self, samples):
+        t0 = time.perf_counter()
+        summary = window_summary(frame_features(samples, self.sr))
+        score = self.scorer.update(summary)
+        result = {"ts": time.time(), "score": round(score, 3), "level": stress_label(score),
+                  **{k: round(v, 4) for k, v in summary.items()}}
+        self.busy_secs += time.perf_counter() - t0
+        self.scores += 1
+        self.latest = result
+        if self.on_score is not None:
+            self.on_score(result)
+        return result
+
+
+def analyze_file(path, rate_hz=RATE_HZ, window_secs=WINDOW_SECS):
+    """Deterministic offline scoring of a WAV file (same windows as live)."""
+    x, sr = read_wav(path)
+    scorer = StressScorer()
+    hop, need = int(sr / rate_hz), int(sr * window_secs)
+    out = []
+    for end in range(need, len(x) + 1, hop):
+        summary = window_summary(frame_features(x[end - need:end], sr))
+        score = scorer.update(summary)
+        out.append({"t": end / sr, "score": round(score, 3), "level": stress_label(score),
+                    **{k: round(v, 4) for k, v in summary.items()}})
+    return out
+
+
+def analyze_stress(audio_data, samplerate=SAMPLE_RATE):
+    """One-shot stress label for a mono sample array (no baseline history)."""
+    feats = window_summary(frame_features(np.asarray(audio_data, dtype=np.float32).reshape(-1),
+                                          samplerate))
+    if feats["rms"] < SILENCE_RMS:
+        return "low stress"
+    # Without a speaker baseline, fall back to population-typical levels
+    score = 0.0
+    score += 0.4 * min(max((feats["pitch"] - 180.0) / 120.0, 0.0), 1.0)
+    score += 0.3 * min(max((feats["rms"] - 0.1) / 0.2, 0.0), 1.0)
+    score += 0.3 * min(max((feats["pitch_std"] - 20.0) / 40.0, 0.0), 1.0)
+    return stress_label(score)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Streaming voice stress analysis")
+    parser.add_argument("wav", nargs="?", help="16-bit PCM WAV file (default: microphone)")
+    parser.add_argument("--mic", action="store_true", help="use the microphone")
+    parser.add_argument("--secs", type=float, default=10.0, help="how long to listen")
+    parser.add_argument("--offline", action="store_true", help="score the WAV as fast as possible")
+    args = parser.parse_args(argv)
+
+    if args.wav and args.offline:
+        for r in analyze_file(args.wav):
+            print(f"{r['t']:6.2f}s  {r['score']:.2f} {r['level']:<13} "
+                  f"pitch {r['pitch']:5.0f} Hz  rms {r['rms']:.3f}")
+        return 0
+
+    source = WavSource(args.wav) if args.wav and not args.mic else MicSource()
+    analyzer = StressAnalyzer(source, on_score=lambda r: print(
+        f"🎙️ stress {r['score']:.2f} ({r['level']}) | pitch {r['pitch']:.0f} Hz | rms {r['rms']:.3f}"))
+    analyzer.start()
+    try:
+        end = time.monotonic() + args.secs
+        while time.monotonic() < end and analyzer.running:
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        analyzer.stop()
+    if analyzer.scores:
+        print(f"⏱️ {1000 * analyzer.busy_secs / analyzer.scores:.2f} ms per score")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+# batch_process.py
+"""
+Headless offline reprocessing of recorded dashcam footage.
+
+    python batch_process.py footage/ more.mp4 --out data/batch --workers 8
+
+Runs the DrowsinessFSM pipeline without any window, audio or alerts.log,
+using video timestamps instead of monotonic(). Files are split into frame
+chunks that are sharded across a process pool; every worker holds its own
+FaceMesh instance. Each chunk starts ``warmup`` frames early so the
+smoothing window and close-hold timer are primed, and only episodes that
+*start* inside the chunk are kept. An episode still open at the chunk
+end is followed past it until the FSM recovers, exactly as a single pass
+would end it (``MAX_FOLLOW_SECS`` can bound that extra decoding).
+
+Writes ``<out>/<video>_episodes.csv`` per file plus ``<out>/batch_stats.csv``.
+"""
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from time import perf_counter
+
+import cv2
+import pandas as pd
+
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm"}
+
+# Frames per chunk handed to a worker (≈ 5 min at 30 fps)
+CHUNK_FRAMES = 9000
+
+# An episode still open at the chunk end is followed until the FSM recovers
+# (None), or at most this many seconds past the chunk end. A number bounds
+# the extra decoding (e.g. a covered camera keeps the FSM DROWSY), but it
+# truncates such episodes, so the output no longer matches a single pass.
+MAX_FOLLOW_SECS = None
+
+EPISODE_COLUMNS = ["file", "start_sec", "end_sec", "duration_sec", "min_smooth_ear"]
+
+# ----------------------------
+# Worker side
+# ----------------------------
+_worker = {}
+
+
+def _init_worker(use_roi, scale):
+    # One FaceMesh (and tracker) per process, created once
+    from cv_module.drowsiness_detector import create_face_mesh
+    from cv_module.roi import FaceROITracker
+    mesh = create_face_mesh()
+    _worker["mesh"] = mesh
+    _worker["tracker"] = FaceROITracker(mesh, scale=scale) if use_roi else None
+
+
+def _landmarks(frame, pts):
+    from cv_module.metrics import landmarks_to_array
+    tracker = _worker["tracker"]
+    if tracker is not None:
+        return tracker.process(frame, out=pts)
+    h, w = frame.shape[:2]
+    results = _worker["mesh"].process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    if not results.multi_face_landmarks:
+        return None
+    return landmarks_to_array(results.multi_face_landmarks[0], w, h, out=pts)
+
+
+def process_chunk(path, start, end, warmup):
+    """
+    Run frames [start - warmup, end) of ``path`` through a fresh FSM and
+    return episodes starting at or after frame ``start``, plus frame counts.
+    """
+    from cv_module.drowsiness_detector import DrowsinessFSM
+    from cv_module.metrics import eye_aspect_ratios
+
+    t0 = perf_counter()
+    cap = cv2.VideoCapture(str(path))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    first = max(0, start - warmup)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    if _worker["tracker"] is not None:
+        _worker["tracker"].reset()
+
+    transitions = []
+    fsm = DrowsinessFSM(on_event=lambda event, now, ear: transitions.append((event, now)))
+    episodes = []
+    open_ep = None
+    pts = None
+    last_ts = 0.0
+    end_ts = None               # video time at the chunk end (while following)
+    idx = first
+    processed = 0
+
+    while True:
+        if idx >= end and open_ep is None:
+            break
+        ok, frame = cap.read()
+        if not ok:
+            break
+        # Video timestamp of the decoded frame; fall back to index / fps
+        ts = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if ts <= 0 and idx > 0:
+            ts = idx / fps
+        last_ts = ts
+        idx += 1
+        processed += 1
+
+        pts = _landmarks(frame, pts)
+        if pts is None:
+            fsm.close_start = None
+            continue
+        smooth_ear, _ = fsm.update(float(eye_aspect_ratios(pts).mean()), now=ts)
+
+        for event, when in transitions:
+            if event == "Drowsiness detected":
+                # Owned only if it starts inside this chunk (not in warm-up)
+                if start <= idx - 1 < end:
+                    open_ep = {"start_sec": when, "min_smooth_ear": smooth_ear}
+            elif open_ep is not None:
+                episodes.append({**open_ep, "end_sec": when})
+                open_ep = None
+        transitions.clear()
+
+        if open_ep is not None:
+            open_ep["min_smooth_ear"] = min(open_ep["min_smooth_ear"], smooth_ear)
+            # Only an episode that outlives its chunk is ever capped
+            if idx >= end and MAX_FOLLOW_SECS is not None:
+                end_ts = ts if end_ts is None else end_ts
+                if ts - end_ts > MAX_FOLLOW_SECS:
+                    episodes.append({**open_ep, "end_sec": ts})
+                    open_ep = None
+
+    if open_ep is not None:
+        # Video ended mid-episode
+        episodes.append({**open_ep, "end_sec": last_ts})
+    cap.release()
+
+    for ep in episodes:
+        ep["file"] = str(path)
+        ep["duration_sec"] = ep["end_sec"] - ep["start_sec"]
+    return {
+        "file": str(path),
+        "episodes": episodes,
+        "frames": min(idx, end) - start,
+        "processed": processed,
+        "seconds": perf_counter() - t0,
+    }
+
+# ----------------------------
+# Driver side
+# ----------------------------
+def find_videos(inputs):
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            yield from sorted(f for f in p.rglob("*") if f.suffix.lower() in VIDEO_EXTS)
+        elif p.is_file():
+            yield p
+
+
+def plan_chunks(path, chunk_frames):
+    cap = cv2.VideoCapture(str(path))
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    if n <= 0:
+        # Unknown length (some containers): process as one chunk
+        return [(0, math.inf)], fps
+    return [(s, min(s + chunk_frames, n)) for s in range(0, n, chunk_frames)], fps
+
+
+def warmup_frames(fps):
+    """Frames needed to fill the smoothing window and close-hold timer."""
+    from cv_module.drowsiness_detector import SMOOTH_N, CLOSE_HOLD_SECS
+    return SMOOTH_N + int(math.ceil(CLOSE_HOLD_SECS * fps)) + 1
+
+
+def merge_episodes(episodes):
+    """Sort and drop overlaps created where two chunks both saw one episode."""
+    out = []
+    for ep in sorted(episodes, key=lambda e: e["start_sec"]):
+        if out and ep["start_sec"] < out[-1]["end_sec"]:
+            prev = out[-1]
+            prev["end_sec"] = max(prev["end_sec"], ep["end_sec"])
+            prev["duration_sec"] = prev["end_sec"] - prev["start_sec"]
+            prev["min_smooth_ear"] = min(prev["min_smooth_ear"], ep["min_smooth_ear"])
+            continue
+        out.append(ep)
+    return out
+
+
+def run_batch(inputs, out_dir, workers=None, chunk_frames=CHUNK_FRAMES,
+              use_roi=False, scale=0.5):
+    workers = workers or os.cpu_count() or 1
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    for path in find_videos(inputs):
+        chunks, fps = plan_chunks(path, chunk_frames)
+        warm = warmup_frames(fps)
+        jobs.extend((path, s, e, warm) for s, e in chunks)
+    if not jobs:
+        print("⚠️ No video files found.")
+        return pd.DataFrame()
+
+    t0 = perf_counter()
+    per_file = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(use_roi, scale)) as pool:
+        futures = [pool.submit(process_chunk, *job) for job in jobs]
+        for fut in as_completed(futures):
+            r = fut.result()
+            agg = per_file.setdefault(r["file"], {"episodes": [], "frames": 0,
+                                                  "processed": 0, "seconds": 0.0})
+            agg["episodes"].extend(r["episodes"])
+            agg["frames"] += r["frames"]
+            agg["processed"] += r["processed"]
+            agg["seconds"] += r["seconds"]
+    wall = perf_counter() - t0
+
+    stats = []
+    for file, agg in sorted(per_file.items()):
+        eps = pd.DataFrame(merge_episodes(agg["episodes"]), columns=EPISODE_COLUMNS)
+        eps.to_csv(out_dir / f"{Path(file).stem}_episodes.csv", index=False)
+        stats.append({
+            "file": file,
+            "frames": agg["frames"],
+            "episodes": len(eps),
+            "cpu_seconds": round(agg["seconds"], 2),
+            "fps_per_core": round(agg["processed"] / agg["seconds"], 1) if agg["seconds"] else 0.0,
+            "warmup_overhead": round(agg["processed"] / max(agg["frames"], 1) - 1.0, 4),
+        })
+    stats_df = pd.DataFrame(stats)
+    stats_df.to_csv(out_dir / "batch_stats.csv", index=False)
+
+    total_frames = int(stats_df["frames"].sum())
+    print(f"✅ {len(per_file)} files, {total_frames} frames in {wall:.1f}s "
+          f"on {workers} workers → {total_frames / wall:.1f} frames/s "
+          f"({total_frames / wall / workers:.1f} frames/s per core)")
+    print(f"📂 Episode tables written to {out_dir}")
+    return stats_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch drowsiness processing")
+    parser.add_argument("inputs", nargs="+", help="video files or directories")
+    parser.add_argument("--out", default="data/batch", help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-frames", type=int, default=CHUNK_FRAMES)
+    parser.add_argument("--roi", action="store_true", help="use downscaled ROI-tracked inference")
+    parser.add_argument("--scale", type=float, default=0.5, help="downscale for --roi detection")
+    args = parser.parse_args(argv)
+    run_batch(args.inputs, args.out, args.workers, args.chunk_frames, args.roi, args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_insights.py
+"""
+Scaling benchmark for the insights.py report engine on synthetic episodes.
+
+    python bench_insights.py                 # 10M episodes
+    python bench_insights.py --sizes 100000 1000000 10000000
+
+For each size it times the single-pass ``compute_aggregates`` against the
+previous multi-pass computation (value_counts + groupby + histogram +
+separate mean/max), plus a warm cache lookup.
+"""
+import argparse
+import tempfile
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+import insights
+
+
+def synthetic_episodes(n, days=365, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.datetime64("2024-01-01T00:00:00", "s")
+    start = base + rng.integers(0, days * 86400, n).astype("timedelta64[s]")
+    dur = np.maximum(1, rng.gamma(2.0, 3.0, n)).astype("timedelta64[s]")
+    return pd.DataFrame({"start": start, "end": start + dur})
+
+
+def legacy_aggregates(df):
+    # The pre-engine approach: one pandas pass per statistic
+    df = df.copy()
+    df["duration_sec"] = (df["end"] - df["start"]).dt.total_seconds()
+    df = df.dropna(subset=["start", "end", "duration_sec"])
+    out = {
+        "total": len(df),
+        "avg_duration": df["duration_sec"].mean(),
+        "longest": df["duration_sec"].max(),
+        "most_drowsy_day": df["start"].dt.date.value_counts().idxmax(),
+        "daily_counts": df.groupby(df["start"].dt.date).size(),
+        "hist": np.histogram(df["duration_sec"], bins=insights.HIST_BINS),
+        "hour_heatmap": df.groupby([df["start"].dt.date, df["start"].dt.hour]).size(),
+    }
+    return out
+
+
+def _time(fn, *args):
+    t0 = perf_counter()
+    result = fn(*args)
+    return perf_counter() - t0, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000_000])
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="only time the new engine (legacy path is slow at 10M)")
+    args = parser.parse_args(argv)
+
+    print(f"{'episodes':>12} | {'engine s':>9} | {'legacy s':>9} | {'speedup':>7} | {'cache hit s':>11}")
+    for n in args.sizes:
+        df = synthetic_episodes(n)
+        t_new, aggs = _time(insights.compute_aggregates, df)
+
+        t_old = float("nan")
+        if not args.skip_legacy:
+            t_old, old = _time(legacy_aggregates, df)
+            assert old["total"] == aggs["total"]
+            assert abs(old["longest"] - aggs["longest"]) < 1e-6
+            assert old["daily_counts"].sum() == aggs["daily_counts"].sum()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            insights.CACHE_DIR = tmp
+            insights.cached_aggregates("bench", lambda: df)
+            t_hit, _ = _time(insights.cached_aggregates, "bench", lambda: df)
+
+        print(f"{n:>12,} | {t_new:>9.2f} | {t_old:>9.2f} | {t_old / t_new:>6.1f}x | {t_hit:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# cv_module/bench_clip_recorder.py
+"""
+Memory and throughput of the pre/post-event clip recorder.
+
+    python -m cv_module.bench_clip_recorder                     # 720p, default configs
+    python -m cv_module.bench_clip_recorder --video cab.mp4 --secs 60 --every 15
+
+Feeds ``--secs`` of frames (synthetic 720p by default, or a video file) at
+virtual ``--fps`` timestamps, as fast as the buffer thread keeps up. A clip
+is triggered every ``--every`` seconds. For each (scale, store)
+configuration it prints:
+
+* hot-path cost of an accepted ``add()`` (p50 / p99 µs), which is what the
+  frame loop pays
+* bytes per buffered frame and the buffer size for PRE_SECS of history
+* compression ms per frame (buffer thread) and clip encoding frames/s
+"""
+import argparse
+import tempfile
+import time
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from cv_module import clip_recorder as cr
+
+CONFIGS = (  # (scale, store)
+    (1.0, "raw"),
+    (0.5, "raw"),
+    (1.0, "jpeg"),
+    (0.5, "jpeg"),
+)
+
+
+class _NullSink:
+    def emit(self, *args, **kwargs):
+        pass
+
+
+def synthetic_frames(n, shape=(720, 1280, 3), seed=0):
+    """Gradient background, moving blob and sensor noise (compresses like video)."""
+    rng = np.random.default_rng(seed)
+    h, w = shape[:2]
+    base = np.zeros(shape, np.uint8)
+    base[..., 0] = np.linspace(40, 200, w, dtype=np.uint8)
+    base[..., 1] = np.linspace(60, 160, h, dtype=np.uint8)[:, None]
+    frames = []
+    for i in range(n):
+        f = base.copy()
+        cv2.circle(f, (w // 2 + int(200 * np.sin(i / 10)), h // 2), 150, (30, 90, 200), -1)
+        f += rng.integers(0, 8, shape, dtype=np.uint8)
+        frames.append(f)
+    return frames
+
+
+def video_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ok, f = cap.read()
+        if not ok:
+            break
+        frames.append(f)
+    cap.release()
+    return frames
+
+
+def run(frames, scale, store, secs, fps, every, out_dir):
+    rec = cr.ClipRecorder(clip_dir=out_dir, scale=scale, store=store, events=_NullSink(),
+                          max_buffer_mb=1024)
+    t0 = 1_700_000_000.0
+    costs = []
+    n = int(secs * fps)
+    next_trigger = every
+    for i in range(n):
+        ts = t0 + i / fps
+        while rec._incoming.qsize() > rec._incoming.maxsize // 2:
+            time.sleep(0.001)                 # let the buffer thread keep up (bench only)
+        c = perf_counter()
+        if rec.add(frames[i % len(frames)], ts):
+            costs.append(perf_counter() - c)      # rate-limited calls are ~1 µs no-ops
+        if i / fps >= next_trigger:
+            rec.trigger("drowsy", ts)
+            next_trigger += every
+    time.sleep(0.5)
+    peak = rec.stats()
+    rec.close()
+    st = rec.stats()
+    us = 1e6 * np.array(costs)
+    per_frame = peak["bytes_per_frame"] or 1
+    pre_mb = per_frame * rec.pre_secs / (rec.min_interval or 1 / fps) / 1e6
+    print(f"  scale {scale:<4} {store:<5} add p50 {np.percentile(us, 50):6.0f} µs  "
+          f"p99 {np.percentile(us, 99):6.0f} µs | {per_frame / 1e3:7.1f} kB/frame, "
+          f"{pre_mb:6.1f} MB per {rec.pre_secs:g}s | compress {st['compress_ms_per_frame']:.2f} ms | "
+          f"{st['clips_written']} clips, encode {st['encode_fps']:.0f} fps, "
+          f"{st['clip_mb_written']:.1f} MB, dropped {st['frames_dropped']}/{st['clips_dropped']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video", help="use frames from this clip instead of synthetic 720p")
+    parser.add_argument("--secs", type=float, default=30.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--every", type=float, default=12.0, help="seconds between triggers")
+    args = parser.parse_args(argv)
+
+    frames = video_frames(args.video, 300) if args.video else synthetic_frames(60)
+    h, w = frames[0].shape[:2]
+    print(f"🎬 {w}x{h}, {args.secs:g}s at {args.fps:g} fps, buffer {cr.BUFFER_FPS:g} fps, "
+          f"clip -{cr.PRE_SECS:g}s/+{cr.POST_SECS:g}s every {args.every:g}s")
+    with tempfile.TemporaryDirectory(prefix="dsa_clips_") as out_dir:
+        for scale, store in CONFIGS:
+            run(frames, scale, store, args.secs, args.fps, args.every, out_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+# cv_module/bench_evaluate.py
+"""
+Speed and exactness of the vectorized parameter sweep (cv_module.evaluate).
+
+    python -m cv_module.bench_evaluate                      # 8 x 10 min synthetic drives
+    python -m cv_module.bench_evaluate --recordings 20 --minutes 30 --workers 8
+
+Builds labelled synthetic recordings and writes them through the real
+cache format (``save_series``). The recordings have noisy open eyes,
+blinks, "long blinks" of 0.3-0.7 s (not labelled), labelled closures of
+1-4 s and face-loss gaps. Then it:
+
+* checks that vectorized episodes equal ``DrowsinessFSM`` sample by
+  sample on ``--verify`` random combinations, and times both per combination
+* runs the default grid on 1 worker and on ``--workers``, and reports
+  combinations/s
+* prints the best settings found next to the current ones
+"""
+import argparse
+import os
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from cv_module import evaluate as E
+
+
+def synthetic_recording(minutes=10, fps=30.0, seed=0, open_ear=0.30, noise=0.015):
+    """(timestamps, ear with NaN for no face, labelled episodes)."""
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * fps)
+    ts = np.arange(n) / fps
+    ear = open_ear + noise * rng.standard_normal(n)
+    labels = []
+    t = rng.uniform(2, 6)
+    while t < ts[-1] - 6:
+        i = int(t * fps)
+        r = rng.random()
+        if r < 0.6:                                   # blink
+            j = i + 4
+            ear[i:j] = rng.uniform(0.08, 0.15)
+        elif r < 0.8:                                 # long blink, not drowsy
+            j = i + int(rng.uniform(0.3, 0.7) * fps)
+            ear[i:j] = 0.14 + 0.02 * rng.standard_normal(j - i)
+        elif r < 0.92:                                # labelled closure
+            secs = rng.uniform(1.0, 4.0)
+            j = i + int(secs * fps)
+            ramp = int(0.3 * fps)
+            ear[i:i + ramp] = np.linspace(open_ear, 0.13, ramp)
+            ear[i + ramp:j] = 0.13 + 0.015 * rng.standard_normal(j - i - ramp)
+            labels.append((ts[i], ts[j]))
+        else:                                         # face lost (head turned)
+            j = i + int(rng.uniform(0.5, 3.0) * fps)
+            ear[i:j] = np.nan
+        t = ts[j] + rng.uniform(1.0, 8.0)
+    return ts, ear, labels
+
+
+def build_cache(cache_dir, recordings, minutes, fps):
+    paths, labels = {}, {}
+    for k in range(recordings):
+        ts, ear, lab = synthetic_recording(minutes, fps, seed=k)
+        name = f"drive_{k:02d}"
+        paths[name] = E.save_series(os.path.join(cache_dir, f"{name}.npz"), ts,
+                                    E.synthetic_landmarks(ear), source=name, fps=fps)
+        labels[name] = lab
+    return paths, labels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recordings", type=int, default=8)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--verify", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="dsa_eval_") as cache_dir:
+        t0 = perf_counter()
+        paths, labels = build_cache(cache_dir, args.recordings, args.minutes, args.fps)
+        t1 = perf_counter()
+        data = E.Dataset.from_cache(paths, labels)
+        t2 = perf_counter()
+    print(f"🎞️ {args.recordings} recordings, {data.hours:.2f} h, {len(data.t):,} face samples, "
+          f"{len(data.label_start)} labelled episodes (cache write {t1 - t0:.1f}s, "
+          f"load {1000 * (t2 - t1):.0f} ms)")
+
+    grid = E.load_grid()
+    rng = np.random.default_rng(1)
+    combos = [(f, c, o, h) for f in grid["filters"] for c in grid["close_th"]
+              for o in grid["open_th"] for h in grid["hold_secs"] if o > c]
+    fsm_secs = vec_secs = 0.0
+    bad = 0
+    for i in rng.choice(len(combos), size=min(args.verify, len(combos)), replace=False):
+        (kind, params), close_th, open_th, hold = combos[i]
+        t = perf_counter()
+        want = E.fsm_episodes(data, kind, params, close_th, open_th, hold)
+        fsm_secs += perf_counter() - t
+        t = perf_counter()
+        row = E.sweep_task(data, kind, params, close_th, [open_th], [hold])
+        vec_secs += perf_counter() - t
+        smooth = data.smooth(kind, params)
+        closed, run_start = E.closed_runs(data, smooth, close_th)
+        got = E.episodes(data, E.hold_fires(data, closed, run_start, hold),
+                         np.flatnonzero(smooth >= open_th))
+        same = all(len(g) == len(w) and np.allclose(g, w) for g, w in zip(got, want))
+        bad += not same
+        assert row[0]["alerts"] == len(got[0])
+    n = min(args.verify, len(combos))
+    print(f"{'✅' if not bad else '❌'} Vectorized == DrowsinessFSM on {n - bad}/{n} random "
+          f"combinations | per combination: FSM {1000 * fsm_secs / n:.0f} ms, "
+          f"vectorized {1000 * vec_secs / n:.1f} ms (incl. smoothing)")
+
+    for workers in sorted({1, args.workers}):
+        t = perf_counter()
+        df = E.run_sweep(data, grid, workers)
+        wall = perf_counter() - t
+        print(f"📊 {workers} worker(s): {len(df):,} combinations in {wall:.1f}s → "
+              f"{len(df) / wall:,.0f} combinations/s "
+              f"({len(df) * len(data.t) / wall / 1e6:,.0f} M sample-evaluations/s)")
+
+    ranked = E.rank(df)
+    (kind, params), close_th, open_th, hold = E.current_settings()
+    cur = df[(df["filter"] == kind) & np.isclose(df["close_th"], close_th)
+             & np.isclose(df["open_th"], open_th) & np.isclose(df["hold_secs"], hold)
+             & (df["params"] == E.json.dumps(params, sort_keys=True))]
+    if len(cur):
+        print(f"📌 Current: {E._fmt(cur.iloc[0])}")
+    print(f"🏆 Best:    {E._fmt(ranked.iloc[0])}")
+    return 0 if not bad else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,114 @@
+# cv_module/bench_filters.py
+"""
+Compare EAR smoothing filters: per-update cost and detection behaviour.
+
+    python -m cv_module.bench_filters [--minutes 10] [--fps 30] [--seed 0]
+
+Per-update cost is timed on live-style ``update()`` calls, against the old
+deque ``sum()/len()`` smoother (which is O(window): at the default window
+of 5 it is still competitive, use --window to see where it falls behind);
+batch cost is ``filter.batch()`` over the
+whole series. Detection runs each filter in a ``DrowsinessFSM`` over a
+synthetic drive: noisy open eyes, regular blinks and 2 s eye closures.
+It reports the latency from closure onset to the alert (including
+CLOSE_HOLD_SECS), missed closures and false alerts.
+"""
+import argparse
+import sys
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+from cv_module.drowsiness_detector import DrowsinessFSM, SMOOTH_N
+from cv_module.filters import FILTERS, make_filter
+
+
+def synthetic_drive(minutes=10, fps=30, seed=0, open_ear=0.30, noise=0.015,
+                    blink_every=4.0, closure_every=30.0, closure_secs=2.0):
+    """(timestamps, ear, closure onset times) for a synthetic drive."""
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * fps)
+    ts = np.arange(n) / fps
+    ear = open_ear + noise * rng.standard_normal(n)
+
+    # Blinks: ~130 ms dips at jittered intervals
+    t = rng.uniform(0, blink_every)
+    while t < ts[-1]:
+        i = int(t * fps)
+        ear[i:i + 4] = rng.uniform(0.08, 0.15)
+        t += blink_every * rng.uniform(0.5, 1.5)
+
+    # Closures: the eyes droop over ~0.3 s and stay shut
+    onsets = np.arange(closure_every / 2, ts[-1] - closure_secs, closure_every)
+    for t0 in onsets:
+        i, j = int(t0 * fps), int((t0 + closure_secs) * fps)
+        ramp = min(int(0.3 * fps), j - i)
+        ear[i:i + ramp] = np.linspace(open_ear, 0.12, ramp)
+        ear[i + ramp:j] = 0.12 + 0.01 * rng.standard_normal(j - i - ramp)
+    return ts, ear, onsets
+
+
+def per_update_ns(update, xs, ts):
+    t0 = perf_counter()
+    for x, t in zip(xs, ts):
+        update(x, t)
+    return 1e9 * (perf_counter() - t0) / len(xs)
+
+
+def deque_baseline(n=SMOOTH_N):
+    hist = deque(maxlen=n)
+
+    def update(x, now=None):
+        hist.append(x)
+        return sum(hist) / len(hist)
+    return update
+
+
+def detection(smoother, ts, ear, onsets, closure_secs=2.0):
+    alerts = []
+    fsm = DrowsinessFSM(on_event=lambda event, now, e: alerts.append(now)
+                        if event == "Drowsiness detected" else None, smoother=smoother)
+    for x, t in zip(ear.tolist(), ts.tolist()):
+        fsm.update(x, t)
+    alerts = np.asarray(alerts)
+    latencies, matched = [], set()
+    for t0 in onsets:
+        hit = alerts[(alerts >= t0) & (alerts <= t0 + closure_secs)]
+        if len(hit):
+            latencies.append(hit[0] - t0)
+            matched.add(float(hit[0]))
+    return {
+        "latency_ms": 1000.0 * float(np.mean(latencies)) if latencies else float("nan"),
+        "missed": len(onsets) - len(latencies),
+        "false": int(sum(float(a) not in matched for a in alerts)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=int, default=SMOOTH_N, help="sma / deque window")
+    args = parser.parse_args(argv)
+
+    ts, ear, onsets = synthetic_drive(args.minutes, args.fps, args.seed)
+    xs, tl = ear.tolist(), ts.tolist()
+    print(f"{len(ear)} samples, {len(onsets)} closures\n")
+    print(f"{'filter':<8} {'update ns':>10} {'batch ns':>9} {'latency ms':>11} {'missed':>7} {'false':>6}")
+    print(f"{'deque':<8} {per_update_ns(deque_baseline(args.window), xs, tl):>10.0f}")
+    for kind in FILTERS:
+        params = {"n": args.window} if kind == "sma" else {}
+        cost = per_update_ns(make_filter(kind, **params).update, xs, tl)
+        t0 = perf_counter()
+        make_filter(kind, **params).batch(ear, ts)
+        batch = 1e9 * (perf_counter() - t0) / len(ear)
+        d = detection(make_filter(kind, **params), ts, ear, onsets)
+        print(f"{kind:<8} {cost:>10.0f} {batch:>9.1f} {d['latency_ms']:>11.0f} "
+              f"{d['missed']:>7} {d['false']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
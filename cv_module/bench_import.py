@@ -0,0 +1,56 @@
+# cv_module/bench_import.py
+"""
+Import-time budget check for the entry-point modules.
+
+    python -m cv_module.bench_import [--runs 5]
+
+Each module is imported in a fresh interpreter ``--runs`` times and the best
+wall time is compared to its budget. Exits non-zero if any module is over
+budget, so it can gate CI. Heavy resources (FaceMesh, transformers
+pipelines, audio devices, log directories) must stay behind factory
+functions for these budgets to hold.
+"""
+import argparse
+import subprocess
+import sys
+
+# module -> budget in seconds (cv2 + numpy alone cost ~0.1-0.2 s)
+BUDGETS = {
+    "cv_module.drowsiness_detector": 0.3,
+    "llm_module.alert_generator": 0.1,
+    "driver_safety": 0.3,
+}
+
+_SNIPPET = "import time; t = time.perf_counter(); import {m}; print(time.perf_counter() - t)"
+
+
+def import_time(module, runs=5):
+    """Best-of-``runs`` import time of ``module`` in a fresh interpreter."""
+    best = float("inf")
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(m=module)],
+            capture_output=True, text=True, check=True,
+        )
+        best = min(best, float(out.stdout.strip().splitlines()[-1]))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS))
+    args = parser.parse_args(argv)
+
+    ok = True
+    for module in args.modules:
+        budget = BUDGETS.get(module, 0.5)
+        t = import_time(module, args.runs)
+        status = "✅" if t <= budget else "❌"
+        ok &= t <= budget
+        print(f"{status} import {module}: {t * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# cv_module/bench_roi.py
+"""
+Compare ROI-tracked / downscaled FaceMesh against full-resolution inference
+on recorded clips: per-frame inference time and EAR error.
+
+    python -m cv_module.bench_roi clip1.mp4 [clip2.mp4 ...] [--scale 0.5]
+
+Exits non-zero if the mean absolute EAR error exceeds roi.EAR_TOLERANCE.
+Run this on recorded clips before turning on ``ROI_TRACKING`` in
+drowsiness_detector.py.
+"""
+import argparse
+import sys
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from cv_module.drowsiness_detector import create_face_mesh
+from cv_module.metrics import landmarks_to_array, eye_aspect_ratios
+from cv_module.roi import FaceROITracker, EAR_TOLERANCE
+
+
+def bench_clip(path, scale=0.5, crop_size=256, redetect_every=30):
+    full_mesh = create_face_mesh()
+    tracker = FaceROITracker(create_face_mesh(), scale=scale, crop_size=crop_size,
+                             redetect_every=redetect_every,
+                             crop_mesh=create_face_mesh(static_image_mode=True))
+    cap = cv2.VideoCapture(path)
+    t_full = t_roi = 0.0
+    frames = 0
+    errors = []
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames += 1
+        h, w = frame.shape[:2]
+
+        t0 = perf_counter()
+        res = full_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        t_full += perf_counter() - t0
+
+        t0 = perf_counter()
+        pts = tracker.process(frame)
+        t_roi += perf_counter() - t0
+
+        if res.multi_face_landmarks and pts is not None:
+            ref = landmarks_to_array(res.multi_face_landmarks[0], w, h)
+            errors.append(abs(float(eye_aspect_ratios(ref).mean())
+                              - float(eye_aspect_ratios(pts).mean())))
+    cap.release()
+    errors = np.asarray(errors) if errors else np.zeros(1)
+    return {
+        "clip": path,
+        "frames": frames,
+        "full_ms": 1000.0 * t_full / max(frames, 1),
+        "roi_ms": 1000.0 * t_roi / max(frames, 1),
+        "speedup": t_full / t_roi if t_roi else 0.0,
+        "ear_mae": float(errors.mean()),
+        "ear_p95": float(np.percentile(errors, 95)),
+        "roi_runs": tracker.roi_runs,
+        "full_frame_runs": tracker.full_frame_runs,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("clips", nargs="+")
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--crop-size", type=int, default=256)
+    parser.add_argument("--redetect-every", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    ok = True
+    for clip in args.clips:
+        r = bench_clip(clip, args.scale, args.crop_size, args.redetect_every)
+        print(f"{r['clip']}: {r['frames']} frames | full {r['full_ms']:.1f} ms "
+              f"| roi {r['roi_ms']:.1f} ms | x{r['speedup']:.2f} "
+              f"| EAR MAE {r['ear_mae']:.4f} (p95 {r['ear_p95']:.4f})")
+        ok &= r["ear_mae"] <= EAR_TOLERANCE
+    if not ok:
+        print(f"❌ EAR error above tolerance {EAR_TOLERANCE}")
+        return 1
+    print(f"✅ EAR within tolerance {EAR_TOLERANCE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
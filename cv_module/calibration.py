@@ -0,0 +1,228 @@
+# cv_module/calibration.py
+"""
+Per-driver auto-calibration of the EAR hysteresis thresholds.
+
+An ``EARCalibrator`` watches raw EAR samples while the driver is awake and
+keeps O(1) running statistics (Welford mean / variance) of their open-eye
+EAR. Blinks and closures are rejected as outliers, so only open-eye frames
+feed the statistics. Once ``min_samples`` have been seen, thresholds are
+derived from the statistics and pushed into the ``DrowsinessFSM``:
+
+    close_th = min(mean - CLOSE_SIGMAS * std, mean * CLOSE_RATIO)
+    open_th  = close_th + HYSTERESIS_FRAC * (mean - close_th)
+
+Both thresholds are clamped to [MIN_CLOSE_TH, MAX_OPEN_TH]. For a typical
+open-eye mean of 0.30 this gives the stock 0.23 / 0.27 pair.
+
+Profiles are JSON files keyed by driver ID (``data/profiles/<driver>.json``).
+A stored profile is applied as soon as the session starts. Calibration is a
+phase, not a permanent process: only the first ``CALIBRATION_FRAMES`` face
+frames of a session may feed the statistics, and after that the thresholds
+are frozen. Eyes that droop slowly as fatigue sets in would otherwise drag
+the mean, and with it ``close_th``, down and make the detector less
+sensitive exactly when it matters. For the same reason a refinement within
+the phase never lowers ``close_th`` below the value the session started
+with (the stored profile's, or the first one derived). The statistics are
+capped at ``MAX_WEIGHT`` samples, so old sessions slowly fade out.
+"""
+import json
+import math
+import os
+import re
+import time
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "profiles")
+
+# Threshold derivation
+CLOSE_SIGMAS = 3.0        # close threshold sits this many std below the open-eye mean...
+CLOSE_RATIO = 0.78        # ...and at most this fraction of it
+HYSTERESIS_FRAC = 0.5     # open threshold: this far from close_th towards the mean
+MIN_CLOSE_TH = 0.12
+MAX_OPEN_TH = 0.40
+MIN_GAP = 0.02            # minimum open_th - close_th
+
+# Sampling
+MIN_SAMPLES = 300         # open-eye frames before thresholds are derived (~10 s @ 30 fps)
+REJECT_SIGMAS = 2.5       # samples this far below the running mean are blinks / closures
+MIN_OPEN_EAR = 0.12       # absolute floor for an open-eye sample
+MAX_WEIGHT = 20000        # cap on effective sample count (slow forgetting)
+REDERIVE_EVERY = 300      # re-derive thresholds every N accepted samples after calibration
+CALIBRATION_FRAMES = 2700 # face frames per session that may calibrate (~90 s @ 30 fps)
+
+
+class RunningStats:
+    """Welford running mean / variance in O(1) per sample."""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, max_weight=MAX_WEIGHT):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.max_weight = max_weight
+
+    def add(self, x):
+        if self.n >= self.max_weight:
+            # Keep the effective weight fixed: behaves like an exponential average
+            self.m2 *= (self.max_weight - 1) / self.max_weight
+            self.n = self.max_weight - 1
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (x - self.mean)
+
+    @property
+    def var(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.var)
+
+    def to_dict(self):
+        return {"n": self.n, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, d, max_weight=MAX_WEIGHT):
+        return cls(int(d.get("n", 0)), float(d.get("mean", 0.0)), float(d.get("m2", 0.0)),
+                   max_weight=max_weight)
+
+
+def derive_thresholds(mean, std, min_close=None):
+    """
+    (close_th, open_th) from open-eye EAR statistics. ``min_close`` keeps
+    ``close_th`` from dropping below an earlier value.
+    """
+    close_th = min(mean - CLOSE_SIGMAS * std, mean * CLOSE_RATIO)
+    if min_close is not None:
+        close_th = max(close_th, min_close)
+    close_th = min(max(close_th, MIN_CLOSE_TH), MAX_OPEN_TH - MIN_GAP)
+    open_th = close_th + HYSTERESIS_FRAC * (mean - close_th)
+    open_th = min(max(open_th, close_th + MIN_GAP), MAX_OPEN_TH)
+    return round(close_th, 4), round(open_th, 4)
+
+
+# ----------------------------
+# Profiles
+# ----------------------------
+def _profile_path(driver_id, profile_dir=PROFILE_DIR):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", str(driver_id))
+    return os.path.join(profile_dir, f"{safe}.json")
+
+
+def load_profile(driver_id, profile_dir=PROFILE_DIR):
+    """Stored profile dict for ``driver_id``, or None."""
+    try:
+        with open(_profile_path(driver_id, profile_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_profile(profile, profile_dir=PROFILE_DIR):
+    os.makedirs(profile_dir, exist_ok=True)
+    path = _profile_path(profile["driver"], profile_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)   # never leave a half-written profile behind
+    return path
+
+
+# ----------------------------
+# Calibrator
+# ----------------------------
+class EARCalibrator:
+    """
+    Online open-eye EAR statistics for one driver.
+
+    Call ``update(ear, fsm)`` once per face frame. The calibrator applies
+    stored or derived thresholds to the FSM via ``fsm.set_thresholds``.
+    After ``calibration_frames`` calls it is ``frozen`` and ignores further
+    samples. Call ``close()`` at session end to persist the profile.
+    """
+
+    def __init__(self, driver_id, profile_dir=PROFILE_DIR, min_samples=MIN_SAMPLES,
+                 rederive_every=REDERIVE_EVERY, calibration_frames=CALIBRATION_FRAMES):
+        self.driver_id = str(driver_id)
+        self.profile_dir = profile_dir
+        self.min_samples = min_samples
+        self.rederive_every = rederive_every
+        self.calibration_frames = calibration_frames
+        self.profile = load_profile(self.driver_id, profile_dir)
+        self.stats = RunningStats.from_dict(self.profile["stats"]) if self.profile else RunningStats()
+        stored = self.profile.get("thresholds") if self.profile else None
+        self.thresholds = tuple(stored) if stored else None
+        self.frames = 0
+        self.accepted = 0
+        self.rejected = 0
+        self._since_derive = 0
+
+    @property
+    def calibrated(self):
+        return self.thresholds is not None
+
+    @property
+    def frozen(self):
+        """Calibration phase over: thresholds stay fixed for the rest of the session."""
+        return self.frames >= self.calibration_frames
+
+    def apply(self, fsm):
+        """Push the current thresholds (if any) into ``fsm``."""
+        if self.thresholds is not None:
+            fsm.set_thresholds(*self.thresholds)
+
+    def _is_open_eye(self, ear):
+        if ear < MIN_OPEN_EAR:
+            return False
+        if self.stats.n >= 30 and ear < self.stats.mean - REJECT_SIGMAS * self.stats.std:
+            return False
+        return True
+
+    def update(self, ear, fsm=None):
+        """Feed one raw EAR sample. Returns True when thresholds changed."""
+        if self.frozen:
+            return False
+        self.frames += 1
+        if fsm is not None and fsm.state != "AWAKE":
+            return False
+        if not self._is_open_eye(ear):
+            self.rejected += 1
+            return False
+        self.stats.add(ear)
+        self.accepted += 1
+        self._since_derive += 1
+
+        due = (self.stats.n >= self.min_samples
+               and (not self.calibrated or self._since_derive >= self.rederive_every))
+        if not due:
+            return False
+        self._since_derive = 0
+        # Refining within the session may tighten close_th, never loosen it
+        floor = self.thresholds[0] if self.thresholds else None
+        new = derive_thresholds(self.stats.mean, self.stats.std, min_close=floor)
+        changed = new != self.thresholds
+        self.thresholds = new
+        if fsm is not None:
+            self.apply(fsm)
+        if self.profile is None:
+            # First calibration for a new driver: persist right away
+            self.save()
+        return changed
+
+    def to_profile(self):
+        return {
+            "driver": self.driver_id,
+            "updated": time.time(),
+            "stats": self.stats.to_dict(),
+            "ear_mean": round(self.stats.mean, 4),
+            "ear_std": round(self.stats.std, 4),
+            "thresholds": list(self.thresholds) if self.thresholds else None,
+        }
+
+    def save(self):
+        if not self.calibrated:
+            return None
+        self.profile = self.to_profile()
+        return save_profile(self.profile, self.profile_dir)
+
+    def close(self):
+        return self.save()
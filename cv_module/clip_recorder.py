@@ -0,0 +1,312 @@
+# cv_module/clip_recorder.py
+"""
+Pre/post-event clip recording from a rolling in-memory frame buffer.
+
+Every frame goes through ``add(frame)``. On the hot path it is only
+rate-limited to ``BUFFER_FPS`` and downscaled by ``BUFFER_SCALE`` (the
+resize also produces the copy, so the caller may reuse its frame or a
+shared-memory slot). The small frame is then handed to a buffer thread,
+which JPEG-compresses it (``STORE = "jpeg"``; ``"raw"`` keeps arrays) into
+a time-ordered ring. The ring is bounded twice: by age (``PRE_SECS`` plus
+what pending clips still need) and by ``MAX_BUFFER_MB``.
+
+``trigger("drowsy")`` returns a clip file name at once and marks a clip
+covering ``[t - PRE_SECS, t + POST_SECS]``. A trigger inside a clip that is
+still open extends it, up to ``MAX_CLIP_SECS``. Once the post-event window
+has been captured, the frames are handed to an encoder thread. It writes
+``data/logs/clips/<name>.mp4`` at the buffer's real frame rate and emits a
+``clip_saved`` event. If the encoder is backlogged, the clip is dropped and
+counted, never queued without bound.
+
+``stats()`` reports buffer memory / seconds and encoding throughput, and
+the same numbers go to the instrumentation gauges.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+
+from log_module import event_sink as ev
+from log_module.instrumentation import get_metrics
+
+CLIP_DIR = os.path.join(ev.LOG_DIR, "clips")
+PRE_SECS = 5.0
+POST_SECS = 5.0
+MAX_CLIP_SECS = 30.0
+BUFFER_FPS = 15.0            # frames kept per second (0 = every frame)
+BUFFER_SCALE = 0.5           # downscale before buffering
+STORE = "jpeg"               # "jpeg" (compressed in the buffer thread) or "raw"
+JPEG_QUALITY = 80
+MAX_BUFFER_MB = 64.0
+CLIP_FOURCC = "mp4v"
+CLIP_EXT = "mp4"
+MAX_PENDING_CLIPS = 4        # encoder backlog before clips are dropped
+
+_STOP = object()
+
+
+class _Clip:
+    __slots__ = ("name", "kind", "start", "end", "trigger_ts")
+
+    def __init__(self, name, kind, start, end, trigger_ts):
+        self.name = name
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.trigger_ts = trigger_ts
+
+
+class ClipRecorder:
+    def __init__(self, clip_dir=CLIP_DIR, pre_secs=PRE_SECS, post_secs=POST_SECS,
+                 buffer_fps=BUFFER_FPS, scale=BUFFER_SCALE, store=STORE,
+                 jpeg_quality=JPEG_QUALITY, max_buffer_mb=MAX_BUFFER_MB,
+                 max_clip_secs=MAX_CLIP_SECS, fourcc=CLIP_FOURCC, ext=CLIP_EXT,
+                 max_pending_clips=MAX_PENDING_CLIPS, events=None):
+        if store not in ("jpeg", "raw"):
+            raise ValueError("store must be 'jpeg' or 'raw'")
+        self.clip_dir = clip_dir
+        self.pre_secs = pre_secs
+        self.post_secs = post_secs
+        self.min_interval = 1.0 / buffer_fps if buffer_fps else 0.0
+        self.scale = scale
+        self.store = store
+        self.jpeg_quality = jpeg_quality
+        self.max_buffer_bytes = int(max_buffer_mb * 1024 * 1024)
+        self.max_clip_secs = max_clip_secs
+        self.fourcc = fourcc
+        self.ext = ext
+        self.events = events             # EventSink for clip_saved (default: shared sink)
+        os.makedirs(clip_dir, exist_ok=True)
+
+        self._ring = deque()             # (ts, payload, nbytes), oldest first
+        self._ring_bytes = 0
+        self._ring_lock = threading.Lock()
+        self._clips = []                 # open clips, waiting for their post window
+        self._clip_lock = threading.Lock()
+        self._last_add = 0.0
+        self._last_frame_at = time.monotonic()   # wall clock of the newest buffered frame
+
+        self._incoming = queue.Queue(maxsize=int(2 * (buffer_fps or 30)))
+        self._encode_q = queue.Queue(maxsize=max_pending_clips)
+        self._closed = False
+
+        self.frames_added = 0
+        self.frames_dropped = 0          # buffer thread backlogged
+        self.frames_evicted_early = 0    # pushed out by the memory cap
+        self.clips_written = 0
+        self.clips_dropped = 0
+        self.frames_encoded = 0
+        self.encode_secs = 0.0
+        self.compress_secs = 0.0
+        self.bytes_written = 0
+
+        self._buffer_thread = threading.Thread(target=self._buffer_loop, name="clip-buffer",
+                                               daemon=True)
+        self._encoder = threading.Thread(target=self._encode_loop, name="clip-encoder",
+                                         daemon=True)
+        self._buffer_thread.start()
+        self._encoder.start()
+
+    # ----------------------------
+    # Hot path
+    # ----------------------------
+    def add(self, frame, ts=None):
+        """Offer a BGR frame; returns False if it was rate-limited or dropped."""
+        ts = time.time() if ts is None else ts
+        if ts - self._last_add < self.min_interval:
+            return False
+        self._last_add = ts
+        if self.scale != 1.0:
+            small = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA)
+        else:
+            small = frame.copy()
+        try:
+            self._incoming.put_nowait((ts, small))
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+        return True
+
+    def trigger(self, kind="drowsy", ts=None):
+        """
+        Start (or extend) a clip around ``ts``; returns the clip file name
+        it will be written under.
+        """
+        ts = time.time() if ts is None else ts
+        with self._clip_lock:
+            for clip in self._clips:
+                if clip.start <= ts <= clip.end:
+                    clip.end = min(max(clip.end, ts + self.post_secs),
+                                   clip.start + self.max_clip_secs)
+                    return clip.name
+            stamp = datetime.fromtimestamp(ts).strftime("%Y%m%d_%H%M%S_%f")
+            clip = _Clip(f"{kind}_{stamp}.{self.ext}", kind, ts - self.pre_secs,
+                         ts + self.post_secs, ts)
+            self._clips.append(clip)
+            return clip.name
+
+    # ----------------------------
+    # Buffer thread
+    # ----------------------------
+    def _buffer_loop(self):
+        m = get_metrics()
+        while True:
+            try:
+                item = self._incoming.get(timeout=0.25)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush_clips(force=True)
+                return
+            if item is not None:
+                ts, small = item
+                if self.store == "jpeg":
+                    t0 = time.perf_counter()
+                    ok, buf = cv2.imencode(".jpg", small,
+                                           [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                    self.compress_secs += time.perf_counter() - t0
+                    if not ok:
+                        continue
+                    payload = buf
+                else:
+                    payload = small
+                self._last_frame_at = time.monotonic()
+                with self._ring_lock:
+                    self._ring.append((ts, payload, payload.nbytes))
+                    self._ring_bytes += payload.nbytes
+                    self.frames_added += 1
+                self._evict(ts)
+                m.set("clip_buffer_mb", round(self._ring_bytes / 1e6, 2))
+            self._flush_clips()
+
+    def _evict(self, newest):
+        with self._clip_lock:
+            keep_from = min([c.start for c in self._clips], default=newest - self.pre_secs)
+        keep_from = min(keep_from, newest - self.pre_secs)
+        with self._ring_lock:
+            while self._ring and (self._ring[0][0] < keep_from
+                                  or self._ring_bytes > self.max_buffer_bytes):
+                ts, _, nbytes = self._ring.popleft()
+                self._ring_bytes -= nbytes
+                if ts >= keep_from:
+                    self.frames_evicted_early += 1
+
+    def _flush_clips(self, force=False):
+        """
+        Hand clips whose post window has been buffered to the encoder. If
+        frames stop arriving (camera lost), open clips are written with what
+        there is once the stream has been idle for the post window.
+        """
+        stalled = time.monotonic() - self._last_frame_at > self.post_secs
+        with self._ring_lock:
+            newest = self._ring[-1][0] if self._ring else 0.0
+        with self._clip_lock:
+            ready = [c for c in self._clips if force or stalled or newest >= c.end]
+            if not ready:
+                return
+            self._clips = [c for c in self._clips if c not in ready]
+        for clip in ready:
+            with self._ring_lock:
+                frames = [(ts, p) for ts, p, _ in self._ring if clip.start <= ts <= clip.end]
+            if not frames:
+                self.clips_dropped += 1
+                continue
+            try:
+                self._encode_q.put_nowait((clip, frames))
+            except queue.Full:
+                self.clips_dropped += 1
+
+    # ----------------------------
+    # Encoder thread
+    # ----------------------------
+    def _encode_loop(self):
+        m = get_metrics()
+        while True:
+            item = self._encode_q.get()
+            if item is _STOP:
+                return
+            clip, frames = item
+            try:
+                t0 = time.perf_counter()
+                path = self._write_clip(clip, frames)
+                secs = time.perf_counter() - t0
+                self.encode_secs += secs
+                self.frames_encoded += len(frames)
+                self.clips_written += 1
+                self.bytes_written += os.path.getsize(path)
+                m.inc("clips_written")
+                m.set("clip_encode_fps", round(self.frames_encoded / self.encode_secs, 1))
+                sink = self.events if self.events is not None else ev.get_event_sink()
+                sink.emit(ev.CLIP_SAVED, ts=clip.trigger_ts, clip=clip.name, kind=clip.kind,
+                          start=round(frames[0][0], 3), end=round(frames[-1][0], 3),
+                          frames=len(frames), encode_ms=round(1000 * secs, 1))
+            except Exception:
+                # A failed clip must never take the recorder down
+                self.clips_dropped += 1
+
+    def _decode(self, payload):
+        return cv2.imdecode(payload, cv2.IMREAD_COLOR) if self.store == "jpeg" else payload
+
+    def _write_clip(self, clip, frames):
+        first = self._decode(frames[0][1])
+        h, w = first.shape[:2]
+        span = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / span if span > 0 else 15.0
+        path = os.path.join(self.clip_dir, clip.name)
+        root, ext = os.path.splitext(path)
+        tmp = f"{root}.part{ext}"           # keep the extension: it picks the container
+        writer = cv2.VideoWriter(tmp, cv2.VideoWriter_fourcc(*self.fourcc), fps, (w, h))
+        try:
+            if not writer.isOpened():
+                raise RuntimeError(f"cannot open video writer for {path}")
+            writer.write(first)
+            for _, payload in frames[1:]:
+                writer.write(self._decode(payload))
+            writer.release()
+            os.replace(tmp, path)
+        except Exception:
+            # Don't leave a half-written .part file behind
+            writer.release()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    # ----------------------------
+    # Reporting / shutdown
+    # ----------------------------
+    def stats(self):
+        with self._ring_lock:
+            n = len(self._ring)
+            span = self._ring[-1][0] - self._ring[0][0] if n > 1 else 0.0
+            nbytes = self._ring_bytes
+        return {
+            "buffer_frames": n,
+            "buffer_secs": round(span, 2),
+            "buffer_mb": round(nbytes / 1e6, 2),
+            "buffer_cap_mb": round(self.max_buffer_bytes / 1e6, 2),
+            "bytes_per_frame": int(nbytes / n) if n else 0,
+            "frames_added": self.frames_added,
+            "frames_dropped": self.frames_dropped,
+            "frames_evicted_early": self.frames_evicted_early,
+            "compress_ms_per_frame": round(1000 * self.compress_secs / max(self.frames_added, 1), 3),
+            "clips_written": self.clips_written,
+            "clips_dropped": self.clips_dropped,
+            "encode_fps": round(self.frames_encoded / self.encode_secs, 1) if self.encode_secs else 0.0,
+            "clip_mb_written": round(self.bytes_written / 1e6, 2),
+        }
+
+    def close(self):
+        """Write any open clips with the frames buffered so far, then stop."""
+        if self._closed:
+            return
+        self._closed = True
+        self._incoming.put(_STOP)
+        self._buffer_thread.join()
+        self._encode_q.put(_STOP)
+        self._encoder.join()
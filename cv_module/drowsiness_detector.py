@@ -1,34 +1,43 @@
 # cv_module/drowsiness_detector.py
 
-# --- Suppress noisy TF/MediaPipe logs (must be first) ---
+# Heavy resources (MediaPipe FaceMesh, audio device, log files, Parquet
+# store) are created lazily on first use, so importing this module stays
+# cheap (see cv_module/bench_import.py).
 import os
-os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
-import absl.logging
-absl.logging.set_verbosity(absl.logging.ERROR)
+import threading
 
 import cv2
-import mediapipe as mp
 import numpy as np
-from collections import deque
+import time
 from time import monotonic
-import datetime
 
-# Audio (safe fallback if default device not set)
-try:
-    import sounddevice as sd
-    _AUDIO_OK = True
-except Exception:
-    _AUDIO_OK = False
+from audio_module.alert_engine import play_alert_tone
+from cv_module.filters import FILTERS, make_filter
+from cv_module.pipeline import FramePipeline
+from cv_module.roi import FaceROITracker
+from log_module.event_sink import get_event_sink, STATE_EVENTS
+from log_module.instrumentation import get_metrics, start_metrics, start_metrics_from_env
+from cv_module.metrics import (
+    RIGHT_EYE, LEFT_EYE, landmarks_to_array, eye_aspect_ratios, mouth_aspect_ratio,
+)
 
 # ----------------------------
 # Settings (tune here)
 # ----------------------------
-# Hysteresis thresholds (use two thresholds to reduce flapping)
+# Hysteresis thresholds (use two thresholds to reduce flapping). These are the
+# defaults for every detector script; per-driver profiles override them
+# (see cv_module/calibration.py)
 EAR_CLOSE_TH = 0.23   # go to DROWSY when smoothed EAR <= this
 EAR_OPEN_TH  = 0.27   # return to AWAKE when smoothed EAR >= this
 
-# Smoothing window (frames)
-SMOOTH_N = 5          # moving average window
+# Per-driver auto-calibration: None disables, else a driver ID whose profile
+# (data/profiles/<id>.json) is loaded at start and refined during a bounded
+# calibration phase, then frozen for the session
+DRIVER_ID = None
+
+# EAR smoothing (see cv_module/filters.py): "sma", "ema", "kalman" or "euro"
+SMOOTH_FILTER = "sma"
+SMOOTH_N = 5          # moving average window (sma)
 
 # Require eyes-closed for at least this long (seconds)
 CLOSE_HOLD_SECS = 0.6
@@ -36,173 +45,490 @@ CLOSE_HOLD_SECS = 0.6
 # Optional: draw eyes & EAR on frame
 DRAW_LANDMARKS = True
 
-# Logging
-LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "logs")
-LOG_FILE = "alerts.log"
+# Threaded capture/inference/render pipeline (False = serial loop)
+PIPELINED = True
+PIPELINE_QUEUE_SIZE = 2   # per-stage queue bound; oldest frame dropped when full
+SHOW_PIPELINE_STATS = True
 
-# ----------------------------
-# MediaPipe init
-# ----------------------------
-mp_face_mesh = mp.solutions.face_mesh
-# refine_landmarks=True gives more accurate eyes/iris points
-face_mesh = mp_face_mesh.FaceMesh(
-    max_num_faces=1,
-    refine_landmarks=True,
-    min_detection_confidence=0.5,
-    min_tracking_confidence=0.5,
-)
-mp_drawing = mp.solutions.drawing_utils
-mp_styles = mp.solutions.drawing_styles
+# Capture in a separate process, frames shared through a zero-copy
+# shared-memory ring (see cv_module/frame_bus.py); overrides PIPELINED
+FRAME_BUS = False
+FRAME_BUS_SLOTS = 4
 
-# Eye landmarks (MediaPipe FaceMesh indices)
-# Using a consistent 6-point set per eye for classic EAR:
-RIGHT_EYE = [33, 160, 158, 133, 153, 144]   # p1,p2,p3,p4,p5,p6
-LEFT_EYE  = [362, 385, 387, 263, 373, 380]  # p1,p2,p3,p4,p5,p6
+# Downscaled / face-ROI inference (see cv_module/roi.py). Off until the EAR
+# error vs. full-resolution inference has been measured on recorded clips
+# with cv_module/bench_roi.py (must stay within roi.EAR_TOLERANCE)
+ROI_TRACKING = False
+INFER_SCALE = 0.5         # full-frame detection runs on a frame this much smaller
+ROI_CROP_SIZE = 256       # tracked face crop is resized to this square (pixels)
+ROI_REDETECT_EVERY = 30   # force a full-frame detection every N frames
 
-# ----------------------------
-# Utilities
-# ----------------------------
-def ensure_log_dir():
-    os.makedirs(LOG_DIR, exist_ok=True)
-    return os.path.join(LOG_DIR, LOG_FILE)
+# Adaptive inference rate (see cv_module/scheduler.py): run FaceMesh on every
+# Nth frame while eyes are clearly open, every frame near the close threshold
+ADAPTIVE_RATE = True
+ADAPTIVE_MAX_STRIDE = 3
+ADAPTIVE_MAX_SKIP_SECS = 0.1   # worst-case extra detection delay is this + one frame
 
-LOG_PATH = ensure_log_dir()
+# Per-frame telemetry (EAR, smoothed EAR, MAR, state) to the Parquet store
+RECORD_TELEMETRY = False
 
-def log_state(state: str):
-    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(f"{ts} | {state}\n")
+# Pre/post-event clip on every DROWSY transition from a rolling, downscaled
+# in-memory buffer (see cv_module/clip_recorder.py for memory / quality knobs)
+RECORD_CLIPS = True
 
-def play_beep():
-    if not _AUDIO_OK:
-        return
+# Logging: structured events go to data/logs/events.jsonl (log_module.event_sink)
+
+# ----------------------------
+# MediaPipe init (lazy)
+# ----------------------------
+_face_mesh = None
+_face_mesh_lock = threading.Lock()
+
+def create_face_mesh(static_image_mode=False):
+    """
+    New FaceMesh instance (one per thread / process that runs inference).
+    ``static_image_mode=True`` detects on every call instead of tracking
+    across calls, for inputs whose geometry changes between calls.
+    """
+    # --- Suppress noisy TF/MediaPipe logs (must precede the mediapipe import) ---
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
     try:
-        fs = 44100
-        duration = 0.45
-        t = np.linspace(0, duration, int(fs * duration), False)
-        wave = 0.4 * np.sin(2 * np.pi * 880 * t)  # 880 Hz, moderate volume
-        sd.play(wave, fs, blocking=True)
-    except Exception:
-        # Don’t crash if audio device is unavailable
+        import absl.logging
+        absl.logging.set_verbosity(absl.logging.ERROR)
+    except ImportError:
         pass
+    import mediapipe as mp
+
+    # refine_landmarks=True gives more accurate eyes/iris points
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+def get_face_mesh():
+    """Shared FaceMesh for the live detector, created on first call."""
+    global _face_mesh
+    with _face_mesh_lock:
+        if _face_mesh is None:
+            _face_mesh = create_face_mesh()
+        return _face_mesh
+
+# Eye landmarks (MediaPipe FaceMesh indices) live in cv_module.metrics:
+# RIGHT_EYE / LEFT_EYE are the 6-point sets p1..p6 used for classic EAR.
 
-def eye_aspect_ratio(landmarks, eye_idx, w, h):
-    # EAR = (||p2-p6|| + ||p3-p5||) / (2 * ||p1-p4||)
-    pts = [(landmarks.landmark[i].x * w, landmarks.landmark[i].y * h) for i in eye_idx]
-    p1, p2, p3, p4, p5, p6 = [np.array(p) for p in pts]
-    num = np.linalg.norm(p2 - p6) + np.linalg.norm(p3 - p5)
-    den = 2.0 * np.linalg.norm(p1 - p4)
-    if den == 0:
-        return 0.0
-    return float(num / den)
-
-def draw_eye_points(frame, landmarks, eye_idx, color=(0, 255, 255)):
-    h, w = frame.shape[:2]
-    for i in eye_idx:
-        x = int(landmarks.landmark[i].x * w)
-        y = int(landmarks.landmark[i].y * h)
-        cv2.circle(frame, (x, y), 2, color, -1)
+# ----------------------------
+# Utilities
+# ----------------------------
+def log_state(state: str, ear=None):
+    # Queued on the background event writer; no file I/O on the frame loop
+    get_event_sink().emit(STATE_EVENTS.get(state, state), ear=ear)
+
+def play_beep():
+    # 880 Hz alert, queued on the background audio service (never blocks)
+    play_alert_tone("beep")
+
+def default_on_event(event: str, now: float, ear: float):
+    """Live-mode transition handler: log the event and beep on drowsiness."""
+    m = get_metrics()
+    t = m.now()
+    log_state(event, ear)
+    if event == "Drowsiness detected":
+        play_beep()
+        m.inc("alerts")
+    m.lap("alert", t)
+
+def draw_eye_points(frame, pts, eye_idx, color=(0, 255, 255)):
+    # pts: (N, 3) pixel-space landmark array from landmarks_to_array
+    for x, y in pts[eye_idx, :2].astype(np.int32):
+        cv2.circle(frame, (int(x), int(y)), 2, color, -1)
 
 # ----------------------------
 # State machine
 # ----------------------------
 class DrowsinessFSM:
-    def __init__(self):
+    def __init__(self, on_event=default_on_event, close_th=None, open_th=None,
+                 smooth_n=None, hold_secs=None, smoother=None):
         self.state = "AWAKE"          # or "DROWSY"
-        self.close_start = None       # monotonic time when EAR first went below close threshold
-        self.ear_hist = deque(maxlen=SMOOTH_N)
-
-    def update(self, ear_value):
-        # Smooth EAR
-        self.ear_hist.append(ear_value)
-        smooth_ear = sum(self.ear_hist) / len(self.ear_hist)
-
-        now = monotonic()
+        self.close_start = None       # time when EAR first went below close threshold
+        # smoother: a filter from cv_module.filters or its name (default SMOOTH_FILTER)
+        if smoother is None or isinstance(smoother, str):
+            kind = smoother or SMOOTH_FILTER
+            params = {"n": smooth_n or SMOOTH_N} if kind == "sma" else {}
+            smoother = make_filter(kind, **params)
+        self.smoother = smoother
+        self.hold_secs = CLOSE_HOLD_SECS if hold_secs is None else hold_secs
+        self.set_thresholds(close_th, open_th)
+        # on_event(event, now, smooth_ear) is called on each transition; None disables
+        # side effects (headless / offline processing)
+        self.on_event = on_event
+
+    def set_thresholds(self, close_th=None, open_th=None):
+        """Hysteresis thresholds for this FSM (None = module default)."""
+        self.close_th = EAR_CLOSE_TH if close_th is None else close_th
+        self.open_th = EAR_OPEN_TH if open_th is None else open_th
+
+    def _emit(self, event, now, ear):
+        if self.on_event is not None:
+            self.on_event(event, now, ear)
+
+    def update(self, ear_value, now=None):
+        """
+        Feed one raw EAR sample. ``now`` is the sample time in seconds
+        (e.g. a video timestamp); defaults to ``monotonic()`` for live capture.
+        """
+        if now is None:
+            now = monotonic()
+
+        # Smooth EAR (O(1) per sample)
+        smooth_ear = self.smoother.update(ear_value, now)
 
         if self.state == "AWAKE":
             # detect potential close
-            if smooth_ear <= EAR_CLOSE_TH:
+            if smooth_ear <= self.close_th:
                 if self.close_start is None:
                     self.close_start = now
-                elif (now - self.close_start) >= CLOSE_HOLD_SECS:
+                elif (now - self.close_start) >= self.hold_secs:
                     self.state = "DROWSY"
                     self.close_start = None
-                    log_state("Drowsiness detected")
-                    play_beep()
+                    self._emit("Drowsiness detected", now, smooth_ear)
+            else:
+                # eyes reopened before the hold elapsed (e.g. a blink)
+                self.close_start = None
         else:  # DROWSY
             # only recover when clearly open (hysteresis)
-            if smooth_ear >= EAR_OPEN_TH:
+            if smooth_ear >= self.open_th:
                 self.state = "AWAKE"
-                log_state("Eyes open")
+                self._emit("Eyes open", now, smooth_ear)
 
         return smooth_ear, self.state
 
 # ----------------------------
-# Main
+# Frame stages
 # ----------------------------
-def run_drowsiness_detector():
-    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # CAP_DSHOW helps on Windows
-    if not cap.isOpened():
-        print("ERROR: Cannot open camera.")
-        return
-
-    fsm = DrowsinessFSM()
+def analyze_frame(frame, fsm, pts=None, tracker=None, telemetry=None, face_mesh=None,
+                  calibrator=None, now=None, metrics=None):
+    """
+    Inference stage: FaceMesh + EAR + FSM update for one BGR frame.
+
+    ``pts`` is an optional (N, 3) buffer to reuse; only pass one when the
+    result is consumed before the next frame is analyzed (serial loop).
+    With a ``FaceROITracker`` inference runs downscaled / on the tracked
+    face crop; landmarks still come back in original-frame pixels.
+    ``telemetry`` (a ``TelemetryRecorder``) receives one row per face frame.
+    ``face_mesh`` overrides the shared instance (one per camera stream).
+    ``calibrator`` (an ``EARCalibrator``) sees every raw EAR sample and
+    retunes the FSM thresholds for the current driver during its
+    calibration phase.
+    ``now`` is the frame time fed to the FSM (default ``monotonic()``; the
+    replay harness passes virtual time). Stage timers ("convert",
+    "facemesh", "ear", "fsm") go to ``metrics`` (default ``get_metrics()``).
+    Returns a dict consumed by ``render_frame``.
+    """
+    m = metrics or get_metrics()
+    t = m.now()
+    if tracker is not None:
+        pts = tracker.process(frame, out=pts)
+    else:
+        h, w = frame.shape[:2]
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        t = m.lap("convert", t)
+        results = (face_mesh or get_face_mesh()).process(rgb)
+        if results.multi_face_landmarks:
+            pts = landmarks_to_array(results.multi_face_landmarks[0], w, h, out=pts)
+        else:
+            pts = None
+    t = m.lap("facemesh", t)
+
+    if pts is None:
+        # No face detected → reset pending close timer
+        fsm.close_start = None
+        m.inc("face_lost")
+        return {"face": False}
+
+    # Compute EAR both eyes in one vectorized pass and average
+    ear_avg = float(eye_aspect_ratios(pts).mean())
+    t = m.lap("ear", t)
+
+    if calibrator is not None:
+        calibrator.update(ear_avg, fsm)
+
+    # Update FSM
+    smooth_ear, state = fsm.update(ear_avg, now)
+    m.lap("fsm", t)
+    if telemetry is not None:
+        telemetry.record(time.time(), ear_avg, smooth_ear,
+                         float(mouth_aspect_ratio(pts)), state)
+    return {"face": True, "pts": pts, "ear": ear_avg,
+            "smooth_ear": smooth_ear, "state": state}
+
+def render_frame(frame, res):
+    """Render stage: draw overlays and HUD for an ``analyze_frame`` result."""
+    if not res["face"]:
+        cv2.putText(frame, "No face detected", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        return frame
+
+    # Draw overlays
+    if DRAW_LANDMARKS:
+        draw_eye_points(frame, res["pts"], RIGHT_EYE, (0, 255, 255))
+        draw_eye_points(frame, res["pts"], LEFT_EYE,  (0, 255, 255))
+
+    # HUD
+    cv2.putText(frame, f"EAR(raw): {res['ear']:.3f}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+    cv2.putText(frame, f"EAR(smooth): {res['smooth_ear']:.3f}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+    cv2.putText(frame, f"State: {res['state']}", (10, 90),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 2)
+
+    if res.get("stride", 1) > 1:
+        cv2.putText(frame, f"Rate: 1/{res['stride']}", (10, 115),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+
+    if res["state"] == "DROWSY":
+        cv2.putText(frame, "DROWSY ALERT!", (10, 140),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 255), 3)
+    return frame
+
+def _show(frame):
+    """Display a frame; returns False when the user asked to quit."""
+    cv2.imshow("Drowsiness Detector", frame)
+    key = cv2.waitKey(1) & 0xFF
+    return not (key == ord("q") or key == 27)
 
+# ----------------------------
+# Main
+# ----------------------------
+def make_tracker():
+    """ROI tracker configured from the settings above, or None when disabled."""
+    if not ROI_TRACKING:
+        return None
+    return FaceROITracker(get_face_mesh(), crop_mesh=create_face_mesh(static_image_mode=True),
+                          scale=INFER_SCALE, crop_size=ROI_CROP_SIZE,
+                          redetect_every=ROI_REDETECT_EVERY)
+
+def make_scheduler():
+    """Adaptive inference-rate scheduler, or None when ADAPTIVE_RATE is off."""
+    if not ADAPTIVE_RATE:
+        return None
+    from cv_module.scheduler import AdaptiveInferenceScheduler
+    return AdaptiveInferenceScheduler(max_stride=ADAPTIVE_MAX_STRIDE,
+                                      max_skip_secs=ADAPTIVE_MAX_SKIP_SECS)
+
+def make_calibrator(fsm, driver_id=DRIVER_ID):
+    """EARCalibrator for ``driver_id`` with its stored profile applied, or None."""
+    if driver_id is None:
+        return None
+    from cv_module.calibration import EARCalibrator
+    calibrator = EARCalibrator(driver_id)
+    calibrator.apply(fsm)
+    return calibrator
+
+def make_recorder():
+    """Rolling pre/post-event clip recorder, or None when RECORD_CLIPS is off."""
+    if not RECORD_CLIPS:
+        return None
+    from cv_module.clip_recorder import ClipRecorder
+    return ClipRecorder()
+
+def make_analyzer(fsm, tracker=None, telemetry=None, scheduler=None, calibrator=None,
+                  recorder=None, face_mesh=None, clock=monotonic, metrics=None):
+    """
+    ``analyze(frame, pts=None)`` for the loops below. With a scheduler, frames
+    it skips reuse the previous result (flagged ``skipped``) instead of
+    running FaceMesh. With a ``ClipRecorder`` every frame is buffered and a
+    transition into DROWSY triggers a clip (its name is in ``res["clip"]``).
+    ``clock()`` times the scheduler and the FSM (virtual time in replays);
+    ``metrics`` receives the counters and stage timers (default
+    ``get_metrics()``).
+    """
+    last = {"face": False}
+    m = metrics or get_metrics()
+
+    def analyze(frame, pts=None):
+        nonlocal last
+        m.inc("frames")
+        if recorder is not None:
+            recorder.add(frame)
+        now = clock()
+        if scheduler is not None and not scheduler.should_infer(now):
+            m.inc("frames_skipped")
+            return {**last, "skipped": True}
+        was_drowsy = fsm.state == "DROWSY"
+        res = analyze_frame(frame, fsm, pts, tracker, telemetry, face_mesh, calibrator, now, m)
+        if scheduler is not None:
+            scheduler.observe(res.get("smooth_ear"), fsm, res["face"], res.get("ear"))
+            res["stride"] = scheduler.stride
+        if recorder is not None and not was_drowsy and fsm.state == "DROWSY":
+            res["clip"] = recorder.trigger("drowsy")
+        last = res
+        return res
+
+    return analyze
+
+def _run_serial(cap, analyze):
+    m = get_metrics()
+    pts = None  # reused (N, 3) landmark buffer
     while True:
+        t = m.now()
         ok, frame = cap.read()
         if not ok:
             break
-
-        # Improve stability: process a smaller image for speed, keep original for draw
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb)
-
-        ear_avg = None
-        if results.multi_face_landmarks:
-            face = results.multi_face_landmarks[0]
-
-            # Compute EAR both eyes and average
-            h, w = frame.shape[:2]
-            ear_r = eye_aspect_ratio(face, RIGHT_EYE, w, h)
-            ear_l = eye_aspect_ratio(face, LEFT_EYE,  w, h)
-            ear_avg = (ear_r + ear_l) / 2.0
-
-            # Update FSM
-            smooth_ear, state = fsm.update(ear_avg)
-
-            # Draw overlays
-            if DRAW_LANDMARKS:
-                draw_eye_points(frame, face, RIGHT_EYE, (0, 255, 255))
-                draw_eye_points(frame, face, LEFT_EYE,  (0, 255, 255))
-
-            # HUD
-            cv2.putText(frame, f"EAR(raw): {ear_avg:.3f}", (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-            cv2.putText(frame, f"EAR(smooth): {smooth_ear:.3f}", (10, 60),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-            cv2.putText(frame, f"State: {state}", (10, 90),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 200, 255), 2)
-
-            if state == "DROWSY":
-                cv2.putText(frame, "DROWSY ALERT!", (10, 140),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 255), 3)
-
-        else:
-            # No face detected → reset pending close timer
-            fsm.close_start = None
-            cv2.putText(frame, "No face detected", (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-
-        cv2.imshow("Drowsiness Detector", frame)
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord("q") or key == 27:
+        m.lap("capture", t)
+
+        res = analyze(frame, pts)
+        pts = res.get("pts", pts)
+        t = m.now()
+        shown = _show(render_frame(frame, res))
+        m.lap("render", t)
+        if not shown:
             break
 
-    cap.release()
-    cv2.destroyAllWindows()
+def _run_pipelined(cap, analyze, queue_size):
+    m = get_metrics()
+    pipe = FramePipeline(cap, analyze, queue_size=queue_size).start()
+    try:
+        for frame, res in pipe.frames():
+            t = m.now()
+            render_frame(frame, res)
+            if SHOW_PIPELINE_STATS:
+                st = pipe.stats()
+                cv2.putText(frame,
+                            f"cap {st['capture']['avg_latency_ms']:.0f}ms "
+                            f"q{st['capture']['queue_depth']} | "
+                            f"inf {st['inference']['avg_latency_ms']:.0f}ms "
+                            f"q{st['inference']['queue_depth']} | "
+                            f"e2e {st['render']['avg_latency_ms']:.0f}ms",
+                            (10, frame.shape[0] - 15),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+            shown = _show(frame)
+            m.lap("render", t)
+            if not shown:
+                break
+    finally:
+        pipe.stop()
+    return pipe.stats()
+
+def _run_bus(source, analyze, slots=FRAME_BUS_SLOTS):
+    """
+    Capture runs in a child process writing into a shared-memory ring.
+    The newest slot is copied once and validated *before* analysis. The
+    FSM, calibrator, telemetry and clip recorder therefore only ever see a
+    frame that was not overwritten mid-read. The same copy is then drawn
+    on (the overlay must not draw into shared memory), so this costs no
+    more than rendering did.
+    """
+    from cv_module.frame_bus import CaptureProcess
+    m = get_metrics()
+    capture = CaptureProcess(source, slots).start()
+    reader = capture.reader()
+    try:
+        while True:
+            ref = reader.latest(timeout=2.0)
+            if ref is None:
+                break
+            skipped = reader.skipped
+            frame = ref.copy()
+            if frame is None:
+                # Capture lapped us during the copy: drop it before any state sees it
+                m.inc("frames_torn")
+                continue
+            res = analyze(frame)
+            t = m.now()
+            shown = _show(render_frame(frame, res))
+            m.lap("render", t)
+            if reader.skipped != skipped:
+                m.inc("frames_dropped", reader.skipped - skipped)
+            if not shown:
+                break
+    finally:
+        stats = {"received": reader.received, "skipped": reader.skipped}
+        reader.close()
+        capture.stop()
+    return stats
+
+def run_drowsiness_detector(pipelined=PIPELINED, queue_size=PIPELINE_QUEUE_SIZE,
+                            driver_id=DRIVER_ID, smoothing=SMOOTH_FILTER,
+                            frame_bus=FRAME_BUS, source=0):
+    """
+    Run the webcam detector.
+
+    pipelined=True runs capture and inference on background threads joined by
+    bounded drop-oldest queues (always the freshest frame); pipelined=False is
+    the original serial read → process → draw loop. frame_bus=True captures
+    ``source`` in a child process and shares frames through shared memory.
+    With a ``driver_id`` the driver's calibrated thresholds are loaded and
+    refined during the calibration phase at session start, then saved on exit. ``smoothing`` picks the
+    EAR filter (see cv_module/filters.py).
+    Returns per-stage pipeline stats in pipelined mode, frame counts in bus
+    mode, else None.
+    """
+    start_metrics_from_env()   # no-op unless DSA_METRICS_PORT / DSA_METRICS_LOG_SECS are set
+    cap = None
+    if not frame_bus:
+        cap = cv2.VideoCapture(source, cv2.CAP_DSHOW)  # CAP_DSHOW helps on Windows
+        if not cap.isOpened():
+            print("ERROR: Cannot open camera.")
+            return None
+
+    fsm = DrowsinessFSM(smoother=smoothing)
+    tracker = make_tracker()
+    telemetry = None
+    if RECORD_TELEMETRY:
+        from log_module.columnar_store import TelemetryRecorder
+        telemetry = TelemetryRecorder(driver=driver_id)
+    calibrator = make_calibrator(fsm, driver_id)
+    if calibrator is not None:
+        status = "profile loaded" if calibrator.calibrated else "calibrating, keep eyes open"
+        print(f"👤 Driver {driver_id}: {status} (close {fsm.close_th:.3f} / open {fsm.open_th:.3f})")
+    recorder = make_recorder()
+    analyze = make_analyzer(fsm, tracker, telemetry, make_scheduler(), calibrator, recorder)
+    stats = None
+    try:
+        if frame_bus:
+            stats = _run_bus(source, analyze)
+        elif pipelined:
+            stats = _run_pipelined(cap, analyze, queue_size)
+        else:
+            _run_serial(cap, analyze)
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+        if calibrator is not None:
+            calibrator.close()
+        if recorder is not None:
+            recorder.close()
+            print("🎬 Clips:", recorder.stats())
+        if cap is not None:
+            cap.release()
+        cv2.destroyAllWindows()
+    return stats
 
 # ----------------------------
 # Entry
 # ----------------------------
 if __name__ == "__main__":
-    run_drowsiness_detector()
+    import argparse
+    parser = argparse.ArgumentParser(description="Webcam drowsiness detector")
+    parser.add_argument("--serial", action="store_true",
+                        help="use the single-threaded read/process/draw loop")
+    parser.add_argument("--bus", action="store_true", default=FRAME_BUS,
+                        help="capture in a separate process via the shared-memory frame bus")
+    parser.add_argument("--driver", default=DRIVER_ID,
+                        help="driver ID for per-driver threshold calibration")
+    parser.add_argument("--filter", default=SMOOTH_FILTER, choices=sorted(FILTERS),
+                        help="EAR smoothing filter")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-log", type=float, default=None, metavar="SECS",
+                        help="print a compact metrics line every SECS seconds")
+    args = parser.parse_args()
+    if args.metrics_port or args.metrics_log:
+        start_metrics(port=args.metrics_port, log_every=args.metrics_log)
+    stats = run_drowsiness_detector(pipelined=not args.serial, driver_id=args.driver,
+                                    smoothing=args.filter, frame_bus=args.bus)
+    if stats:
+        print("Pipeline stats:", stats)
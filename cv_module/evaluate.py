@@ -0,0 +1,576 @@
+# cv_module/evaluate.py
+"""
+Accuracy evaluation and parameter sweeps over annotated recordings.
+
+    python -m cv_module.evaluate footage/ --labels labels.csv --workers 8
+    python -m cv_module.evaluate footage/ --labels labels.csv --grid grid.json --top 20
+    python -m cv_module.evaluate footage/ --labels labels.csv --extract-only --roi
+
+Labels are a CSV with ``file,start_sec,end_sec`` rows: one row per
+annotated drowsy episode, in video seconds. Videos without rows are
+negatives. This is the same layout as batch_process.py's
+``*_episodes.csv``, so reviewed batch output can be fed straight back.
+
+Two phases:
+
+1. **Extract** (once per video). FaceMesh runs over every frame in a
+   process pool, one FaceMesh per worker. The per-frame timestamps, the
+   ``SIGNAL_IDX`` landmarks and the signals (EAR right/left, MAR, pitch)
+   go to ``data/eval_cache/<video>-<key>.npz``. The key covers the path,
+   size, mtime and ROI settings, so later runs read the cache and never
+   re-run FaceMesh.
+2. **Sweep**. Every combination of smoothing filter x ``close_th`` x
+   ``open_th`` x ``hold_secs`` from the grid is scored with
+   ``DrowsinessFSM`` logic, vectorized over the cached series:
+
+   * every recording is smoothed once per filter (``filter.batch``), per
+     worker;
+   * per ``close_th``, closed runs and their start indices come from
+     array ops. A run also restarts after a face-loss gap, like
+     ``analyze_frame`` does;
+   * per ``hold_secs``, the samples where the hold has elapsed, and per
+     ``open_th``, the recovery samples, are index arrays;
+   * episodes are then a few ``searchsorted`` calls per alert. The cost is
+     O(alerts), not O(frames).
+
+   Tasks (one filter x ``close_th`` each) are spread over a process pool.
+   Each worker loads the cache once.
+
+Alerts are matched to labels with ``MATCH_SLACK_SECS`` of slack either
+side. Per combination the sweep reports:
+
+* precision: alerts inside a labelled episode / all alerts
+* recall: labelled episodes with an alert / all labelled episodes
+* F1 and false alerts per hour
+* detection latency: first alert minus label start (mean / p50 / p90)
+
+The results are written to ``--out`` (CSV) and the best ``--top`` rows
+are printed next to the current module settings. ``--verify N`` replays N
+random combinations through the real ``DrowsinessFSM`` and checks that the
+episodes match exactly.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+
+from cv_module.filters import make_filter
+from cv_module.metrics import SIGNAL_IDX, SIGNALS, gathered_signals
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "eval_cache")
+OUT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "eval", "sweep.csv")
+VIDEO_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm"}
+
+MATCH_SLACK_SECS = 1.0        # alert may fire this early / late around a label
+VIDEO_GAP_SECS = 60.0         # spacing between recordings on the joint timeline
+
+# Default grid (override with --grid JSON using the same keys)
+SWEEP_FILTERS = (
+    [("sma", {"n": n}) for n in (1, 3, 5, 7, 9, 15)]
+    + [("ema", {"alpha": a}) for a in (0.2, 0.3, 0.4, 0.6)]
+    + [("kalman", {}), ("kalman", {"q": 1e-3})]
+    + [("euro", {}), ("euro", {"min_cutoff": 0.8})]
+)
+SWEEP_CLOSE_TH = [round(x, 3) for x in np.arange(0.17, 0.275, 0.01)]
+SWEEP_OPEN_TH = [round(x, 3) for x in np.arange(0.20, 0.325, 0.01)]
+SWEEP_HOLD_SECS = [0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0, 1.2, 1.5, 2.0]
+
+RESULT_COLUMNS = ["filter", "params", "close_th", "open_th", "hold_secs",
+                  "alerts", "tp", "fp", "fn", "precision", "recall", "f1",
+                  "false_per_hour", "latency_mean", "latency_p50", "latency_p90"]
+
+
+# ----------------------------
+# Extraction (FaceMesh, once per video)
+# ----------------------------
+def find_videos(inputs):
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            yield from sorted(f for f in p.rglob("*") if f.suffix.lower() in VIDEO_EXTS)
+        elif p.is_file():
+            yield p
+
+
+def cache_path(video, cache_dir=CACHE_DIR, use_roi=False, scale=0.5):
+    """Cache file for ``video``; the name changes when the file or ROI settings do."""
+    st = os.stat(video)
+    key = f"{os.path.abspath(video)}|{st.st_size}|{st.st_mtime_ns}|{use_roi}|{scale}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{Path(video).stem}-{digest}.npz")
+
+
+def save_series(path, ts, landmarks, source="", fps=0.0):
+    """
+    Write one recording's cache. ``landmarks`` is (frames, len(SIGNAL_IDX), 3)
+    with NaN rows where no face was found.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    face = ~np.isnan(landmarks[:, 0, 0])
+    signals = np.full((len(landmarks), len(SIGNALS)), np.nan, dtype=np.float32)
+    if face.any():
+        signals[face] = gathered_signals(landmarks[face])
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path[:-len(".npz")] + ".part.npz"
+    np.savez(tmp, ts=np.asarray(ts, dtype=np.float64), face=face, signals=signals,
+             landmarks=landmarks, fps=float(fps), source=str(source))
+    os.replace(tmp, path)
+    return path
+
+
+def load_series(path):
+    """Cached recording as a dict of arrays (``ts``, ``face``, ``signals``, ...)."""
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files}
+
+
+def synthetic_landmarks(ear):
+    """(frames, len(SIGNAL_IDX), 3) landmarks whose EAR is ``ear`` (NaN = no face)."""
+    from cv_module.replay import synthetic_face
+    ear = np.asarray(ear, dtype=np.float64)
+    out = np.full((len(ear), len(SIGNAL_IDX), 3), np.nan, dtype=np.float32)
+    pts = None
+    for i, e in enumerate(ear.tolist()):
+        if e == e:
+            pts = synthetic_face(e, out=pts)
+            out[i] = pts[SIGNAL_IDX]
+    return out
+
+
+_worker = {}
+
+
+def _init_extractor(use_roi, scale):
+    from cv_module.drowsiness_detector import create_face_mesh
+    from cv_module.roi import FaceROITracker
+    mesh = create_face_mesh()
+    _worker["mesh"] = mesh
+    _worker["tracker"] = FaceROITracker(mesh, scale=scale) if use_roi else None
+
+
+def extract_video(video, out_path):
+    """Run FaceMesh over every frame of ``video`` and cache the series."""
+    import cv2
+    from cv_module.metrics import landmarks_to_array
+
+    t0 = perf_counter()
+    cap = cv2.VideoCapture(str(video))
+    if not cap.isOpened():
+        raise OSError(f"cannot open {video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    tracker = _worker["tracker"]
+    if tracker is not None:
+        tracker.reset()
+    ts, rows = [], []
+    nan_row = np.full((len(SIGNAL_IDX), 3), np.nan, dtype=np.float32)
+    pts = None
+    idx = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            ts.append(t if t > 0 or idx == 0 else idx / fps)
+            idx += 1
+            if tracker is not None:
+                pts = tracker.process(frame, out=pts)
+            else:
+                h, w = frame.shape[:2]
+                res = _worker["mesh"].process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                pts = (landmarks_to_array(res.multi_face_landmarks[0], w, h, out=pts)
+                       if res.multi_face_landmarks else None)
+            rows.append(nan_row if pts is None else pts[SIGNAL_IDX])
+    finally:
+        cap.release()
+    save_series(out_path, ts, np.stack(rows) if rows else np.empty((0, len(SIGNAL_IDX), 3)),
+                source=str(video), fps=fps)
+    return str(video), idx, perf_counter() - t0
+
+
+def ensure_cache(videos, cache_dir=CACHE_DIR, workers=None, use_roi=False, scale=0.5):
+    """Cache paths for ``videos``, extracting the ones not cached yet in parallel."""
+    paths = {str(v): cache_path(v, cache_dir, use_roi, scale) for v in videos}
+    todo = [(v, p) for v, p in paths.items() if not os.path.exists(p)]
+    if todo:
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        print(f"🎞️ Extracting {len(todo)} video(s) on {workers} worker(s) "
+              f"({len(paths) - len(todo)} cached)")
+        t0 = perf_counter()
+        frames = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_extractor,
+                                 initargs=(use_roi, scale)) as pool:
+            for video, n, secs in pool.map(extract_video, *zip(*todo)):
+                frames += n
+                print(f"  {video}: {n} frames ({n / secs:.1f} fps)")
+        print(f"✅ Extracted {frames} frames in {perf_counter() - t0:.1f}s")
+    return paths
+
+
+def load_labels(path):
+    """``{video stem: [(start, end), ...]}`` from a ``file,start_sec,end_sec`` CSV."""
+    import pandas as pd
+    df = pd.read_csv(path)
+    labels = {}
+    for row in df.dropna(subset=["start_sec", "end_sec"]).itertuples(index=False):
+        labels.setdefault(Path(str(row.file)).stem, []).append((float(row.start_sec),
+                                                                 float(row.end_sec)))
+    return {k: sorted(v) for k, v in labels.items()}
+
+
+# ----------------------------
+# Dataset: all recordings on one timeline
+# ----------------------------
+class Dataset:
+    """
+    Face samples of all recordings, concatenated for vectorized scoring.
+
+    Each recording keeps its own timestamps (``t_local``, fed to the filters
+    and the hold timer exactly like the live FSM gets them). It is also
+    shifted onto a joint timeline (``t``) for matching against the labels,
+    which are shifted the same way.
+    """
+
+    def __init__(self, series, labels):
+        t, t_local, ear, brk, starts, ends, lab = [], [], [], [], [], [], []
+        offset = 0.0
+        n = 0
+        self.names = []
+        self.hours = 0.0
+        for name, s in series:
+            ts = np.asarray(s["ts"], dtype=np.float64)
+            face = np.asarray(s["face"], dtype=bool)
+            if not len(ts):
+                continue
+            sig = s["signals"]
+            idx = np.flatnonzero(face)
+            gap = np.ones(len(idx), dtype=bool)          # a sample after lost frames
+            gap[1:] = np.diff(idx) > 1
+            t_local.append(ts[idx])
+            t.append(ts[idx] + offset)
+            ear.append(sig[idx, :2].astype(np.float64).mean(axis=1))
+            brk.append(gap)
+            starts.append(n)
+            ends.append(ts[-1] + offset)                  # episode still open at the end
+            lab += [(a + offset, b + offset) for a, b in labels.get(name, [])]
+            self.names.append(name)
+            self.hours += (ts[-1] - ts[0]) / 3600.0
+            n += len(idx)
+            offset += ts[-1] + VIDEO_GAP_SECS
+        cat = lambda xs, dt: np.concatenate(xs).astype(dt) if xs else np.empty(0, dt)
+        self.t = cat(t, np.float64)
+        self.t_local = cat(t_local, np.float64)
+        self.ear = cat(ear, np.float64)
+        self.brk = cat(brk, bool)
+        self.starts = np.asarray(starts, dtype=np.intp)  # first face sample per recording
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self._bounds = np.append(self.starts, n)
+        lab = sorted(lab)
+        self.label_start = np.array([a for a, _ in lab], dtype=np.float64)
+        self.label_end = np.array([b for _, b in lab], dtype=np.float64)
+
+    @classmethod
+    def from_cache(cls, paths, labels):
+        """``paths`` maps a video path to its cache file."""
+        return cls([(Path(v).stem, load_series(p)) for v, p in paths.items()], labels)
+
+    def smooth(self, kind, params):
+        """Filtered EAR, each recording through a fresh filter."""
+        out = np.empty_like(self.ear)
+        b = self._bounds
+        for i in range(len(self.starts)):
+            lo, hi = b[i], b[i + 1]
+            out[lo:hi] = make_filter(kind, **params).batch(self.ear[lo:hi], self.t_local[lo:hi])
+        return out
+
+
+# ----------------------------
+# Vectorized FSM
+# ----------------------------
+def closed_runs(data, smooth, close_th):
+    """(closed mask, run start index per sample) for ``smooth <= close_th``."""
+    closed = smooth <= close_th
+    start = closed.copy()
+    start[1:] &= data.brk[1:] | ~closed[:-1]
+    idx = np.arange(len(smooth))
+    run_start = np.maximum.accumulate(np.where(start, idx, 0))
+    return closed, run_start
+
+
+def hold_fires(data, closed, run_start, hold_secs):
+    """
+    Samples where an AWAKE FSM goes DROWSY if it gets there: closed since
+    ``run_start`` for at least ``hold_secs`` (and not the run's first sample).
+    """
+    idx = np.arange(len(closed))
+    elapsed = data.t_local - data.t_local[run_start]
+    return np.flatnonzero(closed & (idx > run_start) & (elapsed >= hold_secs))
+
+
+def episodes(data, fires, opens):
+    """
+    Walk AWAKE -> DROWSY -> AWAKE over the candidate index arrays.
+    ``fires`` from ``hold_fires``, ``opens`` = indices with smooth >= open_th.
+    Returns (alert times, recovery times) on the joint timeline.
+    """
+    alerts, recoveries = [], []
+    starts, t = data.starts, data.t
+    nf, no, ns = len(fires), len(opens), len(starts)
+    pos = 0
+    while True:
+        k = int(np.searchsorted(fires, pos))
+        if k == nf:
+            break
+        a = int(fires[k])
+        j = int(np.searchsorted(opens, a + 1))
+        r = int(opens[j]) if j < no else None
+        v = int(np.searchsorted(starts, a, "right"))      # next recording
+        nxt = int(starts[v]) if v < ns else None
+        alerts.append(t[a])
+        if r is not None and (nxt is None or r < nxt):
+            recoveries.append(t[r])
+            pos = r + 1
+        else:
+            recoveries.append(data.ends[v - 1])           # still DROWSY when it ended
+            if nxt is None:
+                break
+            pos = nxt
+    return np.asarray(alerts, dtype=np.float64), np.asarray(recoveries, dtype=np.float64)
+
+
+def score(data, alerts, slack=MATCH_SLACK_SECS):
+    """Precision / recall / latency of ``alerts`` against the dataset labels."""
+    n_alerts, n_labels = len(alerts), len(data.label_start)
+    k = np.searchsorted(data.label_start - slack, alerts, "right") - 1
+    if n_labels:
+        hit = (k >= 0) & (alerts <= data.label_end[np.maximum(k, 0)] + slack)
+    else:
+        hit = np.zeros(n_alerts, dtype=bool)
+    tp = int(hit.sum()) if n_alerts else 0
+    detected, first = np.unique(k[hit], return_index=True) if tp else (np.empty(0, int), [])
+    latency = alerts[hit][first] - data.label_start[detected] if tp else np.empty(0)
+    precision = tp / n_alerts if n_alerts else float("nan")
+    recall = len(detected) / n_labels if n_labels else float("nan")
+    f1 = (2 * precision * recall / (precision + recall)
+          if n_alerts and n_labels and precision + recall else 0.0)
+    lat = np.percentile(latency, [50, 90]) if len(latency) else (float("nan"),) * 2
+    return {
+        "alerts": n_alerts,
+        "tp": tp,
+        "fp": n_alerts - tp,
+        "fn": n_labels - len(detected),
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "false_per_hour": (n_alerts - tp) / data.hours if data.hours else float("nan"),
+        "latency_mean": float(latency.mean()) if len(latency) else float("nan"),
+        "latency_p50": float(lat[0]),
+        "latency_p90": float(lat[1]),
+    }
+
+
+def sweep_task(data, kind, params, close_th, open_ths, hold_secs, smooth=None):
+    """Score one filter x ``close_th`` against every open_th / hold_secs."""
+    if smooth is None:
+        smooth = data.smooth(kind, params)
+    closed, run_start = closed_runs(data, smooth, close_th)
+    opens = {o: np.flatnonzero(smooth >= o) for o in open_ths if o > close_th}
+    rows = []
+    for hold in hold_secs:
+        fires = hold_fires(data, closed, run_start, hold)
+        for open_th, op in opens.items():
+            alerts, _ = episodes(data, fires, op)
+            rows.append({"filter": kind, "params": json.dumps(params, sort_keys=True),
+                         "close_th": close_th, "open_th": open_th, "hold_secs": hold,
+                         **score(data, alerts)})
+    return rows
+
+
+# ----------------------------
+# Reference: the live FSM, sample by sample
+# ----------------------------
+def fsm_episodes(data, kind, params, close_th, open_th, hold_secs):
+    """Episodes from ``DrowsinessFSM`` itself (for ``--verify`` / the bench)."""
+    from cv_module.drowsiness_detector import DrowsinessFSM
+    alerts, recoveries = [], []
+    b = data._bounds
+    for i in range(len(data.starts)):
+        events = []
+        fsm = DrowsinessFSM(on_event=lambda e, now, ear: events.append((e, now)),
+                            close_th=close_th, open_th=open_th, hold_secs=hold_secs,
+                            smoother=make_filter(kind, **params))
+        offset = data.t[b[i]] - data.t_local[b[i]] if b[i + 1] > b[i] else 0.0
+        for j in range(b[i], b[i + 1]):
+            if data.brk[j]:
+                fsm.close_start = None                    # frames without a face before j
+            fsm.update(data.ear[j], data.t_local[j])
+        for e, now in events:
+            (alerts if e == "Drowsiness detected" else recoveries).append(now + offset)
+        if len(recoveries) < len(alerts):
+            recoveries.append(data.ends[i])
+    return np.asarray(alerts), np.asarray(recoveries)
+
+
+def verify(data, grid, n=20, seed=0):
+    """Failure messages for random combinations where vectorized != live FSM."""
+    rng = np.random.default_rng(seed)
+    failures = []
+    combos = [c for c in itertools.product(grid["filters"], grid["close_th"], grid["open_th"],
+                                           grid["hold_secs"]) if c[2] > c[1]]
+    for i in rng.choice(len(combos), size=min(n, len(combos)), replace=False):
+        (kind, params), close_th, open_th, hold = combos[i]
+        smooth = data.smooth(kind, params)
+        closed, run_start = closed_runs(data, smooth, close_th)
+        got = episodes(data, hold_fires(data, closed, run_start, hold),
+                       np.flatnonzero(smooth >= open_th))
+        want = fsm_episodes(data, kind, params, close_th, open_th, hold)
+        if not all(len(g) == len(w) and np.allclose(g, w) for g, w in zip(got, want)):
+            failures.append(f"{kind} {params} close {close_th} open {open_th} hold {hold}: "
+                            f"{len(got[0])} vs {len(want[0])} episodes")
+    return failures
+
+
+# ----------------------------
+# Sweep driver
+# ----------------------------
+def _init_sweeper(data):
+    _worker["data"] = data
+    _worker["smooth"] = {}
+
+
+def _run_task(task):
+    kind, params, close_th, open_ths, hold_secs = task
+    data = _worker["data"]
+    key = (kind, json.dumps(params, sort_keys=True))
+    cache = _worker["smooth"]
+    if key not in cache:
+        cache.clear()                                     # tasks arrive grouped by filter
+        cache[key] = data.smooth(kind, params)
+    return sweep_task(data, kind, params, close_th, open_ths, hold_secs, cache[key])
+
+
+def current_settings():
+    """The detector's module settings as one grid point."""
+    from cv_module import drowsiness_detector as dd
+    params = {"n": dd.SMOOTH_N} if dd.SMOOTH_FILTER == "sma" else {}
+    return (dd.SMOOTH_FILTER, params), dd.EAR_CLOSE_TH, dd.EAR_OPEN_TH, dd.CLOSE_HOLD_SECS
+
+
+def default_grid():
+    return {"filters": list(SWEEP_FILTERS), "close_th": list(SWEEP_CLOSE_TH),
+            "open_th": list(SWEEP_OPEN_TH), "hold_secs": list(SWEEP_HOLD_SECS)}
+
+
+def load_grid(path=None):
+    """Default grid, overridden key by key from a JSON file; always holds the current settings."""
+    grid = default_grid()
+    if path:
+        with open(path, encoding="utf-8") as f:
+            grid.update(json.load(f))
+    grid["filters"] = [(k, dict(p or {})) for k, p in grid["filters"]]
+    (kind, params), close_th, open_th, hold = current_settings()
+    for key, value in (("filters", (kind, params)), ("close_th", close_th),
+                       ("open_th", open_th), ("hold_secs", hold)):
+        if value not in grid[key]:
+            grid[key].append(value)
+    return grid
+
+
+def run_sweep(data, grid, workers=None):
+    """DataFrame of ``RESULT_COLUMNS`` for every valid grid combination."""
+    import pandas as pd
+    tasks = [(kind, params, close_th, sorted(grid["open_th"]), sorted(grid["hold_secs"]))
+             for kind, params in grid["filters"] for close_th in sorted(grid["close_th"])]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_sweeper(data)
+        results = map(_run_task, tasks)
+        rows = [r for rs in results for r in rs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweeper,
+                                 initargs=(data,)) as pool:
+            chunk = max(1, len(tasks) // (4 * workers))
+            rows = [r for rs in pool.map(_run_task, tasks, chunksize=chunk) for r in rs]
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def rank(df, objective="f1"):
+    """Best first: ``objective`` descending, then lower latency / fewer false alerts."""
+    return df.sort_values([objective, "latency_mean", "false_per_hour"],
+                          ascending=[False, True, True], na_position="last")
+
+
+def _fmt(row):
+    return (f"{row['filter']:<6} {row['params']:<22} close {row['close_th']:.3f} "
+            f"open {row['open_th']:.3f} hold {row['hold_secs']:.2f}s | "
+            f"P {row['precision']:.3f} R {row['recall']:.3f} F1 {row['f1']:.3f} | "
+            f"{row['false_per_hour']:.2f} false/h | latency {row['latency_mean']:.2f}s "
+            f"(p90 {row['latency_p90']:.2f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="video files or directories")
+    parser.add_argument("--labels", required=True, help="CSV with file,start_sec,end_sec rows")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--grid", help="JSON overriding filters / close_th / open_th / hold_secs")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--roi", action="store_true", help="extract with downscaled ROI-tracked inference")
+    parser.add_argument("--scale", type=float, default=0.5, help="downscale for --roi detection")
+    parser.add_argument("--extract-only", action="store_true")
+    parser.add_argument("--objective", default="f1", choices=["f1", "precision", "recall"])
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", default=OUT_PATH, help="results CSV")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="check N random combinations against the live FSM")
+    args = parser.parse_args(argv)
+
+    videos = list(find_videos(args.inputs))
+    if not videos:
+        print("⚠️ No video files found.")
+        return 1
+    paths = ensure_cache(videos, args.cache_dir, args.workers, args.roi, args.scale)
+    if args.extract_only:
+        return 0
+
+    data = Dataset.from_cache(paths, load_labels(args.labels))
+    grid = load_grid(args.grid)
+    if args.verify:
+        failures = verify(data, grid, args.verify)
+        for f in failures:
+            print(f"❌ {f}")
+        if failures:
+            return 1
+        print(f"✅ Vectorized FSM matches DrowsinessFSM on {args.verify} random combinations")
+
+    t0 = perf_counter()
+    df = run_sweep(data, grid, args.workers)
+    wall = perf_counter() - t0
+    print(f"📊 {len(df)} combinations over {len(data.names)} recordings "
+          f"({data.hours:.2f} h, {len(data.label_start)} labelled episodes) in {wall:.1f}s "
+          f"→ {len(df) / wall:.0f} combinations/s")
+
+    ranked = rank(df, args.objective)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    ranked.to_csv(args.out, index=False)
+    (kind, params), close_th, open_th, hold = current_settings()
+    cur = df[(df["filter"] == kind) & (df["params"] == json.dumps(params, sort_keys=True))
+             & np.isclose(df["close_th"], close_th) & np.isclose(df["open_th"], open_th)
+             & np.isclose(df["hold_secs"], hold)]
+    if len(cur):
+        print(f"📌 Current: {_fmt(cur.iloc[0])}")
+    print(f"🏆 Top {args.top} by {args.objective}:")
+    for _, row in ranked.head(args.top).iterrows():
+        print(f"  {_fmt(row)}")
+    print(f"📂 Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
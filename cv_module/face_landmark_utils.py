@@ -1,17 +1,38 @@
 # cv_module/face_landmark_utils.py
 
-import random
+import numpy as np
 
-def eye_aspect_ratio(landmarks=None, eye_indices=None):
-    """
-    Dummy EAR function
-    Replace with actual dlib/mediapipe implementation later.
-    """
-    return random.uniform(0.2, 0.4)  # simulate blinking/drowsiness
+from cv_module.metrics import (
+    RIGHT_EYE, LEFT_EYE, MOUTH, landmarks_to_array, eye_aspect_ratios, mouth_aspect_ratio as _mar,
+)
+
+
+def _as_array(landmarks):
+    # Accept a FaceMesh landmark list or an (N, 3) array from landmarks_to_array
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return landmarks_to_array(landmarks)
 
-def mouth_aspect_ratio(landmarks=None, mouth_indices=None):
+
+def eye_aspect_ratio(landmarks, eye_indices=None):
     """
-    Dummy MAR function
-    Replace with actual dlib/mediapipe implementation later.
+    EAR from FaceMesh landmarks.
+
+    ``eye_indices`` selects one eye (``RIGHT_EYE`` / ``LEFT_EYE``); by default
+    the mean of both eyes is returned.
     """
-    return random.uniform(0.5, 0.8)  # simulate yawning
+    ears = eye_aspect_ratios(_as_array(landmarks))
+    if eye_indices is None:
+        return float(ears.mean())
+    if list(eye_indices) == RIGHT_EYE:
+        return float(ears[0])
+    if list(eye_indices) == LEFT_EYE:
+        return float(ears[1])
+    raise ValueError("eye_indices must be RIGHT_EYE or LEFT_EYE")
+
+
+def mouth_aspect_ratio(landmarks, mouth_indices=MOUTH):
+    """MAR from FaceMesh landmarks (mouth indices are fixed to ``MOUTH``)."""
+    if list(mouth_indices) != MOUTH:
+        raise ValueError("mouth_indices must be MOUTH")
+    return float(_mar(_as_array(landmarks)))
@@ -0,0 +1,254 @@
+# cv_module/fatigue.py
+"""
+Fused fatigue engine: eye closure, PERCLOS, blink rate, yawns and head nods.
+
+``FatigueFSM`` extends ``DrowsinessFSM``. Feed it one landmark array per
+frame with ``update_frame(pts, now)``. ``face_signals`` computes EAR, MAR
+and head pitch from a single gather of the landmark array. The FSM keeps
+all the signals in one state machine:
+
+* eyes closed for ``hold_secs`` -> DROWSY (inherited behaviour)
+* PERCLOS      fraction of the last ``WINDOW_SECS`` with eyes closed
+* blink rate   short closures (< ``BLINK_MAX_SECS``) per minute
+* yawns        MAR above ``MAR_OPEN_TH`` for ``YAWN_HOLD_SECS``, with
+               hysteresis down to ``MAR_CLOSE_TH``
+* head nods    pitch more than ``NOD_DEG`` past the driver's running
+               baseline for ``NOD_HOLD_SECS``
+
+The slow signals are combined into a 0..1+ ``fatigue_score``. Crossing
+``FATIGUE_ON`` emits "Fatigue detected", and dropping below
+``FATIGUE_OFF`` emits "Fatigue cleared". Windowed counts are deques of
+timestamps trimmed from the left, so every update is amortized O(1).
+"""
+from collections import deque
+from time import monotonic
+
+from cv_module.drowsiness_detector import DrowsinessFSM, default_on_event
+from cv_module.metrics import face_signals
+
+WINDOW_SECS = 60.0        # PERCLOS / blink / yawn / nod window
+
+# Yawns (MAR hysteresis)
+MAR_OPEN_TH = 0.6
+MAR_CLOSE_TH = 0.45
+YAWN_HOLD_SECS = 1.0      # talking and laughing open the mouth only briefly
+
+# Blinks
+BLINK_MAX_SECS = 0.5      # longer closures are not blinks
+
+# Head nods (degrees past the baseline pitch)
+NOD_DEG = 15.0
+NOD_HOLD_SECS = 0.4
+PITCH_BASELINE_ALPHA = 0.01
+
+# Fused score: each term reaches 1.0 at its "clearly fatigued" level
+PERCLOS_HIGH = 0.15       # 15% of the window with eyes closed
+BLINK_RATE_LOW = 8.0      # blinks / min (tired drivers blink slower and longer)
+YAWNS_HIGH = 3            # yawns per window
+NODS_HIGH = 2             # nods per window
+WEIGHTS = {"perclos": 0.45, "blinks": 0.1, "yawns": 0.25, "nods": 0.2}
+FATIGUE_ON = 0.6
+FATIGUE_OFF = 0.4
+
+
+class _WindowFraction:
+    """Time-weighted fraction of the last ``window`` seconds where a flag was set."""
+
+    def __init__(self, window):
+        self.window = window
+        self._spans = deque()      # (t, dt, flag)
+        self._total = 0.0
+        self._on = 0.0
+
+    def add(self, t, dt, flag):
+        self._spans.append((t, dt, flag))
+        self._total += dt
+        if flag:
+            self._on += dt
+        while self._spans and self._spans[0][0] < t - self.window:
+            _, old_dt, old_flag = self._spans.popleft()
+            self._total -= old_dt
+            if old_flag:
+                self._on -= old_dt
+
+    @property
+    def value(self):
+        return self._on / self._total if self._total > 0 else 0.0
+
+    @property
+    def covered(self):
+        """Seconds of data currently in the window."""
+        return self._total
+
+
+class _WindowCount:
+    """Number of timestamps within the last ``window`` seconds."""
+
+    def __init__(self, window):
+        self.window = window
+        self._ts = deque()
+
+    def add(self, t):
+        self._ts.append(t)
+
+    def count(self, now):
+        while self._ts and self._ts[0] < now - self.window:
+            self._ts.popleft()
+        return len(self._ts)
+
+
+class YawnDetector:
+    """
+    Yawns from MAR: above ``open_th`` for ``hold_secs`` starts one, and it
+    lasts until MAR drops to ``close_th``. ``update`` returns "Yawning
+    detected", "Yawn ended" or None. ``open_since`` is when the mouth
+    opened, i.e. the start of the current yawn.
+    """
+
+    def __init__(self, open_th=MAR_OPEN_TH, close_th=MAR_CLOSE_TH, hold_secs=YAWN_HOLD_SECS):
+        self.open_th = open_th
+        self.close_th = close_th
+        self.hold_secs = hold_secs
+        self.yawning = False
+        self.open_since = None
+
+    def update(self, mar, now):
+        if not self.yawning:
+            if mar >= self.open_th:
+                if self.open_since is None:
+                    self.open_since = now
+                elif now - self.open_since >= self.hold_secs:
+                    self.yawning = True
+                    return "Yawning detected"
+            else:
+                self.open_since = None
+        elif mar <= self.close_th:
+            self.yawning = False
+            self.open_since = None
+            return "Yawn ended"
+        return None
+
+    def reset(self):
+        """Face lost: a mouth-open timer restarts."""
+        self.open_since = None
+
+
+class FatigueFSM(DrowsinessFSM):
+    def __init__(self, on_event=default_on_event, window_secs=WINDOW_SECS, **kwargs):
+        super().__init__(on_event=on_event, **kwargs)
+        self.window_secs = window_secs
+        self._perclos = _WindowFraction(window_secs)
+        self._blinks = _WindowCount(window_secs)
+        self._yawns = _WindowCount(window_secs)
+        self._nods = _WindowCount(window_secs)
+
+        self.eyes_closed = False
+        self._closed_since = None
+        self.yawn = YawnDetector()
+        self.nodding = False
+        self._pitch_off_since = None
+        self.pitch_baseline = None
+        self.fatigued = False
+        self.fatigue_score = 0.0
+        self._last_t = None
+
+    # ----------------------------
+    # Per-frame entry point
+    # ----------------------------
+    def update_frame(self, pts, now=None):
+        """
+        Update every signal from one (N, 3) landmark array.
+        Returns a dict of the raw and fused signals for the HUD / logs.
+        """
+        ear_r, ear_l, mar, pitch = face_signals(pts).tolist()
+        return self.update_signals(0.5 * (ear_r + ear_l), mar, pitch, now)
+
+    def update_signals(self, ear, mar, pitch, now=None):
+        """Same as ``update_frame`` for precomputed signals (batch / replay)."""
+        if now is None:
+            now = monotonic()
+        smooth_ear, state = self.update(ear, now)
+        dt = 0.0 if self._last_t is None else min(now - self._last_t, 1.0)
+        self._last_t = now
+
+        self._update_eyes(smooth_ear, now, dt)
+        self._update_yawn(mar, now, smooth_ear)
+        self._update_pitch(pitch, now, smooth_ear)
+        self._update_fatigue(now, smooth_ear)
+        return {
+            "ear": ear, "smooth_ear": smooth_ear, "mar": mar, "pitch": pitch,
+            "state": state, "perclos": self._perclos.value,
+            "blink_rate": self.blink_rate(now), "yawning": self.yawning,
+            "nodding": self.nodding, "fatigue_score": self.fatigue_score,
+            "fatigued": self.fatigued,
+        }
+
+    @property
+    def yawning(self):
+        return self.yawn.yawning
+
+    def reset_face_lost(self):
+        """Call on frames without a face: pending timers restart."""
+        self.close_start = None
+        self._closed_since = None
+        self.yawn.reset()
+        self._pitch_off_since = None
+
+    # ----------------------------
+    # Signals
+    # ----------------------------
+    def _update_eyes(self, smooth_ear, now, dt):
+        closed = smooth_ear <= self.close_th if not self.eyes_closed else smooth_ear < self.open_th
+        self._perclos.add(now, dt, closed)
+        if closed and not self.eyes_closed:
+            self._closed_since = now
+        elif not closed and self.eyes_closed and self._closed_since is not None:
+            if now - self._closed_since <= BLINK_MAX_SECS:
+                self._blinks.add(now)
+            self._closed_since = None
+        self.eyes_closed = closed
+
+    def _update_yawn(self, mar, now, ear):
+        event = self.yawn.update(mar, now)
+        if event is not None:
+            if self.yawn.yawning:
+                self._yawns.add(now)
+            self._emit(event, now, ear)
+
+    def _update_pitch(self, pitch, now, ear):
+        if self.pitch_baseline is None:
+            self.pitch_baseline = pitch
+        off = pitch - self.pitch_baseline
+        if off >= NOD_DEG:
+            if self._pitch_off_since is None:
+                self._pitch_off_since = now
+            elif not self.nodding and now - self._pitch_off_since >= NOD_HOLD_SECS:
+                self.nodding = True
+                self._nods.add(now)
+                self._emit("Head nod detected", now, ear)
+        else:
+            self._pitch_off_since = None
+            self.nodding = False
+            # Baseline only follows the driver's normal posture, not the nods
+            self.pitch_baseline += PITCH_BASELINE_ALPHA * off
+
+    def blink_rate(self, now):
+        """Blinks per minute over the window."""
+        return self._blinks.count(now) * 60.0 / self.window_secs
+
+    def _update_fatigue(self, now, ear):
+        terms = {
+            "perclos": min(self._perclos.value / PERCLOS_HIGH, 1.5),
+            # Only a *low* blink rate is a fatigue sign, and only once a window has passed
+            "blinks": (max(0.0, 1.0 - self.blink_rate(now) / BLINK_RATE_LOW)
+                       if self._perclos.covered >= self.window_secs * 0.9 else 0.0),
+            "yawns": min(self._yawns.count(now) / YAWNS_HIGH, 1.5),
+            "nods": min(self._nods.count(now) / NODS_HIGH, 1.5),
+        }
+        self.fatigue_score = sum(WEIGHTS[k] * v for k, v in terms.items())
+        if not self.fatigued and self.fatigue_score >= FATIGUE_ON:
+            self.fatigued = True
+            self._emit("Fatigue detected", now, ear)
+        elif self.fatigued and self.fatigue_score < FATIGUE_OFF:
+            self.fatigued = False
+            self._emit("Fatigue cleared", now, ear)
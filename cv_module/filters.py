@@ -0,0 +1,259 @@
+# cv_module/filters.py
+"""
+EAR smoothing filters for DrowsinessFSM.
+
+Every filter has O(1) state and per-sample cost:
+
+    sma     running-sum moving average over a preallocated ring buffer
+    ema     exponential moving average
+    kalman  1-D constant-value Kalman filter (random-walk process noise)
+    euro    one-euro filter (adaptive cutoff: smooth at rest, fast on moves)
+
+``update(x, now=None)`` filters one live sample. ``batch(xs, ts=None)``
+filters a whole recorded series in vectorized NumPy, for offline replays.
+The live path deliberately keeps its state in plain Python floats / a list:
+per-sample NumPy scalar indexing costs more than the arithmetic it replaces.
+It returns exactly what feeding the samples one by one through a fresh
+filter would.
+
+Note on the one-euro filter: the derivative is taken from consecutive *raw*
+samples rather than from the previous filtered value. This keeps the
+adaptive cutoff independent of the output, so the batch path can be
+vectorized.
+"""
+import math
+
+import numpy as np
+
+# Default parameters
+SMA_N = 5
+EMA_ALPHA = 0.4
+KALMAN_Q = 1e-4           # process noise variance (how fast true EAR drifts)
+KALMAN_R = 4e-4           # measurement noise variance (landmark jitter)
+EURO_MIN_CUTOFF = 1.5     # Hz
+EURO_BETA = 0.5
+EURO_D_CUTOFF = 1.0       # Hz, derivative smoothing
+DEFAULT_RATE = 30.0       # Hz, assumed when no timestamps are given
+
+_RESYNC_EVERY = 4096      # SMA: recompute the running sum this often (float drift)
+_BLOCK = 64               # block length for the vectorized recurrence
+_MIN_DECAY = 1e-4         # keeps block products well above float underflow
+
+
+def _linear_recurrence(a, b, x0=0.0):
+    """
+    Vectorized y[t] = a[t] * y[t-1] + b[t], y[-1] = x0.
+
+    Within fixed-size blocks the closed form y = P * (x0 + cumsum(b / P))
+    (P = running product of a) is evaluated for all blocks at once; only
+    the carry between blocks is a Python loop (len / _BLOCK steps).
+    """
+    a = np.clip(np.asarray(a, dtype=np.float64), _MIN_DECAY, None)
+    b = np.asarray(b, dtype=np.float64)
+    n = len(b)
+    if n == 0:
+        return np.empty(0)
+    nb = -(-n // _BLOCK)
+    pad = nb * _BLOCK - n
+    A = np.pad(a, (0, pad), constant_values=1.0).reshape(nb, _BLOCK)
+    B = np.pad(b, (0, pad)).reshape(nb, _BLOCK)
+    P = np.cumprod(A, axis=1)
+    local = P * np.cumsum(B / P, axis=1)      # block solution with zero carry-in
+
+    carry = np.empty(nb)
+    c = x0
+    for i in range(nb):
+        carry[i] = c
+        c = P[i, -1] * c + local[i, -1]
+    return (local + P * carry[:, None]).reshape(-1)[:n]
+
+
+def _dts(xs, ts):
+    """Per-sample time steps (seconds); the first step is nominal."""
+    if ts is None:
+        return np.full(len(xs), 1.0 / DEFAULT_RATE)
+    dt = np.diff(np.asarray(ts, dtype=np.float64), prepend=np.nan)
+    dt[0] = 1.0 / DEFAULT_RATE
+    return np.maximum(dt, 1e-6)
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+# ----------------------------
+# Filters
+# ----------------------------
+class SMAFilter:
+    """Moving average of the last ``n`` samples (fewer while warming up)."""
+
+    def __init__(self, n=SMA_N):
+        self.n = int(n)
+        self._buf = [0.0] * self.n
+        self.reset()
+
+    def reset(self):
+        self._buf[:] = [0.0] * self.n
+        self._i = 0
+        self._count = 0
+        self._updates = 0
+        self._sum = 0.0
+        self.value = None
+
+    def update(self, x, now=None):
+        i = self._i
+        buf = self._buf
+        self._sum += x - buf[i]
+        buf[i] = x
+        self._i = i + 1 if i + 1 < self.n else 0
+        self._updates += 1
+        if self._updates % _RESYNC_EVERY == 0:
+            self._sum = math.fsum(buf)
+        if self._count < self.n:
+            self._count += 1
+        self.value = self._sum / self._count
+        return self.value
+
+    def batch(self, xs, ts=None):
+        xs = np.asarray(xs, dtype=np.float64)
+        c = np.cumsum(xs)
+        c[self.n:] = c[self.n:] - c[:-self.n]
+        return c / np.minimum(np.arange(1, len(xs) + 1), self.n)
+
+
+class EMAFilter:
+    """Exponential moving average; the first sample initializes the state."""
+
+    def __init__(self, alpha=EMA_ALPHA):
+        self.alpha = float(alpha)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    def update(self, x, now=None):
+        if self.value is None:
+            self.value = float(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+    def batch(self, xs, ts=None):
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(xs) == 0:
+            return xs
+        a = np.full(len(xs), 1.0 - self.alpha)
+        a[0] = 0.0
+        b = self.alpha * xs
+        b[0] = xs[0]
+        return _linear_recurrence(a, b)
+
+
+class KalmanFilter:
+    """1-D Kalman filter for a slowly drifting value observed with noise."""
+
+    def __init__(self, q=KALMAN_Q, r=KALMAN_R):
+        self.q = float(q)
+        self.r = float(r)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self._p = None
+
+    def update(self, x, now=None):
+        if self.value is None:
+            self.value, self._p = float(x), self.r
+            return self.value
+        p = self._p + self.q
+        k = p / (p + self.r)
+        self.value += k * (x - self.value)
+        self._p = (1.0 - k) * p
+        return self.value
+
+    def gains(self, n):
+        """Kalman gains for ``n`` samples (data-independent; first gain is 1)."""
+        k = np.empty(n)
+        p = self.r
+        for i in range(n):
+            if i == 0:
+                k[0] = 1.0
+                continue
+            p += self.q
+            k[i] = p / (p + self.r)
+            p *= 1.0 - k[i]
+            if i > 1 and abs(k[i] - k[i - 1]) < 1e-15:
+                k[i:] = k[i]      # converged to the steady-state gain
+                break
+        return k
+
+    def batch(self, xs, ts=None):
+        xs = np.asarray(xs, dtype=np.float64)
+        k = self.gains(len(xs))
+        return _linear_recurrence(1.0 - k, k * xs)
+
+
+class OneEuroFilter:
+    """One-euro filter (Casiez et al.) with a raw-sample derivative."""
+
+    def __init__(self, min_cutoff=EURO_MIN_CUTOFF, beta=EURO_BETA, d_cutoff=EURO_D_CUTOFF):
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self._x_prev = None
+        self._dx = 0.0
+        self._t_prev = None
+
+    def update(self, x, now=None):
+        if now is None or self._t_prev is None:
+            dt = 1.0 / DEFAULT_RATE
+        else:
+            dt = max(now - self._t_prev, 1e-6)
+        self._t_prev = now
+        if self.value is None:
+            self.value = self._x_prev = float(x)
+            return self.value
+        dx = (x - self._x_prev) / dt
+        self._dx += _alpha(self.d_cutoff, dt) * (dx - self._dx)
+        cutoff = self.min_cutoff + self.beta * abs(self._dx)
+        self.value += _alpha(cutoff, dt) * (x - self.value)
+        self._x_prev = float(x)
+        return self.value
+
+    def batch(self, xs, ts=None):
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(xs) == 0:
+            return xs
+        dt = _dts(xs, ts)
+        dx = np.diff(xs, prepend=xs[0]) / dt
+        ad = _alpha(self.d_cutoff, dt)
+        dx_hat = _linear_recurrence(1.0 - ad, ad * dx)
+        a = _alpha(self.min_cutoff + self.beta * np.abs(dx_hat), dt)
+        a[0] = 1.0                        # first sample initializes the state
+        return _linear_recurrence(1.0 - a, a * xs)
+
+
+FILTERS = {
+    "sma": SMAFilter,
+    "ema": EMAFilter,
+    "kalman": KalmanFilter,
+    "euro": OneEuroFilter,
+}
+
+
+def make_filter(kind="sma", **params):
+    """New filter by name (see ``FILTERS``); ``params`` go to its constructor."""
+    try:
+        return FILTERS[kind](**params)
+    except KeyError:
+        raise ValueError(f"unknown filter {kind!r}; choose from {sorted(FILTERS)}") from None
+
+
+def filter_series(xs, kind="sma", ts=None, **params):
+    """Vectorized filtering of a whole recorded EAR series."""
+    return make_filter(kind, **params).batch(xs, ts)
@@ -0,0 +1,350 @@
+# cv_module/frame_bus.py
+"""
+Zero-copy shared-memory frame bus between a capture process and its
+consumers (analysis, snapshots, recording).
+
+One ``multiprocessing.shared_memory`` block holds a small header and a
+fixed ring of ``slots`` preallocated frames. Each slot carries a sequence
+number:
+
+* the producer writes frame ``f`` in place into slot ``(f - 1) % slots``.
+  Its writable view goes straight into ``cap.read(view)``, so even capture
+  does not copy. The slot's sequence is ``-f`` while it is being written and
+  ``f`` once it is published. The producer never waits for a consumer.
+* a consumer's ``latest()`` returns a ``FrameRef``: a read-only NumPy view of
+  the newest published slot, with its sequence number and timestamp.
+  Nothing is copied or pickled. After using the view, ``ref.valid()``
+  re-checks the slot's sequence. If the producer has lapped the consumer
+  (``slots - 1`` newer frames), the data may have been overwritten and the
+  result should be discarded. A slow consumer therefore skips frames
+  (``reader.skipped``) and never stalls capture.
+
+Consumers attach by name from any process::
+
+    # capture process
+    bus = FrameBus.create((720, 1280, 3), slots=4)
+    view = bus.next_slot()
+    ok, frame = cap.read(view)       # decoded in place when shapes match
+    bus.publish(time.time())
+
+    # consumer process
+    reader = FrameBusReader(bus.name)
+    ref = reader.latest(timeout=0.1)
+    if ref is not None:
+        result = measure(ref.frame)  # stateless read straight from the slot
+        if not ref.valid():
+            result = None            # torn: overwritten while in use
+
+A consumer that updates state from the frame (the detector's FSM) must
+not commit anything before the check. It takes ``frame = ref.copy()``
+(None if torn) and analyzes the owned copy. That is one memcpy, and the
+window in which the producer can lap it is the copy, not the analysis.
+
+Sequence numbers are aligned int64 stores, and the header is written last.
+This is the usual seqlock pattern. It relies on the store ordering of
+x86 / ARM64 Linux. Consumers poll with a short sleep rather than block on
+a cross-process condition.
+
+``run_capture`` is the capture-process entry point; see
+``drowsiness_detector --bus``.
+"""
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SLOTS = 4
+POLL_SECS = 0.001
+
+_MAGIC = 0x46524D42555301        # "FRMBUS" v1
+_HEADER_WORDS = 16               # magic, slots, h, w, c, latest, closed, ...
+_H_MAGIC, _H_SLOTS, _H_H, _H_W, _H_C, _H_LATEST, _H_CLOSED = range(7)
+_ALIGN = 4096
+
+
+def _layout(shape, slots):
+    frame_bytes = int(np.prod(shape))
+    meta = 8 * (_HEADER_WORDS + 2 * slots)          # header + slot seq + slot ts
+    data = -(-meta // _ALIGN) * _ALIGN
+    stride = -(-frame_bytes // 64) * 64
+    return data, stride, data + stride * slots
+
+
+class _Bus:
+    """Shared views over a mapped bus block."""
+
+    def _map(self, shm, shape, slots):
+        self.shm = shm
+        self.name = shm.name
+        self.shape = tuple(int(v) for v in shape)
+        self.slots = int(slots)
+        data, stride, _ = _layout(self.shape, self.slots)
+        buf = shm.buf
+        self._header = np.ndarray((_HEADER_WORDS,), np.int64, buf, 0)
+        self._seq = np.ndarray((self.slots,), np.int64, buf, 8 * _HEADER_WORDS)
+        self._ts = np.ndarray((self.slots,), np.float64, buf, 8 * (_HEADER_WORDS + self.slots))
+        self._frames = [np.ndarray(self.shape, np.uint8, buf, data + i * stride)
+                        for i in range(self.slots)]
+
+    @property
+    def latest_seq(self):
+        return int(self._header[_H_LATEST])
+
+    @property
+    def closed(self):
+        return bool(self._header[_H_CLOSED])
+
+    def _release(self):
+        # Views must go before the mapping can be closed
+        self._header = self._seq = self._ts = None
+        self._frames = []
+        try:
+            self.shm.close()
+        except BufferError:
+            pass                        # a caller still holds a FrameRef view; freed with it
+
+
+class FrameBus(_Bus):
+    """Producer side. Owns the shared block; ``unlink()`` removes it."""
+
+    def __init__(self, shm, shape, slots):
+        self._map(shm, shape, slots)
+        self._next = 0                  # sequence of the frame being written (0 = none)
+        self.published = 0
+
+    @classmethod
+    def create(cls, shape, slots=SLOTS, name=None):
+        shape = tuple(int(v) for v in shape)
+        if len(shape) == 2:
+            shape = shape + (1,)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_layout(shape, slots)[2])
+        bus = cls(shm, shape, slots)
+        bus._seq[:] = 0
+        bus._ts[:] = 0.0
+        h = bus._header
+        h[:] = 0
+        h[_H_SLOTS], h[_H_H], h[_H_W], h[_H_C] = slots, shape[0], shape[1], shape[2]
+        h[_H_MAGIC] = _MAGIC            # last: readers attaching now see a complete header
+        return bus
+
+    def next_slot(self):
+        """Writable view of the slot for the next frame (marked in progress)."""
+        f = self.latest_seq + 1
+        i = (f - 1) % self.slots
+        self._seq[i] = -f
+        self._next = f
+        return self._frames[i]
+
+    def publish(self, ts=None):
+        """Publish the frame written into ``next_slot()``; returns its sequence."""
+        f = self._next
+        if not f:
+            raise RuntimeError("publish() without next_slot()")
+        i = (f - 1) % self.slots
+        self._ts[i] = time.time() if ts is None else ts
+        self._seq[i] = f
+        self._header[_H_LATEST] = f
+        self._next = 0
+        self.published += 1
+        return f
+
+    def write(self, frame, ts=None):
+        """Copy ``frame`` into the next slot and publish it (when in-place capture is not possible)."""
+        view = self.next_slot()
+        np.copyto(view, frame.reshape(self.shape))
+        return self.publish(ts)
+
+    def close(self):
+        """Tell readers no more frames are coming."""
+        if self._header is not None:
+            self._header[_H_CLOSED] = 1
+
+    def unlink(self):
+        self.close()
+        self._release()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameRef:
+    """A published frame: read-only view + sequence + capture timestamp."""
+
+    __slots__ = ("frame", "seq", "ts", "_slot", "_seqs")
+
+    def __init__(self, frame, seq, ts, slot, seqs):
+        self.frame = frame
+        self.seq = seq
+        self.ts = ts
+        self._slot = slot
+        self._seqs = seqs
+
+    def valid(self):
+        """True while the producer has not started overwriting this slot."""
+        return int(self._seqs[self._slot]) == self.seq
+
+    def copy(self):
+        """An owned copy of the frame (e.g. to draw on); None if already torn."""
+        out = self.frame.copy()
+        return out if self.valid() else None
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python >= 3.13
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # The creator owns the block; don't let this process' tracker unlink it at exit
+        from multiprocessing import resource_tracker
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class FrameBusReader(_Bus):
+    """Consumer side: attach by name, read the newest frame without copying."""
+
+    def __init__(self, name, timeout=5.0):
+        shm = _attach(name)
+        header = np.ndarray((_HEADER_WORDS,), np.int64, shm.buf, 0)
+        deadline = time.monotonic() + timeout
+        while header[_H_MAGIC] != _MAGIC:
+            if time.monotonic() > deadline:
+                del header
+                shm.close()
+                raise RuntimeError(f"frame bus {name!r} is not initialized")
+            time.sleep(POLL_SECS)
+        shape = (int(header[_H_H]), int(header[_H_W]), int(header[_H_C]))
+        slots = int(header[_H_SLOTS])
+        del header
+        self._map(shm, shape, slots)
+        for f in self._frames:
+            f.flags.writeable = False
+        self.last_seq = 0
+        self.received = 0
+        self.skipped = 0                # published frames this reader never saw
+
+    def latest(self, timeout=None, newer=True):
+        """
+        ``FrameRef`` for the newest published frame, or None on timeout /
+        once the producer closed the bus. With ``newer`` (default) waits
+        for a frame this reader has not returned yet.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            f = self.latest_seq
+            if f and (f > self.last_seq or not newer):
+                i = (f - 1) % self.slots
+                ts = float(self._ts[i])
+                if int(self._seq[i]) == f:
+                    if f > self.last_seq:
+                        self.skipped += max(0, f - self.last_seq - 1) if self.last_seq else 0
+                        self.received += 1
+                        self.last_seq = f
+                    return FrameRef(self._frames[i], f, ts, i, self._seq)
+                continue                # lapped between the two reads: take the newer one
+            if self.closed:
+                return None
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_SECS)
+
+    def close(self):
+        self._release()
+
+
+# ----------------------------
+# Capture process
+# ----------------------------
+def open_capture(source):
+    import cv2
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, int) and os.name == "nt":
+        return cv2.VideoCapture(source, cv2.CAP_DSHOW)
+    return cv2.VideoCapture(source)
+
+
+def run_capture(source, conn, slots=SLOTS, stop=None, realtime=False):
+    """
+    Capture-process entry point: open ``source``, create a bus sized to its
+    first frame, send ``(name, shape)`` over ``conn`` and decode every later
+    frame in place into the ring until the source ends or ``stop`` is set.
+    Sends None if the source cannot be opened.
+
+    ``realtime`` paces file sources at their native fps (cameras pace
+    themselves).
+    """
+    from log_module.instrumentation import get_metrics
+    cap = open_capture(source)
+    ok, first = cap.read() if cap.isOpened() else (False, None)
+    if not ok:
+        conn.send(None)
+        return
+    bus = FrameBus.create(first.shape, slots)
+    bus.write(first)
+    conn.send((bus.name, bus.shape))
+    period = 1.0 / (cap.get(5) or 30.0) if realtime else 0.0      # CAP_PROP_FPS
+    m = get_metrics()
+    next_t = time.monotonic()
+    copies = 0
+    try:
+        while stop is None or not stop.is_set():
+            t = m.now()
+            view = bus.next_slot()
+            ok, frame = cap.read(view)
+            if not ok:
+                break
+            if frame is not view and not np.shares_memory(frame, view):
+                # Backend returned its own buffer (shape / dtype mismatch): one copy
+                np.copyto(view, frame.reshape(bus.shape))
+                copies += 1
+            bus.publish()
+            m.lap("capture", t)
+            if period:
+                next_t += period
+                time.sleep(max(0.0, next_t - time.monotonic()))
+    finally:
+        cap.release()
+        bus.close()
+        # Give readers a moment to see ``closed`` before the block goes away
+        time.sleep(0.2)
+        bus.unlink()
+    return copies
+
+
+class CaptureProcess:
+    """``run_capture`` in a child process; ``reader()`` attaches a consumer."""
+
+    def __init__(self, source, slots=SLOTS, realtime=False):
+        import multiprocessing as mp
+        self._parent, child = mp.Pipe(duplex=False)
+        self._stop = mp.Event()
+        self.proc = mp.Process(target=run_capture, args=(source, child, slots, self._stop, realtime),
+                               name="frame-capture", daemon=True)
+        self.name = self.shape = None
+
+    def start(self, timeout=10.0):
+        self.proc.start()
+        if not self._parent.poll(timeout):
+            self.stop()
+            raise RuntimeError("capture process did not start")
+        info = self._parent.recv()
+        if info is None:
+            self.proc.join()
+            raise RuntimeError("cannot open capture source")
+        self.name, self.shape = info
+        return self
+
+    def reader(self):
+        return FrameBusReader(self.name)
+
+    def stop(self):
+        self._stop.set()
+        self.proc.join(timeout=2.0)
+        if self.proc.is_alive():
+            self.proc.terminate()
@@ -0,0 +1,161 @@
+# cv_module/metrics.py
+"""
+Vectorized face metrics (EAR / MAR / head pitch) over the full FaceMesh
+landmark array.
+
+A FaceMesh result is converted to one (N, 3) float32 array per frame with
+``landmarks_to_array``; every ratio is then computed with gathered indices
+and NumPy arithmetic instead of per-point Python tuples. All kernels accept
+any number of leading dimensions, so a recorded session stacked as
+(frames, N, 3) is scored in a single call with ``batch_face_metrics``.
+"""
+import numpy as np
+
+# ----------------------------
+# Landmark indices (MediaPipe FaceMesh)
+# ----------------------------
+# 6-point set per eye for classic EAR: p1, p2, p3, p4, p5, p6
+RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+LEFT_EYE  = [362, 385, 387, 263, 373, 380]
+
+# Mouth: top lip, bottom lip, left corner, right corner
+MOUTH = [13, 14, 78, 308]
+
+# Head pose: forehead (top of face oval) and chin
+FOREHEAD, CHIN = 10, 152
+
+# (2, 6) gather table so both eyes are computed in one pass
+EYES_IDX = np.array([RIGHT_EYE, LEFT_EYE], dtype=np.intp)
+MOUTH_IDX = np.array(MOUTH, dtype=np.intp)
+
+# Every landmark any signal needs, gathered once: eyes (12), mouth (4), pose (2)
+SIGNAL_IDX = np.concatenate([EYES_IDX.ravel(), MOUTH_IDX, [FOREHEAD, CHIN]]).astype(np.intp)
+SIGNALS = ("ear_right", "ear_left", "mar", "pitch")
+
+# The same points as positions within a SIGNAL_IDX-gathered array
+_G_EYES = np.arange(12, dtype=np.intp).reshape(2, 6)
+_G_MOUTH = np.arange(12, 16, dtype=np.intp)
+_G_FOREHEAD, _G_CHIN = 16, 17
+
+_EPS = 1e-9
+
+
+# ----------------------------
+# Conversion
+# ----------------------------
+def landmarks_to_array(face_landmarks, w=1, h=1, out=None):
+    """
+    Convert a FaceMesh ``NormalizedLandmarkList`` to an (N, 3) float32 array
+    in pixel units (z is scaled by width, as MediaPipe defines it).
+
+    Pass a preallocated ``out`` array to avoid a per-frame allocation.
+    """
+    lms = face_landmarks.landmark
+    n = len(lms)
+    if out is None or out.shape != (n, 3):
+        out = np.empty((n, 3), dtype=np.float32)
+    flat = np.fromiter(
+        (c for lm in lms for c in (lm.x, lm.y, lm.z)),
+        dtype=np.float32,
+        count=n * 3,
+    )
+    out[:] = flat.reshape(n, 3)
+    out *= np.array([w, h, w], dtype=np.float32)
+    return out
+
+
+# ----------------------------
+# Kernels (work on (..., N, 3) arrays)
+# ----------------------------
+def _dist(a, b):
+    return np.sqrt(np.sum((a - b) ** 2, axis=-1))
+
+
+def eye_aspect_ratios(pts, idx=EYES_IDX):
+    """
+    EAR for both eyes: (||p2-p6|| + ||p3-p5||) / (2 * ||p1-p4||).
+
+    Returns an array of shape (..., 2) ordered (right, left). ``idx`` is the
+    (2, 6) table of eye points in ``pts``.
+    """
+    eyes = pts[..., idx, :2]                    # (..., 2, 6, 2)
+    num = _dist(eyes[..., 1, :], eyes[..., 5, :]) + _dist(eyes[..., 2, :], eyes[..., 4, :])
+    den = 2.0 * _dist(eyes[..., 0, :], eyes[..., 3, :])
+    return np.where(den > _EPS, num / np.maximum(den, _EPS), 0.0)
+
+
+def mouth_aspect_ratio(pts, idx=MOUTH_IDX):
+    """MAR = ||top - bottom|| / ||left - right||, shape (...)."""
+    m = pts[..., idx, :2]                       # (..., 4, 2)
+    vertical = _dist(m[..., 0, :], m[..., 1, :])
+    horizontal = _dist(m[..., 2, :], m[..., 3, :])
+    return np.where(horizontal > _EPS, vertical / np.maximum(horizontal, _EPS), 0.0)
+
+
+def head_pitch(pts, forehead=FOREHEAD, chin=CHIN):
+    """
+    Head pitch in degrees from the forehead -> chin axis, shape (...).
+
+    Positive when the head tips forward (chin moves away from the camera),
+    about 0 when facing the camera. Uses FaceMesh's relative z, so compare
+    against a per-driver baseline rather than an absolute angle.
+    """
+    f, c = pts[..., forehead, :], pts[..., chin, :]
+    return np.degrees(np.arctan2(c[..., 2] - f[..., 2], c[..., 1] - f[..., 1]))
+
+
+def gathered_signals(g):
+    """
+    ``face_signals`` for landmarks already gathered by ``SIGNAL_IDX``
+    (shape (..., 18, 3)), e.g. the rows cached by cv_module.evaluate.
+    """
+    ears = eye_aspect_ratios(g, _G_EYES)
+    return np.stack([ears[..., 0], ears[..., 1], mouth_aspect_ratio(g, _G_MOUTH),
+                     head_pitch(g, _G_FOREHEAD, _G_CHIN)], axis=-1)
+
+
+def face_signals(pts):
+    """
+    EAR (right, left), MAR and head pitch from one gather of ``SIGNAL_IDX``.
+
+    Returns an array of shape (..., 4) ordered like ``SIGNALS``. This is the
+    single pass behind ``face_metrics`` / ``batch_face_metrics``.
+    """
+    return gathered_signals(pts[..., SIGNAL_IDX, :])
+
+
+def face_metrics(pts):
+    """
+    All per-frame signals from one (N, 3) landmark array.
+
+    Returns a dict with ``ear_right``, ``ear_left``, ``ear`` (mean of both
+    eyes), ``mar`` and ``pitch`` (degrees) as Python floats.
+    """
+    er, el, mar, pitch = face_signals(pts).tolist()
+    return {
+        "ear_right": er,
+        "ear_left": el,
+        "ear": 0.5 * (er + el),
+        "mar": mar,
+        "pitch": pitch,
+    }
+
+
+def batch_face_metrics(pts):
+    """
+    Score a whole recorded session at once.
+
+    ``pts`` is a (frames, N, 3) array; returns a dict of (frames,) float32
+    arrays with the same keys as ``face_metrics``.
+    """
+    pts = np.asarray(pts, dtype=np.float32)
+    if pts.ndim != 3:
+        raise ValueError(f"expected (frames, N, 3) landmarks, got shape {pts.shape}")
+    sig = face_signals(pts).astype(np.float32)
+    return {
+        "ear_right": sig[:, 0],
+        "ear_left": sig[:, 1],
+        "ear": sig[:, :2].mean(axis=-1),
+        "mar": sig[:, 2],
+        "pitch": sig[:, 3],
+    }
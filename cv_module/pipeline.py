@@ -0,0 +1,179 @@
+# cv_module/pipeline.py
+"""
+Threaded capture -> inference -> render pipeline.
+
+Each stage runs on its own thread and hands work to the next one through a
+bounded drop-oldest queue, so a slow stage never makes an earlier one block:
+the newest frame always wins and stale frames are discarded (and counted).
+Rendering stays on the caller's thread because ``cv2.imshow`` must run there.
+"""
+import threading
+from collections import deque
+from time import monotonic
+
+from log_module.instrumentation import get_metrics
+
+# ----------------------------
+# Queue
+# ----------------------------
+class DropOldestQueue:
+    """Bounded FIFO that evicts the oldest item instead of blocking on put."""
+
+    def __init__(self, maxsize=2):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the next item, or None once closed and drained / timed out."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def qsize(self):
+        return len(self._items)
+
+
+# ----------------------------
+# Stats
+# ----------------------------
+class StageStats:
+    """Per-stage frame count and latency (last + exponential average)."""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.count = 0
+        self.last_ms = 0.0
+        self.avg_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.count += 1
+        self.last_ms = ms
+        self.avg_ms = ms if self.count == 1 else self.avg_ms + self.alpha * (ms - self.avg_ms)
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+class FramePipeline:
+    """
+    Run ``cap.read()`` and ``infer(frame)`` on background threads.
+
+    Iterate ``frames()`` on the render thread to receive ``(frame, result)``
+    pairs; ``stats()`` reports queue depth, drops and latency per stage.
+    """
+
+    def __init__(self, cap, infer, queue_size=2):
+        self.cap = cap
+        self.infer = infer
+        self.capture_q = DropOldestQueue(queue_size)
+        self.render_q = DropOldestQueue(queue_size)
+        self.stage_stats = {
+            "capture": StageStats(),
+            "inference": StageStats(),
+            "render": StageStats(),
+        }
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.capture_q.close()
+        self.render_q.close()
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+    def _capture_loop(self):
+        stats = self.stage_stats["capture"]
+        m = get_metrics()
+        while not self._stop.is_set():
+            t0 = monotonic()
+            t = m.now()
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            m.lap("capture", t)
+            stats.record(monotonic() - t0)
+            dropped = self.capture_q.dropped
+            self.capture_q.put((t0, frame))
+            if self.capture_q.dropped != dropped:
+                m.inc("frames_dropped")
+        self.capture_q.close()
+
+    def _inference_loop(self):
+        stats = self.stage_stats["inference"]
+        while not self._stop.is_set():
+            item = self.capture_q.get(timeout=0.1)
+            if item is None:
+                if self.capture_q.closed:
+                    break
+                continue
+            t_cap, frame = item
+            t0 = monotonic()
+            result = self.infer(frame)
+            stats.record(monotonic() - t0)
+            dropped = self.render_q.dropped
+            self.render_q.put((t_cap, frame, result))
+            if self.render_q.dropped != dropped:
+                get_metrics().inc("frames_dropped")
+        self.render_q.close()
+
+    def frames(self):
+        """Yield ``(frame, result)`` for the render stage until capture ends."""
+        stats = self.stage_stats["render"]
+        while not self._stop.is_set():
+            item = self.render_q.get(timeout=0.1)
+            if item is None:
+                if self.render_q.closed:
+                    return
+                continue
+            t_cap, frame, result = item
+            yield frame, result
+            # capture-to-display latency, measured once the caller has drawn
+            stats.record(monotonic() - t_cap)
+
+    def stats(self):
+        queues = {"capture": self.capture_q, "inference": self.render_q, "render": None}
+        out = {}
+        for name, s in self.stage_stats.items():
+            q = queues[name]
+            out[name] = {
+                "frames": s.count,
+                "latency_ms": round(s.last_ms, 2),
+                "avg_latency_ms": round(s.avg_ms, 2),
+                "queue_depth": q.qsize() if q is not None else 0,
+                "dropped": q.dropped if q is not None else 0,
+            }
+        return out
@@ -0,0 +1,440 @@
+# cv_module/replay.py
+"""
+Deterministic replay harness and end-to-end latency benchmark.
+
+Feeds synthetic landmark sequences (built-in ``SCENARIOS``) or recorded
+video through the real detector path: ``make_analyzer`` -> ``analyze_frame``
+-> ``DrowsinessFSM``, optionally with the adaptive-rate scheduler. There is
+no camera, display or audio. Timing is driven by a virtual clock, which is
+the analyzer's ``clock``, so the FSM and scheduler see frame timestamps.
+The same input therefore always produces the same episodes, however fast
+or slow the host is. Synthetic scenarios go through ``SyntheticTracker``,
+which stands in for FaceMesh.
+
+Measured per frame (wall time, ms). The inference stages come from
+``analyze_frame``'s own stage timers, which the harness collects by passing
+its ``StageTimes`` as the analyzer's ``metrics``:
+
+    decode    cap.read()                          (video only)
+    convert   BGR -> RGB                          (video only)
+    facemesh  FaceMesh landmarks (SyntheticTracker for scenarios)
+    ear       EAR from the landmark array
+    fsm       calibration + DrowsinessFSM update
+    analyze   whole analyzer call (the stages above plus bookkeeping)
+    logging   EventSink.emit for transitions      (frames with events)
+
+It also reports ``frame_to_alert_ms``: wall time from picking up the
+frame that triggers an alert to the alert event being queued. And it
+reports ``detect_delay_s``: virtual time from closure onset to the alert
+(smoothing + CLOSE_HOLD_SECS).
+
+    python -m cv_module.replay                       # all scenarios
+    python -m cv_module.replay --scenario microsleep --json out.json
+    python -m cv_module.replay clip.mp4 --expect 12.0:15.5
+    python -m cv_module.replay --baseline last.json  # fail on >20% fps drop
+
+Exits non-zero when an episode check fails or throughput regressed.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from time import perf_counter
+
+import numpy as np
+
+from cv_module.drowsiness_detector import DrowsinessFSM, make_analyzer
+from cv_module.metrics import RIGHT_EYE, LEFT_EYE, MOUTH
+from log_module import event_sink as ev
+
+N_LANDMARKS = 478           # FaceMesh with refine_landmarks=True
+EPISODE_TOLERANCE = 1.0     # seconds, start/end matching
+MAX_REGRESS = 0.2           # allowed fractional fps drop vs. a baseline
+
+STAGES = ["decode", "convert", "facemesh", "ear", "fsm", "analyze", "logging"]
+
+
+# ----------------------------
+# Virtual clock
+# ----------------------------
+class VirtualClock:
+    """Replay time: advanced explicitly, never by the host clock."""
+
+    def __init__(self, start=0.0):
+        self.t = float(start)
+
+    def now(self):
+        return self.t
+
+    def set(self, t):
+        self.t = float(t)
+
+    def advance(self, dt):
+        self.t += dt
+        return self.t
+
+
+# ----------------------------
+# Synthetic landmarks
+# ----------------------------
+def _place_eye(pts, idx, cx, cy, width, ear):
+    # p1/p4 corners; p2,p3 above and p6,p5 below so that EAR = height / width
+    half = 0.5 * ear * width
+    p1, p2, p3, p4, p5, p6 = idx
+    pts[p1, :2] = (cx - width / 2, cy)
+    pts[p4, :2] = (cx + width / 2, cy)
+    pts[p2, :2] = (cx - width / 6, cy - half)
+    pts[p6, :2] = (cx - width / 6, cy + half)
+    pts[p3, :2] = (cx + width / 6, cy - half)
+    pts[p5, :2] = (cx + width / 6, cy + half)
+
+
+def synthetic_face(ear, mar=0.05, out=None):
+    """(N, 3) pixel landmarks whose eyes have exactly ``ear`` (and mouth ``mar``)."""
+    pts = out if out is not None else np.zeros((N_LANDMARKS, 3), dtype=np.float32)
+    _place_eye(pts, RIGHT_EYE, 260.0, 220.0, 60.0, ear)
+    _place_eye(pts, LEFT_EYE, 380.0, 220.0, 60.0, ear)
+    top, bottom, left, right = MOUTH
+    pts[left, :2] = (280.0, 340.0)
+    pts[right, :2] = (360.0, 340.0)
+    pts[top, :2] = (320.0, 340.0 - 40.0 * mar)
+    pts[bottom, :2] = (320.0, 340.0 + 40.0 * mar)
+    return pts
+
+
+class SyntheticTracker:
+    """
+    ``FaceROITracker`` stand-in for synthetic replays. A "frame" is a
+    1-element array holding the EAR to draw (NaN = no face); ``process``
+    turns it into landmarks with ``synthetic_face``.
+    """
+
+    def __init__(self):
+        self._pts = np.zeros((N_LANDMARKS, 3), dtype=np.float32)
+
+    def process(self, frame, out=None):
+        ear = float(frame[0])
+        if ear != ear:
+            return None
+        return synthetic_face(ear, out=self._pts)
+
+    def reset(self):
+        pass
+
+
+def build_series(segments, fps=30.0, noise=0.01, blink_every=None, seed=0):
+    """
+    Per-frame (timestamps, ear) from ``[(secs, ear), ...]`` segments.
+    ``ear=None`` means no face. Blinks (~130 ms at EAR 0.1) are added to
+    open-eye segments when ``blink_every`` (seconds) is set.
+    """
+    rng = np.random.default_rng(seed)
+    ears = []
+    for secs, ear in segments:
+        n = int(round(secs * fps))
+        if ear is None:
+            ears.append(np.full(n, np.nan))
+            continue
+        seg = ear + noise * rng.standard_normal(n)
+        if blink_every and ear > 0.25:
+            for start in range(int(blink_every * fps / 2), n - 4, int(blink_every * fps)):
+                seg[start:start + 4] = 0.1
+        ears.append(seg)
+    ear = np.concatenate(ears)
+    return np.arange(len(ear)) / fps, ear
+
+
+# name -> (segments, options, expected episodes [(start, end)] in seconds)
+SCENARIOS = {
+    "alert_driver": ([(60, 0.30)], {"blink_every": 4.0}, []),
+    "microsleep": ([(10, 0.30), (2.5, 0.12), (10, 0.30)], {"blink_every": 4.0},
+                   [(10.0, 12.5)]),
+    "long_closure": ([(5, 0.30), (6, 0.12), (5, 0.30)], {}, [(5.0, 11.0)]),
+    "face_loss": ([(10, 0.30), (3, None), (10, 0.30)], {"blink_every": 4.0}, []),
+    "repeated": ([(8, 0.30), (2, 0.12), (8, 0.30), (2, 0.12), (8, 0.30), (2, 0.12), (8, 0.30)],
+                 {}, [(8.0, 10.0), (18.0, 20.0), (28.0, 30.0)]),
+}
+
+
+# ----------------------------
+# Harness
+# ----------------------------
+class StageTimes:
+    """
+    All per-frame samples of each stage (replays are bounded, so keep them).
+    Implements the metrics hot-path interface (``now`` / ``lap`` / ``inc`` /
+    ``set``), so the detector's own stage timers record into it.
+    """
+
+    def __init__(self):
+        self.samples = {name: [] for name in STAGES}
+        self.counters = {}
+
+    def record(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds * 1000.0)
+
+    def now(self):
+        return perf_counter()
+
+    def lap(self, stage, t0):
+        t = perf_counter()
+        self.record(stage, t - t0)
+        return t
+
+    def inc(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        pass
+
+    def summary(self):
+        out = {}
+        for name, xs in self.samples.items():
+            if not xs:
+                continue
+            a = np.asarray(xs)
+            out[name] = {
+                "count": len(a),
+                "mean_ms": round(float(a.mean()), 4),
+                "p50_ms": round(float(np.percentile(a, 50)), 4),
+                "p95_ms": round(float(np.percentile(a, 95)), 4),
+                "max_ms": round(float(a.max()), 4),
+            }
+        return out
+
+
+class ReplayHarness:
+    """
+    Runs one replay through a fresh FSM and an ``EventSink`` in a temporary
+    directory (removed by ``finish()`` unless ``log_dir`` is given).
+
+    Build the detector with ``analyzer(tracker=..., face_mesh=...,
+    scheduler=...)`` (``make_analyzer`` on the virtual clock), feed frames
+    with ``step(t, frame, t_frame=None)``, then call ``finish()``.
+    """
+
+    def __init__(self, name, fsm_kwargs=None, log_dir=None):
+        self.name = name
+        self.clock = VirtualClock()
+        self.times = StageTimes()
+        self._pending = []
+        self.fsm = DrowsinessFSM(on_event=lambda event, now, ear: self._pending.append((event, now, ear)),
+                                 **(fsm_kwargs or {}))
+        self._tmp = None
+        if log_dir is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="replay_")
+            log_dir = self._tmp.name
+        self.sink = ev.EventSink(log_dir)
+        self.analyze = None
+        self.episodes = []
+        self.alerts = []            # (virtual time, frame-to-alert ms)
+        self._open = None
+        self.frames = 0
+        self.face_frames = 0
+        self.skipped = 0            # frames the scheduler did not infer
+        self._wall = 0.0
+
+    def analyzer(self, **kwargs):
+        """``make_analyzer`` for this replay's FSM, timed by the virtual clock."""
+        self.analyze = make_analyzer(self.fsm, clock=self.clock.now, metrics=self.times, **kwargs)
+        return self.analyze
+
+    def step(self, t, frame, t_frame=None):
+        """Analyze one frame at virtual time ``t``; ``t_frame`` = perf_counter at pickup."""
+        t_frame = perf_counter() if t_frame is None else t_frame
+        if self.analyze is None:
+            self.analyzer()
+        self.clock.set(t)
+        self.frames += 1
+        t0 = perf_counter()
+        res = self.analyze(frame)
+        t1 = perf_counter()
+        if res.get("skipped"):
+            self.skipped += 1
+        else:
+            self.times.record("analyze", t1 - t0)
+            self.face_frames += bool(res["face"])
+
+        if self._pending:
+            for event, now, smooth in self._pending:
+                self.sink.emit(ev.STATE_EVENTS[event], ear=smooth, ts=now)
+                if event == "Drowsiness detected":
+                    self._open = now
+                    self.alerts.append([now, None])
+                elif self._open is not None:
+                    self.episodes.append((self._open, now))
+                    self._open = None
+            self._pending.clear()
+            t2 = perf_counter()
+            self.times.record("logging", t2 - t1)
+            if self.alerts and self.alerts[-1][1] is None:
+                self.alerts[-1][1] = (t2 - t_frame) * 1000.0
+        self._wall += perf_counter() - t_frame
+        return res
+
+    def finish(self, expected=None, tolerance=EPISODE_TOLERANCE):
+        """Close the sink and return the JSON-ready result dict."""
+        if self._open is not None:
+            self.episodes.append((self._open, self.clock.now()))
+            self._open = None
+        self.sink.close()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+        failures, delays = check_episodes(self.episodes, expected, tolerance)
+        f2a = [ms for _, ms in self.alerts if ms is not None]
+        return {
+            "name": self.name,
+            "frames": self.frames,
+            "face_frames": self.face_frames,
+            "skipped": self.skipped,
+            "virtual_secs": round(self.clock.now(), 3),
+            "wall_secs": round(self._wall, 4),
+            "fps": round(self.frames / self._wall, 1) if self._wall else None,
+            "stages": self.times.summary(),
+            "episodes": [[round(s, 3), round(e, 3)] for s, e in self.episodes],
+            "expected": [list(x) for x in expected] if expected is not None else None,
+            "detect_delay_s": [round(d, 3) for d in delays],
+            "frame_to_alert_ms": round(max(f2a), 4) if f2a else None,
+            "passed": not failures,
+            "failures": failures,
+        }
+
+
+def check_episodes(actual, expected, tolerance=EPISODE_TOLERANCE):
+    """
+    Match episodes against expected ``(start, end)`` pairs. Returns
+    (failures, detection delays). An alert fires after closure onset, so a
+    start may run up to ``tolerance`` late; ends must be within
+    ``tolerance`` either way.
+    """
+    if expected is None:
+        return [], []
+    failures, delays = [], []
+    remaining = list(actual)
+    for start, end in expected:
+        match = next((a for a in remaining
+                      if 0.0 <= a[0] - start <= tolerance and abs(a[1] - end) <= tolerance), None)
+        if match is None:
+            failures.append(f"missing episode {start:.2f}-{end:.2f}s")
+            continue
+        remaining.remove(match)
+        delays.append(match[0] - start)
+    failures += [f"unexpected episode {s:.2f}-{e:.2f}s" for s, e in remaining]
+    return failures, delays
+
+
+# ----------------------------
+# Sources
+# ----------------------------
+def replay_scenario(name, fps=30.0, seed=0, fsm_kwargs=None, scheduler=None):
+    """Replay a built-in scenario through ``make_analyzer`` (optionally rate-scheduled)."""
+    segments, opts, expected = SCENARIOS[name]
+    ts, ears = build_series(segments, fps=fps, seed=seed, **opts)
+    h = ReplayHarness(name, fsm_kwargs)
+    h.analyzer(tracker=SyntheticTracker(), scheduler=scheduler)
+    frame = np.empty(1)
+    for t, ear in zip(ts.tolist(), ears.tolist()):
+        t_frame = perf_counter()
+        frame[0] = ear
+        h.step(t, frame, t_frame)
+    return h.finish(expected)
+
+
+def replay_video(path, expected=None, fsm_kwargs=None, scheduler=None):
+    """Replay a recorded clip through FaceMesh; timestamps come from the container."""
+    import cv2
+    from cv_module.drowsiness_detector import create_face_mesh
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"cannot open {path}")
+    h = ReplayHarness(path, fsm_kwargs)
+    h.analyzer(face_mesh=create_face_mesh(), scheduler=scheduler)
+    try:
+        while True:
+            t_frame = perf_counter()
+            ok, frame = cap.read()
+            if not ok:
+                break
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            h.times.record("decode", perf_counter() - t_frame)
+            h.step(t, frame, t_frame)
+    finally:
+        cap.release()
+    return h.finish(expected)
+
+
+# ----------------------------
+# Regression check
+# ----------------------------
+def compare_baseline(results, baseline, max_regress=MAX_REGRESS):
+    """Failure messages for runs whose fps dropped more than ``max_regress``."""
+    old = {r["name"]: r for r in baseline.get("results", [])}
+    failures = []
+    for r in results:
+        b = old.get(r["name"])
+        if not b or not b.get("fps") or not r.get("fps"):
+            continue
+        if r["fps"] < b["fps"] * (1.0 - max_regress):
+            failures.append(f"{r['name']}: {r['fps']} fps vs baseline {b['fps']} fps")
+    return failures
+
+
+def _parse_expect(values):
+    if values is None:
+        return None
+    return [tuple(float(x) for x in v.split(":")) for v in values]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deterministic detector replay / latency benchmark")
+    parser.add_argument("videos", nargs="*", help="recorded clips (default: synthetic scenarios)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="synthetic scenario(s) to run (default: all)")
+    parser.add_argument("--expect", action="append", metavar="START:END",
+                        help="expected episode in seconds (video replays; repeatable)")
+    parser.add_argument("--fps", type=float, default=30.0, help="synthetic frame rate")
+    parser.add_argument("--json", help="write results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="previous results JSON to compare throughput against")
+    parser.add_argument("--max-regress", type=float, default=MAX_REGRESS)
+    args = parser.parse_args(argv)
+
+    if args.videos:
+        results = [replay_video(v, _parse_expect(args.expect)) for v in args.videos]
+    else:
+        results = [replay_scenario(s, fps=args.fps) for s in (args.scenario or SCENARIOS)]
+
+    failures = [f"{r['name']}: {f}" for r in results for f in r["failures"]]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures += compare_baseline(results, json.load(f), args.max_regress)
+
+    report = {
+        "created": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+        "failures": failures,
+        "passed": not failures,
+    }
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(text)
+        for r in results:
+            status = "✅" if r["passed"] else "❌"
+            print(f"{status} {r['name']}: {r['frames']} frames, {r['fps']} fps, "
+                  f"episodes {r['episodes']}")
+    else:
+        print(text)
+    for f in failures:
+        print(f"❌ {f}", file=sys.stderr)
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+# cv_module/roi.py
+"""
+Downscaled, ROI-tracked FaceMesh inference.
+
+Instead of handing the full-resolution frame to FaceMesh every time, the
+tracker
+
+* runs a full-frame detection on a frame downscaled by ``scale``
+  (every ``redetect_every`` frames, or whenever the face is lost), and
+* in between, crops a square region around the previous frame's landmarks
+  (plus ``margin``) and resizes it to ``crop_size`` pixels.
+
+Landmarks are mapped back to original-frame pixel coordinates, so callers
+draw and compute EAR exactly as before. On a 1080p camera the crop path
+feeds FaceMesh ~256x256 pixels instead of ~2 Mpx.
+
+The two paths use separate FaceMesh instances. A video-mode
+(``static_image_mode=False``) FaceMesh tracks its own face ROI from call
+to call. Alternating downscaled full frames and crops of different
+geometry through one instance would break that tracking, so:
+
+* ``face_mesh`` (video mode) sees only the downscaled full frames;
+* ``crop_mesh`` runs in ``static_image_mode=True`` and detects afresh on
+  each crop. It is created on first use if not given.
+
+``bench_roi.py`` checks EAR against full-resolution inference on recorded
+clips (``EAR_TOLERANCE``). That error has not been measured yet (no clips
+ship with the repo), so the detector's ``ROI_TRACKING`` stays off by
+default until it has.
+"""
+import cv2
+import numpy as np
+
+from cv_module.metrics import landmarks_to_array
+
+# Mean absolute EAR error allowed vs. full-resolution inference
+EAR_TOLERANCE = 0.01
+
+
+class FaceROITracker:
+    def __init__(self, face_mesh, scale=0.5, crop_size=256, margin=0.35,
+                 redetect_every=30, crop_mesh=None):
+        self.face_mesh = face_mesh
+        self.crop_mesh = crop_mesh
+        self.scale = scale
+        self.crop_size = crop_size
+        self.margin = margin
+        self.redetect_every = redetect_every
+        self.roi = None           # (x0, y0, side) in original pixels
+        self._since_detect = 0
+        self.full_frame_runs = 0
+        self.roi_runs = 0
+
+    def reset(self):
+        self.roi = None
+        self._since_detect = 0
+
+    # ----------------------------
+    # Inference paths
+    # ----------------------------
+    def _infer_full(self, frame, out):
+        h, w = frame.shape[:2]
+        small = frame
+        if self.scale < 1.0:
+            small = cv2.resize(frame, (max(1, int(w * self.scale)), max(1, int(h * self.scale))),
+                               interpolation=cv2.INTER_AREA)
+        self.full_frame_runs += 1
+        results = self.face_mesh.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        if not results.multi_face_landmarks:
+            return None
+        # Normalized coordinates are scale-invariant: map straight to original size
+        return landmarks_to_array(results.multi_face_landmarks[0], w, h, out=out)
+
+    def _infer_roi(self, frame, out):
+        x0, y0, side = self.roi
+        crop = frame[y0:y0 + side, x0:x0 + side]
+        if crop.shape[0] != side or crop.shape[1] != side:
+            return None
+        interp = cv2.INTER_AREA if side > self.crop_size else cv2.INTER_LINEAR
+        crop = cv2.resize(crop, (self.crop_size, self.crop_size), interpolation=interp)
+        self.roi_runs += 1
+        if self.crop_mesh is None:
+            from cv_module.drowsiness_detector import create_face_mesh
+            self.crop_mesh = create_face_mesh(static_image_mode=True)
+        results = self.crop_mesh.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+        if not results.multi_face_landmarks:
+            return None
+        pts = landmarks_to_array(results.multi_face_landmarks[0], side, side, out=out)
+        pts[:, 0] += x0
+        pts[:, 1] += y0
+        return pts
+
+    def _update_roi(self, pts, w, h):
+        x_min, y_min = pts[:, 0].min(), pts[:, 1].min()
+        x_max, y_max = pts[:, 0].max(), pts[:, 1].max()
+        side = int(max(x_max - x_min, y_max - y_min) * (1.0 + 2 * self.margin))
+        side = min(side, w, h)
+        if side < 16:
+            self.roi = None
+            return
+        cx, cy = (x_min + x_max) / 2.0, (y_min + y_max) / 2.0
+        x0 = int(np.clip(cx - side / 2.0, 0, w - side))
+        y0 = int(np.clip(cy - side / 2.0, 0, h - side))
+        self.roi = (x0, y0, side)
+
+    # ----------------------------
+    # Public
+    # ----------------------------
+    def process(self, frame, out=None):
+        """
+        Landmarks for the first face as an (N, 3) array in original-frame
+        pixels, or None when no face is found.
+        """
+        h, w = frame.shape[:2]
+        pts = None
+        if self.roi is not None and self._since_detect < self.redetect_every:
+            pts = self._infer_roi(frame, out)
+            self._since_detect += 1
+        if pts is None:
+            # Periodic re-detection, or the tracked face was lost
+            pts = self._infer_full(frame, out)
+            self._since_detect = 0
+        if pts is None:
+            self.roi = None
+            return None
+        self._update_roi(pts, w, h)
+        return pts
@@ -0,0 +1,86 @@
+# cv_module/scheduler.py
+"""
+Adaptive inference rate driven by DrowsinessFSM state.
+
+While the smoothed EAR is comfortably above the FSM's open threshold the
+detector only runs FaceMesh on every ``max_stride``-th frame; as EAR
+approaches the close threshold, or when the face is lost or the driver is DROWSY, it ramps
+back to every frame.
+
+Detection delay. The FSM smooths over the last N *samples*, not over a
+time span: at stride 3 a 5-sample SMA covers ~0.5 s instead of ~0.17 s.
+A closure that starts while the stride is high would therefore take
+longer to pull the smoothed EAR under ``close_th``. So the stride is
+driven by the *raw* EAR as well: the first inferred sample below ``open_th`` drops straight to
+stride 1. That sample is seen at most ``max_skip_secs`` late (frames are
+inferred at least that often). From then on every frame is inferred, so
+the smoothing window refills at full rate with the same samples as
+without skipping, just shifted by that delay. The worst case extra delay
+is therefore ``max_skip_secs`` plus one frame: ``latency_bound(frame_period)``.
+The extra frame comes from the open-eye samples left in the window, which
+differ from the full-rate ones. Their noise moves the crossing by at most
+one frame as long as it stays below one frame's SMA step,
+(open EAR - closed EAR) / N. CLOSE_HOLD_SECS is still measured on real
+timestamps. With the smoothed EAR alone the measured worst case was
++0.3 s for a driver whose open EAR (0.36) is well above the ramp.
+tests/test_scheduler.py asserts the bound on replays of step and gradual
+closures at every stride phase.
+"""
+
+class AdaptiveInferenceScheduler:
+    def __init__(self, max_stride=3, open_margin=0.03, near_margin=0.02, max_skip_secs=0.1):
+        self.max_stride = max_stride
+        self.open_margin = open_margin      # EAR above OPEN_TH + margin → slowest rate
+        self.near_margin = near_margin      # EAR below CLOSE_TH + margin → full rate
+        self.max_skip_secs = max_skip_secs
+        self.stride = 1
+        self._since = 0                     # frames since the last inference
+        self._last_infer = None
+        self.inferred = 0
+        self.skipped = 0
+
+    def latency_bound(self, frame_period=1.0 / 30):
+        """Worst-case extra detection delay vs. full-rate inference (seconds)."""
+        return self.max_skip_secs + frame_period
+
+    def should_infer(self, now):
+        """Call once per captured frame; True when this frame should be inferred."""
+        self._since += 1
+        if (self._last_infer is None or self._since >= self.stride
+                or now - self._last_infer >= self.max_skip_secs):
+            self._since = 0
+            self._last_infer = now
+            self.inferred += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def observe(self, smooth_ear, fsm, face_found, raw_ear=None):
+        """
+        Update the stride from the latest inference result and ``fsm``'s
+        thresholds. ``raw_ear`` below ``open_th`` forces full rate at once,
+        before the (sample-count) smoothing has moved.
+        """
+        if (not face_found or fsm.state == "DROWSY" or smooth_ear is None
+                or (raw_ear is not None and raw_ear < fsm.open_th)):
+            self.stride = 1
+            return
+        hi = fsm.open_th + self.open_margin
+        lo = fsm.close_th + self.near_margin
+        if smooth_ear >= hi:
+            self.stride = self.max_stride
+        elif smooth_ear <= lo:
+            self.stride = 1
+        else:
+            # Linear ramp between full rate (near close) and max stride (clearly open)
+            frac = (smooth_ear - lo) / (hi - lo)
+            self.stride = 1 + int(frac * (self.max_stride - 1))
+
+    def stats(self):
+        total = self.inferred + self.skipped
+        return {
+            "stride": self.stride,
+            "inferred": self.inferred,
+            "skipped": self.skipped,
+            "infer_ratio": round(self.inferred / total, 3) if total else 1.0,
+        }
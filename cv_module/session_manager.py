@@ -0,0 +1,278 @@
+# cv_module/session_manager.py
+"""
+Multi-camera / multi-driver session manager.
+
+Each camera source gets a ``StreamSession`` with its own capture thread,
+``DrowsinessFSM`` (and smoothing history), FaceMesh instance and event
+stream (events carry ``stream=<id>``). FaceMesh inference for all streams
+runs on one shared thread pool sized to the available cores, so adding a
+stream never adds inference threads: aggregate CPU stays bounded and, once
+the pool is saturated, each stream simply processes a smaller share of its
+frames (reported as its drop rate).
+
+A stream is inferred by at most one worker at a time, which keeps its
+FaceMesh tracking state and FSM single-threaded.
+
+    python -m cv_module.session_manager 0 1 rtsp://cab3/stream --workers 4
+"""
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+
+import cv2
+
+from cv_module.drowsiness_detector import (
+    DrowsinessFSM, analyze_frame, create_face_mesh, make_calibrator, make_scheduler, play_beep,
+)
+from cv_module.filters import FILTERS
+from log_module.event_sink import get_event_sink, STATE_EVENTS
+
+
+def default_workers():
+    # Leave one core for capture threads and the scheduler
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+class StreamSession:
+    """One camera: capture thread + latest-frame slot + per-stream FSM."""
+
+    def __init__(self, stream_id, source, beep=True, fps_alpha=0.1, max_events=100,
+                 driver_id=None, smoothing=None):
+        self.stream_id = str(stream_id)
+        self.source = source
+        self.beep = beep
+        self.fsm = DrowsinessFSM(on_event=self._on_event, smoother=smoothing)
+        self.calibrator = make_calibrator(self.fsm, driver_id)   # per-driver thresholds
+        self.face_mesh = None           # created on the first inference
+        self.scheduler = make_scheduler()  # per-stream adaptive inference rate
+        self.events = deque(maxlen=max_events)
+        self.last_result = None
+
+        self._lock = threading.Lock()
+        self._frame = None               # latest captured, not yet inferred
+        self._stop = threading.Event()
+        self._thread = None
+        self.busy = False                # set by the manager while a worker owns it
+        self.last_dispatch = 0.0
+
+        self.captured = 0
+        self.processed = 0
+        self.dropped = 0
+        self.skipped = 0                 # frames the rate scheduler chose not to infer
+        self.fps = 0.0
+        self._fps_alpha = fps_alpha
+        self._last_done = None
+        self.alive = False
+
+    # ----------------------------
+    # Events
+    # ----------------------------
+    def _on_event(self, event, now, ear):
+        self.events.append((now, event, ear))
+        get_event_sink().emit(STATE_EVENTS.get(event, event), ear=ear, stream=self.stream_id)
+        if self.beep and event == "Drowsiness detected":
+            play_beep()
+
+    # ----------------------------
+    # Capture
+    # ----------------------------
+    def start(self):
+        self._thread = threading.Thread(target=self._capture_loop,
+                                        name=f"capture-{self.stream_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.calibrator is not None:
+            self.calibrator.close()
+
+    def _capture_loop(self):
+        src = int(self.source) if str(self.source).isdigit() else self.source
+        cap = cv2.VideoCapture(src)
+        self.alive = cap.isOpened()
+        # Files are replayed at their native rate, cameras deliver their own
+        is_file = isinstance(src, str) and os.path.isfile(src)
+        period = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file else 0.0
+        next_t = monotonic()
+        while self.alive and not self._stop.is_set():
+            ok, frame = cap.read()
+            if not ok:
+                break
+            with self._lock:
+                if self._frame is not None:
+                    self.dropped += 1   # previous frame never reached a worker
+                self._frame = frame
+                self.captured += 1
+            if period:
+                next_t += period
+                delay = next_t - monotonic()
+                if delay > 0:
+                    sleep(delay)
+        self.alive = False
+        cap.release()
+
+    def take_frame(self):
+        with self._lock:
+            frame, self._frame = self._frame, None
+        if (frame is not None and self.scheduler is not None
+                and not self.scheduler.should_infer(monotonic())):
+            self.skipped += 1
+            return None
+        return frame
+
+    # ----------------------------
+    # Inference (runs on a pool worker)
+    # ----------------------------
+    def infer(self, frame):
+        if self.face_mesh is None:
+            self.face_mesh = create_face_mesh()
+        res = self.last_result = analyze_frame(frame, self.fsm, face_mesh=self.face_mesh,
+                                               calibrator=self.calibrator)
+        if self.scheduler is not None:
+            self.scheduler.observe(res.get("smooth_ear"), self.fsm, res["face"], res.get("ear"))
+        now = monotonic()
+        if self._last_done is not None:
+            inst = 1.0 / max(now - self._last_done, 1e-6)
+            self.fps = inst if self.processed == 1 else self.fps + self._fps_alpha * (inst - self.fps)
+        self._last_done = now
+        self.processed += 1
+
+    def stats(self):
+        res = self.last_result or {}
+        return {
+            "stream": self.stream_id,
+            "alive": self.alive,
+            "fps": round(self.fps, 1),
+            "captured": self.captured,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "drop_rate": round(self.dropped / self.captured, 3) if self.captured else 0.0,
+            "skipped": self.skipped,
+            "stride": self.scheduler.stride if self.scheduler is not None else 1,
+            "state": self.fsm.state,
+            "smooth_ear": round(res["smooth_ear"], 3) if res.get("face") else None,
+        }
+
+
+class SessionManager:
+    """Runs N ``StreamSession``s with inference on a shared worker pool."""
+
+    def __init__(self, sources=(), workers=None, beep=True, smoothing=None):
+        self.workers = workers or default_workers()
+        self.beep = beep
+        self.smoothing = smoothing       # default EAR filter for new streams
+        self.sessions = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="facemesh")
+        self._slots = threading.Semaphore(self.workers)   # bounds in-flight inferences
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._scheduler = None
+        self._lock = threading.Lock()
+        for i, src in enumerate(sources):
+            self.add_stream(f"cam{i}", src)
+
+    def add_stream(self, stream_id, source, driver_id=None, smoothing=None):
+        session = StreamSession(stream_id, source, beep=self.beep, driver_id=driver_id,
+                                smoothing=smoothing or self.smoothing)
+        with self._lock:
+            self.sessions[session.stream_id] = session
+        if self._scheduler is not None:
+            session.start()
+        return session
+
+    def remove_stream(self, stream_id):
+        with self._lock:
+            session = self.sessions.pop(str(stream_id), None)
+        if session is not None:
+            session.stop()
+
+    def start(self):
+        for s in list(self.sessions.values()):
+            s.start()
+        self._scheduler = threading.Thread(target=self._schedule_loop, name="scheduler", daemon=True)
+        self._scheduler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for s in list(self.sessions.values()):
+            s.stop()
+        if self._scheduler is not None:
+            self._scheduler.join(timeout=2.0)
+        self._pool.shutdown(wait=True)
+
+    def _run(self, session, frame):
+        try:
+            session.infer(frame)
+        finally:
+            session.busy = False
+            self._slots.release()
+            self._wake.set()
+
+    def _schedule_loop(self):
+        # Fair share: idle streams with a fresh frame are served longest-waiting first
+        while not self._stop.is_set():
+            dispatched = False
+            with self._lock:
+                sessions = sorted(self.sessions.values(), key=lambda s: s.last_dispatch)
+            for s in sessions:
+                if s.busy:
+                    continue
+                if not self._slots.acquire(blocking=False):
+                    break
+                frame = s.take_frame()
+                if frame is None:
+                    self._slots.release()
+                    continue
+                s.busy = True
+                s.last_dispatch = monotonic()
+                dispatched = True
+                self._pool.submit(self._run, s, frame)
+            if not dispatched:
+                self._wake.wait(timeout=0.005)
+                self._wake.clear()
+
+    def stats(self):
+        with self._lock:
+            per_stream = [s.stats() for s in self.sessions.values()]
+        return {"workers": self.workers, "streams": per_stream}
+
+    @property
+    def active(self):
+        return any(s.alive for s in self.sessions.values())
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the detector on several cameras")
+    parser.add_argument("sources", nargs="+", help="camera indices, files or stream URLs")
+    parser.add_argument("--workers", type=int, default=None, help="inference threads (default: cores - 1)")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between stats lines")
+    parser.add_argument("--no-beep", action="store_true")
+    parser.add_argument("--filter", default=None, choices=sorted(FILTERS),
+                        help="EAR smoothing filter for every stream")
+    args = parser.parse_args(argv)
+
+    mgr = SessionManager(args.sources, workers=args.workers, beep=not args.no_beep,
+                         smoothing=args.filter).start()
+    print(f"🚗 {len(mgr.sessions)} streams on {mgr.workers} inference workers. Ctrl+C to stop.")
+    try:
+        sleep(1.0)
+        while mgr.active:
+            sleep(args.report_every)
+            for st in mgr.stats()["streams"]:
+                print(f"[{st['stream']}] {st['fps']:5.1f} fps | drop {st['drop_rate']:.1%} "
+                      f"| {st['state']} | EAR {st['smooth_ear']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mgr.stop()
+
+
+if __name__ == "__main__":
+    main()
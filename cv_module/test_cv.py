@@ -3,32 +3,24 @@ import mediapipe as mp
 import numpy as np
 import time
 
+from cv_module.drowsiness_detector import EAR_CLOSE_TH
+from cv_module.metrics import LEFT_EYE, RIGHT_EYE, landmarks_to_array, eye_aspect_ratios
+
 # Initialize mediapipe face mesh
 mp_face_mesh = mp.solutions.face_mesh
 face_mesh = mp_face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
 mp_drawing = mp.solutions.drawing_utils
 
-# EAR calculation function
-def calculate_EAR(eye_landmarks, frame_w, frame_h):
-    # Convert normalized landmarks to pixel coordinates
-    points = [(int(lm.x * frame_w), int(lm.y * frame_h)) for lm in eye_landmarks]
-
-    # EAR formula
-    A = np.linalg.norm(np.array(points[1]) - np.array(points[5]))
-    B = np.linalg.norm(np.array(points[2]) - np.array(points[4]))
-    C = np.linalg.norm(np.array(points[0]) - np.array(points[3]))
-    EAR = (A + B) / (2.0 * C)
-    return EAR
-
 # Open webcam
 cap = cv2.VideoCapture(0)
 
 # Thresholds
-EAR_THRESHOLD = 0.25
+EAR_THRESHOLD = EAR_CLOSE_TH
 CONSEC_FRAMES = 20  # how many frames to confirm drowsiness
 
 counter = 0
 drowsy = False
+pts = None  # reused (N, 3) landmark buffer
 
 while cap.isOpened():
     success, frame = cap.read()
@@ -41,23 +33,13 @@ while cap.isOpened():
 
     if results.multi_face_landmarks:
         for face_landmarks in results.multi_face_landmarks:
-            # Left & Right eye indices from Mediapipe
-            left_eye_indices = [33, 160, 158, 133, 153, 144]   # [p1, p2, p3, p4, p5, p6]
-            right_eye_indices = [362, 385, 387, 263, 373, 380]
-
-            # Extract landmarks
-            left_eye = [face_landmarks.landmark[i] for i in left_eye_indices]
-            right_eye = [face_landmarks.landmark[i] for i in right_eye_indices]
-
-            # Calculate EAR
-            left_EAR = calculate_EAR(left_eye, frame_w, frame_h)
-            right_EAR = calculate_EAR(right_eye, frame_w, frame_h)
-            EAR = (left_EAR + right_EAR) / 2.0
+            # Landmarks to one (N, 3) pixel array, EAR for both eyes at once
+            pts = landmarks_to_array(face_landmarks, frame_w, frame_h, out=pts)
+            EAR = float(eye_aspect_ratios(pts).mean())
 
             # Draw eyes
-            for lm in left_eye + right_eye:
-                x, y = int(lm.x * frame_w), int(lm.y * frame_h)
-                cv2.circle(frame, (x, y), 2, (0, 255, 0), -1)
+            for x, y in pts[LEFT_EYE + RIGHT_EYE, :2].astype(np.int32):
+                cv2.circle(frame, (int(x), int(y)), 2, (0, 255, 0), -1)
 
             # Drowsiness detection
             if EAR < EAR_THRESHOLD:
@@ -0,0 +1,142 @@
+# dashboard/bench_dashboard.py
+"""
+Load test for the dashboard's event index on synthetic fleet streams.
+
+    python -m dashboard.bench_dashboard                       # 100 vehicles, 1 year
+    python -m dashboard.bench_dashboard --vehicles 500 --rate 2000 --secs 20
+
+1. Writes ``--days`` of history for ``--vehicles`` streams (drowsy / yawn /
+   fatigue episodes and head nods, in time order) to a temporary events.jsonl.
+2. Cold-loads it into a ``LiveIndex`` (what the app's ``cache_resource`` does).
+3. Appends ``--rate`` events/s from a writer thread for ``--secs`` seconds. At
+   the same time, the main loop runs the app's per-tick work every
+   ``--refresh`` seconds: ``refresh()`` plus the views for every window.
+   It reports the tick latency.
+
+Ticks must stay under one second at p99.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from time import perf_counter
+
+import numpy as np
+
+from dashboard.event_index import WINDOWS, LiveIndex
+from log_module import event_sink as ev
+
+EPISODE_EVENTS = ((ev.DROWSINESS_DETECTED, ev.EYES_OPEN, 0.5),
+                  (ev.YAWN_DETECTED, ev.YAWN_ENDED, 0.3),
+                  (ev.FATIGUE_DETECTED, ev.FATIGUE_CLEARED, 0.05))
+
+
+def synthetic_lines(vehicles, t0, t1, events_per_day, rng):
+    """JSON lines for [t0, t1) sorted by time, roughly ``events_per_day`` per vehicle."""
+    n = max(1, int(vehicles * events_per_day * (t1 - t0) / 86400 / 2))
+    start = np.sort(rng.uniform(t0, t1, n))
+    stream = rng.integers(0, vehicles, n)
+    kind = rng.choice(4, n, p=[0.5, 0.3, 0.05, 0.15])
+    dur = rng.gamma(2.0, 2.0, n) + 0.5
+
+    rows = []
+    for t, s, k, d in zip(start.tolist(), stream.tolist(), kind.tolist(), dur.tolist()):
+        name = f"truck-{s:03d}"
+        if k == 3:
+            rows.append((t, ev.HEAD_NOD, name))
+            continue
+        first, last, _ = EPISODE_EVENTS[k]
+        rows.append((t, first, name))
+        rows.append((t + d, last, name))
+    rows.sort(key=lambda r: r[0])
+    return [json.dumps({"ts": round(t, 3), "type": e, "ear": 0.2, "stream": s},
+                       separators=(",", ":")) + "\n" for t, e, s in rows]
+
+
+def tick(idx):
+    """The dashboard fragment's work for one refresh."""
+    idx.refresh()
+    with idx.lock:
+        now = idx.now()
+        for window in WINDOWS.values():
+            idx.summary(window, now)
+            idx.timeline(window, now)
+            idx.recent_episodes(50, window, now)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=100)
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--per-day", type=float, default=40,
+                        help="history events per vehicle per day")
+    parser.add_argument("--rate", type=float, default=500, help="live events/s appended")
+    parser.add_argument("--secs", type=float, default=10)
+    parser.add_argument("--refresh", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    tmp = tempfile.mkdtemp(prefix="dsa_dash_")
+    path = os.path.join(tmp, "events.jsonl")
+
+    now = time.time()
+    t0 = perf_counter()
+    lines = synthetic_lines(args.vehicles, now - args.days * 86400, now, args.per_day, rng)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    size_mb = os.path.getsize(path) / 1e6
+    print(f"📝 {len(lines):,} history events ({size_mb:.0f} MB) in {perf_counter() - t0:.1f}s")
+
+    t0 = perf_counter()
+    idx = LiveIndex(path)
+    idx.refresh()
+    load = perf_counter() - t0
+    print(f"📦 Cold load: {load:.2f}s ({len(lines) / load / 1e3:.0f}k events/s), "
+          f"{len(idx.episodes):,} episodes indexed")
+
+    t0 = perf_counter()
+    tick(idx)
+    print(f"🧮 First render of all windows: {1000 * (perf_counter() - t0):.1f} ms")
+
+    # Live phase: writer thread appends batches every 50 ms
+    stop = threading.Event()
+    written = [0]
+
+    def writer():
+        with open(path, "a", encoding="utf-8") as f:
+            while not stop.is_set():
+                t = time.time()
+                batch = synthetic_lines(args.vehicles, t - 0.05, t,
+                                        args.rate * 86400 / args.vehicles, rng)
+                f.writelines(batch)
+                f.flush()
+                written[0] += len(batch)
+                stop.wait(0.05)
+
+    w = threading.Thread(target=writer, daemon=True)
+    w.start()
+    ticks = []
+    end = time.monotonic() + args.secs
+    while time.monotonic() < end:
+        t0 = perf_counter()
+        tick(idx)
+        ticks.append(perf_counter() - t0)
+        time.sleep(max(0.0, args.refresh - ticks[-1]))
+    stop.set()
+    w.join()
+
+    ms = 1000 * np.array(ticks)
+    p50, p99 = np.percentile(ms, [50, 99])
+    print(f"⏱️ Live: {written[0]:,} events appended, {len(ms)} ticks | "
+          f"p50 {p50:.1f} ms  p99 {p99:.1f} ms  max {ms.max():.1f} ms")
+    print("✅ Sub-second refresh" if p99 < 1000 else "❌ p99 refresh over 1 s")
+    os.remove(path)
+    os.rmdir(tmp)
+    return 0 if p99 < 1000 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,409 @@
+# dashboard/event_index.py
+"""
+Incrementally updated, in-memory index over the detector's event stream.
+
+``EventTail`` follows ``events.jsonl`` by byte offset. Each ``poll()`` reads
+only the bytes appended since the last one and returns the complete lines
+as events. It also notices truncation and rotation.
+
+``EventIndex`` folds events into two time-indexed structures with bounded
+retention (``RETENTION_DAYS``):
+
+* ``MinuteRing``  per-minute (and per-hour rollup) counts in a fixed
+                  (buckets, columns) array addressed by ``bucket % capacity``;
+                  updates are O(1) and a window query is one vectorized
+                  gather over whole hours plus the minutes at its edges
+* ``EpisodeLog``  closed episodes (drowsy / yawn / fatigue) paired from their
+                  start and end events, kept in growable NumPy columns sorted
+                  by end time; range queries use ``searchsorted``
+
+``LiveIndex`` bundles a tail with an index. ``refresh()`` ingests only the
+delta, and ``version`` changes only when new events arrive. Views built
+from the index can therefore be cached on ``version``, and a refresh with
+no new events costs one ``stat()``.
+
+Minutes are local wall-clock minutes, using the UTC offset at import time,
+so day buckets line up with local days.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from log_module import event_sink as ev
+
+EVENTS_PATH = os.path.join(ev.LOG_DIR, ev.EVENTS_FILE)
+RETENTION_DAYS = 366
+POLL_MAX_BYTES = 32 * 1024 * 1024     # per read; a cold load loops over chunks
+MAX_POINTS = 1500                     # timeline points per chart
+
+# Per-minute count columns
+COLUMNS = ("drowsy", "yawn", "nod", "fatigue")
+COUNT_EVENTS = {
+    ev.DROWSINESS_DETECTED: 0,
+    ev.YAWN_DETECTED: 1,
+    ev.HEAD_NOD: 2,
+    ev.FATIGUE_DETECTED: 3,
+}
+
+# Episode kinds: start event -> (kind, end event)
+EPISODE_KINDS = ("drowsy", "yawn", "fatigue")
+EPISODE_PAIRS = {
+    ev.DROWSINESS_DETECTED: (0, ev.EYES_OPEN),
+    ev.YAWN_DETECTED: (1, ev.YAWN_ENDED),
+    ev.FATIGUE_DETECTED: (2, ev.FATIGUE_CLEARED),
+}
+EPISODE_ENDS = {end: kind for kind, end in EPISODE_PAIRS.values()}
+
+# Dashboard windows (seconds)
+WINDOWS = {
+    "Last hour": 3600,
+    "Last 24 hours": 86400,
+    "Last 7 days": 7 * 86400,
+    "Last 30 days": 30 * 86400,
+    "Last year": 365 * 86400,
+}
+
+# Bucket sizes (minutes) tried in order until a window fits MAX_POINTS
+BUCKET_MINUTES = (1, 5, 15, 60, 360, 1440)
+
+_UTC_OFFSET = datetime.now().astimezone().utcoffset().total_seconds()
+
+
+def local_minute(ts):
+    return int((ts + _UTC_OFFSET) // 60)
+
+
+def to_local(ts):
+    """Epoch seconds (array) -> naive local datetimes, whole seconds."""
+    return pd.to_datetime(np.asarray(ts, dtype=np.float64) + _UTC_OFFSET, unit="s").floor("s")
+
+
+def stream_of(event):
+    """Stream / vehicle an event belongs to (single-camera logs: "default")."""
+    return event.get("stream") or event.get("vehicle") or "default"
+
+
+# ----------------------------
+# File tail
+# ----------------------------
+class EventTail:
+    def __init__(self, path=EVENTS_PATH, max_bytes=POLL_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.offset = 0
+        self._inode = None
+        self.rotations = 0
+        self.bad_lines = 0
+        self.more = False                     # last poll stopped at max_bytes
+
+    def poll(self):
+        """Events appended since the last poll (at most ``max_bytes`` worth)."""
+        self.more = False
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if self._inode is not None and (st.st_ino != self._inode or st.st_size < self.offset):
+            # Rotated or truncated: the new file starts from scratch
+            self.offset = 0
+            self.rotations += 1
+        self._inode = st.st_ino
+        if st.st_size <= self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(self.max_bytes)
+        self.more = len(data) == self.max_bytes
+        end = data.rfind(b"\n") + 1       # a partial last line waits for the next poll
+        if end == 0:
+            self.more = False
+            return []
+        self.offset += end
+        events = []
+        for line in data[:end].splitlines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                self.bad_lines += 1
+        return events
+
+
+# ----------------------------
+# Per-minute aggregates
+# ----------------------------
+class MinuteRing:
+    """
+    Fixed-capacity counters per time bucket (``bucket`` minutes each); old
+    buckets are overwritten in place.
+    """
+
+    def __init__(self, minutes, columns=COLUMNS, bucket=1):
+        self.bucket = bucket
+        self.capacity = int(minutes) // bucket
+        self.columns = columns
+        self.counts = np.zeros((self.capacity, len(columns)), dtype=np.int32)
+        self.stamp = np.full(self.capacity, -1, dtype=np.int64)   # bucket held by each slot
+
+    def add(self, minute, col, n=1):
+        b = minute // self.bucket
+        slot = b % self.capacity
+        held = self.stamp[slot]
+        if held != b:
+            if held > b:
+                return False                  # older than retention
+            self.counts[slot] = 0
+            self.stamp[slot] = b
+        self.counts[slot, col] += n
+        return True
+
+    def window(self, b0, b1):
+        """(b1 - b0, columns) counts for buckets [b0, b1)."""
+        buckets = np.arange(b0, b1, dtype=np.int64)
+        slots = buckets % self.capacity
+        return self.counts[slots] * (self.stamp[slots] == buckets)[:, None]
+
+
+# ----------------------------
+# Episodes
+# ----------------------------
+class EpisodeLog:
+    """Closed episodes as NumPy columns, sorted by end time."""
+
+    _FIELDS = (("start", np.float64), ("end", np.float64), ("kind", np.int8),
+               ("stream", np.int32))
+
+    def __init__(self, capacity=1024):
+        self._cols = {name: np.empty(capacity, dtype=dt) for name, dt in self._FIELDS}
+        self.head = 0                         # first retained row
+        self.size = 0                         # one past the last row
+        self.streams = []                     # stream code -> name
+        self._codes = {}
+        self._sorted = True
+
+    def __len__(self):
+        return self.size - self.head
+
+    def add(self, start, end, kind, stream):
+        if self.size == len(self._cols["end"]):
+            self._grow()
+        code = self._codes.get(stream)
+        if code is None:
+            code = self._codes[stream] = len(self.streams)
+            self.streams.append(stream)
+        i = self.size
+        if i > self.head and end < self._cols["end"][i - 1]:
+            self._sorted = False              # merged fleet logs can interleave slightly
+        self._cols["start"][i] = start
+        self._cols["end"][i] = end
+        self._cols["kind"][i] = kind
+        self._cols["stream"][i] = code
+        self.size += 1
+
+    def _grow(self):
+        live = self.size - self.head
+        cap = max(1024, 2 * live)
+        for name, dt in self._FIELDS:
+            col = np.empty(cap, dtype=dt)
+            col[:live] = self._cols[name][self.head:self.size]
+            self._cols[name] = col
+        self.head, self.size = 0, live
+
+    def _ensure_sorted(self):
+        if self._sorted:
+            return
+        order = self.head + np.argsort(self._cols["end"][self.head:self.size], kind="stable")
+        for name in self._cols:
+            self._cols[name][self.head:self.size] = self._cols[name][order]
+        self._sorted = True
+
+    def expire(self, before):
+        """Drop episodes that ended before ``before``."""
+        self._ensure_sorted()
+        self.head += int(np.searchsorted(self._cols["end"][self.head:self.size], before))
+
+    def range(self, t0=None, t1=None):
+        """Row slice of episodes ending in [t0, t1)."""
+        self._ensure_sorted()
+        ends = self._cols["end"][self.head:self.size]
+        i0 = 0 if t0 is None else int(np.searchsorted(ends, t0))
+        i1 = len(ends) if t1 is None else int(np.searchsorted(ends, t1))
+        return slice(self.head + i0, self.head + i1)
+
+    def column(self, name, rows):
+        return self._cols[name][rows]
+
+
+# ----------------------------
+# Index
+# ----------------------------
+class EventIndex:
+    def __init__(self, retention_days=RETENTION_DAYS):
+        self.retention_secs = retention_days * 86400.0
+        self.minutes = MinuteRing(retention_days * 1440)
+        self.hours = MinuteRing(retention_days * 1440, bucket=60)
+        self.episodes = EpisodeLog()
+        self.version = 0                      # bumped whenever new events are ingested
+        self.events = 0
+        self.latest_ts = None
+        self.totals = dict.fromkeys(COLUMNS, 0)
+        self.last_seen = {}                   # stream -> latest event ts
+        self._open = {}                       # (stream, kind) -> start ts
+        self._views = {}
+
+    def ingest(self, events):
+        """Fold a batch of event dicts into the index; returns how many were used."""
+        used = 0
+        latest = self.latest_ts or 0.0
+        for e in events:
+            ts = e.get("ts")
+            etype = e.get("type")
+            if ts is None or etype is None:
+                continue
+            ts = float(ts)
+            stream = stream_of(e)
+            used += 1
+            if ts > latest:
+                latest = ts
+            if ts > self.last_seen.get(stream, 0.0):
+                self.last_seen[stream] = ts
+
+            col = COUNT_EVENTS.get(etype)
+            if col is not None:
+                minute = local_minute(ts)
+                if self.minutes.add(minute, col):
+                    self.hours.add(minute, col)
+                    self.totals[COLUMNS[col]] += 1
+
+            pair = EPISODE_PAIRS.get(etype)
+            if pair is not None:
+                # Starts are emitted on transitions, so a second start means the
+                # previous episode's end was lost: the newest start wins.
+                self._open[(stream, pair[0])] = ts
+                continue
+            kind = EPISODE_ENDS.get(etype)
+            if kind is not None:
+                start = self._open.pop((stream, kind), None)
+                if start is not None:
+                    self.episodes.add(start, ts, kind, stream)
+        if used:
+            self.events += used
+            self.latest_ts = latest
+            self.episodes.expire(latest - self.retention_secs)
+            self.version += 1
+            self._views.clear()
+        return used
+
+    # ----------------------------
+    # Views (memoized per version)
+    # ----------------------------
+    def _memo(self, key, build):
+        out = self._views.get(key)
+        if out is None:
+            out = self._views[key] = build()
+        return out
+
+    def counts(self, m0, m1):
+        """Per-column totals for local minutes [m0, m1): whole hours + edge minutes."""
+        h0, h1 = -(-m0 // 60), m1 // 60
+        if h1 <= h0:
+            return self.minutes.window(m0, m1).sum(axis=0)
+        return (self.minutes.window(m0, h0 * 60).sum(axis=0)
+                + self.hours.window(h0, h1).sum(axis=0)
+                + self.minutes.window(h1 * 60, m1).sum(axis=0))
+
+    def now(self):
+        """Live data: wall clock; replayed history: the newest event."""
+        t = time.time()
+        if self.latest_ts is not None and self.latest_ts < t - self.retention_secs:
+            return self.latest_ts
+        return t
+
+    def timeline(self, window_secs, now=None):
+        """
+        Counts per bucket over the last ``window_secs`` as a DataFrame indexed
+        by bucket start (local time). The bucket size grows with the window so
+        at most ``MAX_POINTS`` rows come back.
+        """
+        now = self.now() if now is None else now
+        span = max(1, int(min(window_secs, self.retention_secs) // 60))
+        bucket = next((b for b in BUCKET_MINUTES if span / b <= MAX_POINTS), BUCKET_MINUTES[-1])
+        m1 = (local_minute(now) // bucket + 1) * bucket
+        m0 = m1 - -(-span // bucket) * bucket
+
+        def build():
+            ring, step = (self.hours, bucket // 60) if bucket >= 60 else (self.minutes, bucket)
+            counts = ring.window(m0 // ring.bucket, m1 // ring.bucket)
+            counts = counts.reshape(-1, step, len(COLUMNS)).sum(axis=1)
+            index = pd.to_datetime(np.arange(m0, m1, bucket) * 60, unit="s")
+            return pd.DataFrame(counts, index=index, columns=list(COLUMNS))
+
+        return self._memo(("timeline", m0, m1, bucket), build)
+
+    def summary(self, window_secs, now=None):
+        """Event counts and episode stats for the last ``window_secs``."""
+        now = self.now() if now is None else now
+
+        def build():
+            m1 = local_minute(now) + 1
+            counts = self.counts(m1 - int(window_secs // 60), m1)
+            rows = self.episodes.range(now - window_secs, None)
+            kinds = self.episodes.column("kind", rows)
+            drowsy = kinds == 0
+            dur = self.episodes.column("end", rows) - self.episodes.column("start", rows)
+            out = {c: int(n) for c, n in zip(COLUMNS, counts)}
+            out.update({
+                "episodes": int(len(kinds)),
+                "drowsy_secs": float(dur[drowsy].sum()),
+                "longest_drowsy_secs": float(dur[drowsy].max()) if drowsy.any() else 0.0,
+                "active_streams": sum(1 for t in self.last_seen.values() if t >= now - window_secs),
+            })
+            return out
+
+        return self._memo(("summary", int(window_secs), local_minute(now)), build)
+
+    def recent_episodes(self, limit=50, window_secs=None, now=None):
+        """Newest-first DataFrame of up to ``limit`` closed episodes."""
+        now = self.now() if now is None else now
+        t0 = None if window_secs is None else now - window_secs
+
+        def build():
+            rows = self.episodes.range(t0, None)
+            rows = slice(max(rows.start, rows.stop - limit), rows.stop)
+            start = self.episodes.column("start", rows)[::-1]
+            end = self.episodes.column("end", rows)[::-1]
+            return pd.DataFrame({
+                "start": to_local(start),
+                "end": to_local(end),
+                "duration_sec": np.round(end - start, 1),
+                "kind": [EPISODE_KINDS[k] for k in self.episodes.column("kind", rows)[::-1]],
+                "stream": [self.episodes.streams[s]
+                           for s in self.episodes.column("stream", rows)[::-1]],
+            })
+
+        key = ("recent", limit, None if t0 is None else local_minute(t0))
+        return self._memo(key, build)
+
+
+class LiveIndex(EventIndex):
+    """
+    ``EventIndex`` fed from a tailed events.jsonl. Shared between dashboard
+    sessions: hold ``lock`` while reading views.
+    """
+
+    def __init__(self, path=EVENTS_PATH, retention_days=RETENTION_DAYS):
+        super().__init__(retention_days)
+        self.tail = EventTail(path)
+        self.lock = threading.RLock()
+
+    def refresh(self):
+        """Ingest everything appended since the last refresh; returns the event count."""
+        with self.lock:
+            n = self.ingest(self.tail.poll())
+            while self.tail.more:
+                n += self.ingest(self.tail.poll())
+            return n
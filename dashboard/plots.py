@@ -1,5 +1,55 @@
-# dashboard/streamlit_app.py
-import streamlit as st
+# dashboard/plots.py
+"""
+Chart helpers for the dashboard. Time series go straight to Streamlit's
+native charts, so only the hour-of-day heatmap needs matplotlib. It is
+rendered to PNG bytes that the app caches per index version.
+"""
+import io
 
-st.title("Driver Safety Dashboard")
-st.write("This dashboard will show alerts, stress levels, and drowsiness stats.")
+import numpy as np
+import pandas as pd
+
+from dashboard.event_index import to_local
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def hour_weekday_counts(timeline, column="drowsy"):
+    """(7, 24) weekday x hour-of-day totals from an hourly-or-finer timeline."""
+    s = timeline[column]
+    grid = np.zeros((7, 24), dtype=np.int64)
+    np.add.at(grid, (s.index.dayofweek, s.index.hour), s.to_numpy())
+    return grid
+
+
+def heatmap_png(grid, title="Drowsy alerts by hour"):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(9, 2.8))
+    im = ax.imshow(grid, aspect="auto", cmap="Reds")
+    ax.set_yticks(range(7), WEEKDAYS)
+    ax.set_xticks(range(0, 24, 2))
+    ax.set_xlabel("Hour of day")
+    ax.set_title(title)
+    fig.colorbar(im, ax=ax)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=100)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def streams_frame(last_seen, now, stale_secs=300):
+    """Per-stream status table: last event and whether it is still reporting."""
+    if not last_seen:
+        return pd.DataFrame(columns=["stream", "last_event", "active"])
+    names = list(last_seen)
+    ts = np.array([last_seen[n] for n in names])
+    df = pd.DataFrame({
+        "stream": names,
+        "last_event": to_local(ts),
+        "active": ts >= now - stale_secs,
+    })
+    return df.sort_values("last_event", ascending=False, ignore_index=True)
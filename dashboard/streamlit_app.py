@@ -1,6 +1,100 @@
-# dashboard/plots.py
-def plot_dummy_data():
-    """
-    Placeholder for plotting
-    """
-    print("Plotting data...")
+# dashboard/streamlit_app.py
+"""
+Live driver-safety dashboard.
+
+    streamlit run dashboard/streamlit_app.py [-- --events data/logs/events.jsonl]
+
+The event index is loaded once per process (``st.cache_resource``) and
+shared by every browser session. A fragment re-runs every ``REFRESH_SECS``:
+it ingests only the bytes appended to events.jsonl since the last tick,
+and rebuilds a view only when the index ``version`` changed. Idle ticks
+cost one ``stat()``.
+"""
+import argparse
+import os
+import sys
+
+# ``streamlit run`` only puts dashboard/ on sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+
+from dashboard import plots
+from dashboard.event_index import EVENTS_PATH, WINDOWS, LiveIndex
+
+REFRESH_SECS = 1.0
+RECENT_EPISODES = 50
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", default=EVENTS_PATH)
+    return parser.parse_known_args()[0]
+
+
+@st.cache_resource(show_spinner="Loading event history...")
+def live_index(path):
+    idx = LiveIndex(path)
+    idx.refresh()
+    return idx
+
+
+@st.cache_data(max_entries=16)
+def heatmap(path, version, window_secs):
+    # ``version`` is only part of the cache key: a new PNG only after new events
+    idx = live_index(path)
+    with idx.lock:
+        # Hourly resolution tops out at 30 days (MAX_POINTS)
+        timeline = idx.timeline(min(window_secs, 30 * 86400))
+    return plots.heatmap_png(plots.hour_weekday_counts(timeline))
+
+
+# st.fragment replaced st.experimental_fragment in Streamlit 1.37
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+
+@_fragment(run_every=REFRESH_SECS)
+def live_panel(path, window_label):
+    idx = live_index(path)
+    window = WINDOWS[window_label]
+    idx.refresh()
+    with idx.lock:
+        now = idx.now()
+        summary = idx.summary(window, now)
+        timeline = idx.timeline(window, now)
+        recent = idx.recent_episodes(RECENT_EPISODES, window, now)
+        version, streams = idx.version, plots.streams_frame(idx.last_seen, now)
+
+    # Deltas since this session's previous tick
+    prev = st.session_state.get("prev_summary", summary)
+    st.session_state.prev_summary = summary
+
+    cols = st.columns(5)
+    cols[0].metric("Drowsy alerts", summary["drowsy"], summary["drowsy"] - prev["drowsy"])
+    cols[1].metric("Yawns", summary["yawn"], summary["yawn"] - prev["yawn"])
+    cols[2].metric("Head nods", summary["nod"], summary["nod"] - prev["nod"])
+    cols[3].metric("Drowsy time", f"{summary['drowsy_secs'] / 60:.1f} min")
+    cols[4].metric("Active streams", summary["active_streams"])
+
+    st.bar_chart(timeline[["drowsy", "yawn", "nod"]], height=260)
+    left, right = st.columns([3, 2])
+    left.subheader("Recent episodes")
+    left.dataframe(recent, hide_index=True, use_container_width=True)
+    right.subheader("Streams")
+    right.dataframe(streams, hide_index=True, use_container_width=True)
+    st.image(heatmap(path, version, window))
+    st.caption(f"{idx.events:,} events indexed · version {version} · "
+               f"refreshing every {REFRESH_SECS:g}s")
+
+
+def main():
+    args = _args()
+    st.set_page_config(page_title="Driver Safety Dashboard", layout="wide")
+    st.title("🚗 Driver Safety Dashboard")
+    if not os.path.exists(args.events):
+        st.info(f"Waiting for {args.events} (run the drowsiness detector first).")
+    window_label = st.sidebar.radio("Window", list(WINDOWS), index=1)
+    live_panel(args.events, window_label)
+
+
+main()
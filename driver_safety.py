@@ -1,165 +1,178 @@
 import cv2
-import mediapipe as mp
-import numpy as np
-import sounddevice as sd
-import logging
-import csv
-from datetime import datetime
-from pathlib import Path
+import time
 
-# -----------------------------
-# Setup
-# -----------------------------
-logging.basicConfig(
-    filename="data/logs/alerts.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s"
-)
-
-data_dir = Path("data/logs/snaps")
-data_dir.mkdir(parents=True, exist_ok=True)
-
-episodes_file = Path("data/logs/episodes.csv")
-if not episodes_file.exists():
-    with open(episodes_file, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["start", "end", "event"])
-
-# Mediapipe setup
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(refine_landmarks=True)
-
-# Thresholds
-EAR_THRESHOLD = 0.22       # Eye Aspect Ratio
+from audio_module.alert_engine import play_alert_tone
+from cv_module.drowsiness_detector import EAR_CLOSE_TH, EAR_OPEN_TH
+from cv_module.fatigue import YawnDetector
+from cv_module.metrics import landmarks_to_array, face_metrics
+from log_module import event_sink as ev
+from log_module.instrumentation import start_metrics, start_metrics_from_env
+
+# Thresholds (EAR hysteresis pair shared with cv_module.drowsiness_detector)
 EAR_CONSEC_FRAMES = 10     # Frames to trigger drowsiness
-MAR_THRESHOLD = 0.5        # Mouth Aspect Ratio for yawns
+# Yawns: MAR hold + hysteresis from the fused engine (cv_module/fatigue.py)
 
-# State variables
-COUNTER = 0
-drowsy_status = False
-drowsy_start = None
-yawn_status = False
-yawn_start = None
+# Drowsy alerts save a pre/post-event clip from a rolling in-memory buffer
+# instead of a single full-resolution snapshot (see cv_module/clip_recorder.py)
+RECORD_CLIPS = True
+
+# -----------------------------
+# Setup (lazy: nothing is created at import)
+# -----------------------------
+def create_face_mesh():
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(refine_landmarks=True)
 
 # -----------------------------
 # Helper functions
 # -----------------------------
 def play_alert():
-    fs = 44100
-    t = np.linspace(0, 0.2, int(fs * 0.2), endpoint=False)
-    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
-    sd.play(tone, fs)
-    sd.wait()
-
-def euclidean_distance(p1, p2):
-    return np.linalg.norm(np.array(p1) - np.array(p2))
-
-def eye_aspect_ratio(landmarks, eye_indices):
-    p1, p2, p3, p4, p5, p6 = [landmarks[i] for i in eye_indices]
-    A = euclidean_distance(p2, p6)
-    B = euclidean_distance(p3, p5)
-    C = euclidean_distance(p1, p4)
-    return (A + B) / (2.0 * C)
-
-def mouth_aspect_ratio(landmarks, mouth_indices):
-    top_lip = landmarks[mouth_indices[13]]
-    bottom_lip = landmarks[mouth_indices[14]]
-    left = landmarks[mouth_indices[78]]
-    right = landmarks[mouth_indices[308]]
-    vertical = euclidean_distance(top_lip, bottom_lip)
-    horizontal = euclidean_distance(left, right)
-    return vertical / horizontal
+    # Queued on the background audio service so the frame loop never waits
+    play_alert_tone("alert")
 
 def save_snapshot(frame, event_type):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filename = f"{event_type}_{ts}.png"
-    out = data_dir / filename
-    if frame is not None:
-        cv2.imwrite(str(out), frame)
-        return out.name
-    return None
+    # Returns the snapshot file name at once; encoding happens in the background
+    return ev.get_event_sink().snapshot(frame, event_type)
 
 # -----------------------------
 # Main loop
 # -----------------------------
-cap = cv2.VideoCapture(0)
-print("🚗 Driver Safety System Running... Press 'q' to quit.")
-
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = face_mesh.process(rgb)
-
-    if results.multi_face_landmarks:
-        for face_landmarks in results.multi_face_landmarks:
-            h, w, _ = frame.shape
-            landmarks = [(int(pt.x * w), int(pt.y * h)) for pt in face_landmarks.landmark]
-
-            # EAR calculation (eyes)
-            left_eye_indices = [33, 160, 158, 133, 153, 144]
-            right_eye_indices = [362, 385, 387, 263, 373, 380]
-            leftEAR = eye_aspect_ratio(landmarks, left_eye_indices)
-            rightEAR = eye_aspect_ratio(landmarks, right_eye_indices)
-            ear = (leftEAR + rightEAR) / 2.0
-
-            # MAR calculation (mouth)
-            mouth_indices = list(range(0, 468))
-            mar = mouth_aspect_ratio(landmarks, mouth_indices)
-
-            # -----------------
-            # Debug prints
-            # -----------------
-            print(f"EAR: {ear:.3f} | MAR: {mar:.3f} | COUNTER: {COUNTER}")
-
-            # -----------------
-            # Drowsiness detection
-            # -----------------
-            if ear < EAR_THRESHOLD:
-                COUNTER += 1
-                if COUNTER >= EAR_CONSEC_FRAMES and not drowsy_status:
-                    drowsy_status = True
-                    drowsy_start = datetime.now()
-                    logging.info("Drowsiness detected")
-                    snap = save_snapshot(frame, "drowsy")
-                    if snap:
-                        logging.info(f"Snapshot saved: {snap}")
-                    play_alert()  # Beep alert
-            else:
-                if drowsy_status:
-                    drowsy_status = False
-                    drowsy_end = datetime.now()
-                    logging.info("Eyes open")
-                    with open(episodes_file, "a", newline="") as f:
-                        writer = csv.writer(f)
-                        writer.writerow([drowsy_start, drowsy_end, "drowsy"])
-                COUNTER = 0
-
-            # -----------------
-            # Yawning detection
-            # -----------------
-            if mar > MAR_THRESHOLD and not yawn_status:
-                yawn_status = True
-                yawn_start = datetime.now()
-                logging.info("Yawning detected")
-                snap = save_snapshot(frame, "yawn")
-                if snap:
-                    logging.info(f"Snapshot saved: {snap}")
-                play_alert()  # Beep alert for yawn
-
-            elif mar <= MAR_THRESHOLD and yawn_status:
-                yawn_status = False
-                yawn_end = datetime.now()
-                logging.info("Yawn ended")
-                with open(episodes_file, "a", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([yawn_start, yawn_end, "yawn"])
-
-    cv2.imshow("Driver Safety", frame)
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+def main(driver_id=None):
+    # Structured events (data/logs/events.jsonl) and JPEG snapshots are written
+    # off-thread by the shared event sink.
+    events = ev.get_event_sink()
+    face_mesh = create_face_mesh()
+    m = start_metrics_from_env()   # no-op NullMetrics unless enabled
+
+    # Per-driver EAR thresholds (data/profiles/<driver>.json), refined online
+    calibrator = None
+    if driver_id is not None:
+        from cv_module.calibration import EARCalibrator
+        calibrator = EARCalibrator(driver_id)
+
+    recorder = None
+    if RECORD_CLIPS:
+        from cv_module.clip_recorder import ClipRecorder
+        recorder = ClipRecorder(events=events)
+
+    # State variables
+    COUNTER = 0
+    drowsy_status = False
+    drowsy_start = None
+    yawn = YawnDetector()
+    yawn_start = None
+
+    cap = cv2.VideoCapture(0)
+    pts = None  # reused (N, 3) landmark buffer
+    print("🚗 Driver Safety System Running... Press 'q' to quit.")
+
+    while cap.isOpened():
+        t = m.now()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        t = m.lap("capture", t)
+        m.inc("frames")
+        if recorder is not None:
+            recorder.add(frame)   # downscale + enqueue; compression is off-thread
+
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = face_mesh.process(rgb)
+        t = m.lap("facemesh", t)
+
+        if not results.multi_face_landmarks:
+            m.inc("face_lost")
+            yawn.reset()
+        else:
+            for face_landmarks in results.multi_face_landmarks:
+                h, w, _ = frame.shape
+                pts = landmarks_to_array(face_landmarks, w, h, out=pts)
+
+                # EAR (both eyes) and MAR (mouth) from the same landmark array
+                fm = face_metrics(pts)
+                ear = fm["ear"]
+                mar = fm["mar"]
+                t = m.lap("metrics", t)
+
+                # Latest values for the metrics endpoint / log line (no per-frame print)
+                m.set("ear", ear)
+                m.set("mar", mar)
+
+                # -----------------
+                # Drowsiness detection
+                # -----------------
+                close_th, open_th = EAR_CLOSE_TH, EAR_OPEN_TH
+                if calibrator is not None:
+                    if not drowsy_status:
+                        calibrator.update(ear)
+                    close_th, open_th = calibrator.thresholds or (close_th, open_th)
+
+                if ear <= close_th:
+                    COUNTER += 1
+                    if COUNTER >= EAR_CONSEC_FRAMES and not drowsy_status:
+                        drowsy_status = True
+                        drowsy_start = time.time()
+                        if recorder is not None:
+                            clip = recorder.trigger("drowsy", drowsy_start)
+                            events.emit(ev.DROWSINESS_DETECTED, ear=ear, mar=mar, clip=clip)
+                        else:
+                            snap = save_snapshot(frame, "drowsy")
+                            events.emit(ev.DROWSINESS_DETECTED, ear=ear, mar=mar, snapshot=snap)
+                        play_alert()  # Beep alert
+                        m.inc("alerts")
+                elif ear >= open_th or not drowsy_status:
+                    # Drowsy state only clears once eyes are clearly open (hysteresis)
+                    if drowsy_status:
+                        drowsy_status = False
+                        drowsy_end = time.time()
+                        events.emit(ev.EYES_OPEN, ear=ear, mar=mar, ts=drowsy_end)
+                        events.emit(ev.EPISODE, ts=drowsy_end, kind="drowsy",
+                                    start=drowsy_start, end=drowsy_end)
+                    COUNTER = 0
+
+                # -----------------
+                # Yawning detection
+                # -----------------
+                now = time.time()
+                yawn_event = yawn.update(mar, now)
+                if yawn_event == "Yawning detected":
+                    yawn_start = yawn.open_since
+                    snap = save_snapshot(frame, "yawn")
+                    events.emit(ev.YAWN_DETECTED, ear=ear, mar=mar, snapshot=snap)
+                    play_alert()  # Beep alert for yawn
+                    m.inc("alerts")
+
+                elif yawn_event == "Yawn ended":
+                    events.emit(ev.YAWN_ENDED, ear=ear, mar=mar, ts=now)
+                    events.emit(ev.EPISODE, ts=now, kind="yawn",
+                                start=yawn_start, end=now)
+            t = m.lap("detect", t)
+
+        cv2.imshow("Driver Safety", frame)
+        key = cv2.waitKey(1) & 0xFF
+        m.lap("display", t)   # imshow + waitKey
+        if key == ord("q"):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    if calibrator is not None:
+        calibrator.close()
+    if recorder is not None:
+        recorder.close()   # writes a clip still waiting for its post-event window
+        print("🎬 Clips:", recorder.stats())
+    events.close()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Driver safety monitor (drowsiness + yawns)")
+    parser.add_argument("--driver", default=None,
+                        help="driver ID for per-driver threshold calibration")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-log", type=float, default=None, metavar="SECS",
+                        help="print a compact metrics line every SECS seconds")
+    args = parser.parse_args()
+    if args.metrics_port or args.metrics_log:
+        start_metrics(port=args.metrics_port, log_every=args.metrics_log)
+    main(args.driver)
@@ -1,80 +1,290 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
+# insights.py
+"""
+Episode summary and report generation.
+
+All aggregates (daily counts, duration histogram, average/longest duration,
+day × hour-of-day heatmap) come from a single groupby pass over the episodes.
+Results are cached under ``reports/.cache`` keyed by a hash of the input
+(file bytes for episodes.csv, partition file list for the columnar store), so
+an unchanged input skips loading and aggregation entirely; each figure is
+re-rendered only when the aggregate it draws has changed. Every new input
+(or --start/--end/--vehicle choice) is a new key, so only the
+``MAX_CACHED_AGGS`` most recently used entries are kept.
+
+See bench_insights.py for scaling on synthetic datasets.
+"""
+import argparse
+import hashlib
+import json
 import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from log_module import columnar_store
 
-# Make sure reports folder exists
-os.makedirs("reports", exist_ok=True)
+REPORTS_DIR = "reports"
+CACHE_DIR = os.path.join(REPORTS_DIR, ".cache")
+MANIFEST_NAME = "figures.json"   # per reports dir, in its .cache/ (figure -> input hash)
+EPISODES_PATH = "data/logs/episodes.csv"
 
-# Load episodes.csv
-episodes_path = "data/logs/episodes.csv"
+HIST_BINS = 10
+MAX_CACHED_AGGS = 16          # aggregate pickles kept in CACHE_DIR (least recently used go)
 
-# --- Safety check ---
-if not os.path.exists(episodes_path) or os.path.getsize(episodes_path) == 0:
-    print("⚠️ episodes.csv is missing or empty. Run analyze_logs.py first.")
-    exit()
+# ----------------------------
+# Input + fingerprint
+# ----------------------------
+def _hash_file(path, h):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
 
-try:
-    df = pd.read_csv(episodes_path)
-except pd.errors.EmptyDataError:
-    print("⚠️ episodes.csv is empty or corrupted. Run analyze_logs.py again.")
-    exit()
+def csv_fingerprint(path):
+    h = hashlib.sha1(b"csv")
+    _hash_file(path, h)
+    return h.hexdigest()
 
-if df.empty:
-    print("⚠️ No data found in episodes.csv")
-    exit()
+def store_fingerprint(store_dir, start=None, end=None, vehicles=None, drivers=None):
+    # Parquet parts are immutable once written: path + size identify content
+    h = hashlib.sha1(json.dumps([start, end, sorted(vehicles or []),
+                                 sorted(drivers or [])]).encode())
+    for root, _, files in sorted(os.walk(store_dir)):
+        for name in sorted(files):
+            p = os.path.join(root, name)
+            h.update(f"{os.path.relpath(p, store_dir)}:{os.path.getsize(p)}".encode())
+    return h.hexdigest()
 
-# Convert timestamps to datetime (only works for proper YYYY-MM-DD HH:MM:SS)
-df["start"] = pd.to_datetime(df["start"], errors="coerce")
-df["end"] = pd.to_datetime(df["end"], errors="coerce")
+def load_episodes_csv(path):
+    df = pd.read_csv(path)
+    # Convert timestamps to datetime (only works for proper YYYY-MM-DD HH:MM:SS)
+    df["start"] = pd.to_datetime(df["start"], errors="coerce")
+    df["end"] = pd.to_datetime(df["end"], errors="coerce")
+    return df
 
-# Compute duration in seconds
-df["duration_sec"] = (df["end"] - df["start"]).dt.total_seconds()
+# ----------------------------
+# Aggregation (one groupby pass)
+# ----------------------------
+def compute_aggregates(df, bins=HIST_BINS):
+    """
+    Every report number from one groupby over (day, hour, duration bin).
 
-# Drop invalid rows (like mm:ss ones that can’t convert)
-df = df.dropna(subset=["start", "end", "duration_sec"])
+    Returns a dict of small pandas/NumPy objects; the per-episode frame is
+    not needed afterwards.
+    """
+    start = df["start"]
+    dur = (df["end"] - start).dt.total_seconds()
+    valid = start.notna().to_numpy() & dur.notna().to_numpy()
+    # Drop invalid rows (like mm:ss ones that can’t convert)
+    start = start[valid]
+    dur = dur[valid].to_numpy(dtype=np.float64)
 
-# ---------------------- SUMMARY ----------------------
-total_episodes = len(df)
-avg_duration = df["duration_sec"].mean() if total_episodes > 0 else 0
-longest_episode = df["duration_sec"].max() if total_episodes > 0 else 0
-most_drowsy_day = (
-    df["start"].dt.date.value_counts().idxmax() if total_episodes > 0 else "N/A"
-)
+    if len(dur) == 0:
+        return {"total": 0}
 
-print("\n📊 Episode Summary:")
-print(f"✅ Total Episodes: {total_episodes}")
-print(f"⏱️ Average Duration: {avg_duration:.2f} sec" if total_episodes > 0 else "No valid data")
-print(f"⏰ Longest Episode: {longest_episode:.2f} sec" if total_episodes > 0 else "")
-print(f"📅 Most Drowsy Day: {most_drowsy_day}" if total_episodes > 0 else "")
+    lo, hi = float(dur.min()), float(dur.max())
+    edges = np.linspace(lo, hi if hi > lo else lo + 1.0, bins + 1)
+    bin_idx = np.clip(np.searchsorted(edges, dur, side="right") - 1, 0, bins - 1)
 
-# ---------------------- VISUALS ----------------------
-if total_episodes > 0:
-    # Daily episode counts
-    daily_counts = df.groupby(df["start"].dt.date).size()
+    keys = pd.DataFrame({
+        "day": start.dt.normalize().to_numpy(),
+        "hour": start.dt.hour.to_numpy(dtype=np.int8),
+        "bin": bin_idx.astype(np.int8),
+        "dur": dur,
+    })
+    g = keys.groupby(["day", "hour", "bin"], sort=True, observed=True)["dur"].agg(
+        ["size", "sum", "max"]
+    )
 
+    # Everything below works on the grouped result (≤ days × 24 × bins rows)
+    by_day = g["size"].groupby(level="day").sum()
+    heat = g["size"].groupby(level=["day", "hour"]).sum().unstack("hour", fill_value=0)
+    heat = heat.reindex(columns=range(24), fill_value=0)
+    hist = g["size"].groupby(level="bin").sum().reindex(range(bins), fill_value=0)
+
+    total = int(g["size"].sum())
+    by_day.index = pd.DatetimeIndex(by_day.index).date
+    heat.index = pd.DatetimeIndex(heat.index).date
+    return {
+        "total": total,
+        "avg_duration": float(g["sum"].sum() / total),
+        "longest": float(g["max"].max()),
+        "most_drowsy_day": by_day.idxmax(),
+        "daily_counts": by_day,
+        "hist_counts": hist.to_numpy(),
+        "hist_edges": edges,
+        "hour_heatmap": heat,
+    }
+
+def _agg_hash(obj):
+    return hashlib.sha1(pickle.dumps(obj, protocol=4)).hexdigest()
+
+# ----------------------------
+# Cache
+# ----------------------------
+def cached_aggregates(fingerprint, load):
+    """Aggregates for ``fingerprint``; ``load()`` only runs on a cache miss."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"agg_{fingerprint}.pkl")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            aggs = pickle.load(f)
+        os.utime(path)          # mtime = last use, for eviction
+        return aggs, True
+    aggs = compute_aggregates(load())
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(aggs, f, protocol=4)
+    os.replace(tmp, path)
+    evict_cache()
+    return aggs, False
+
+def evict_cache(keep=None):
+    """Delete all but the ``keep`` (default MAX_CACHED_AGGS) most recently used pickles."""
+    keep = MAX_CACHED_AGGS if keep is None else keep
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith("agg_") and name.endswith((".pkl", ".pkl.tmp")):
+            p = os.path.join(CACHE_DIR, name)
+            try:
+                entries.append((os.path.getmtime(p), p))
+            except OSError:
+                continue
+    entries.sort(reverse=True)
+    for _, p in entries[keep:]:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+# ----------------------------
+# Figures
+# ----------------------------
+def _plot_daily(aggs, out):
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(8, 4))
-    daily_counts.plot(kind="bar")
+    aggs["daily_counts"].plot(kind="bar")
     plt.title("Daily Drowsy Episodes")
     plt.ylabel("Count")
-    plt.savefig("reports/daily_trend.png")
+    plt.savefig(out)
     plt.close()
 
-    # Histogram of durations
+def _plot_hist(aggs, out):
+    import matplotlib.pyplot as plt
+    edges = aggs["hist_edges"]
     plt.figure(figsize=(8, 4))
-    df["duration_sec"].plot(kind="hist", bins=10)
+    plt.bar(edges[:-1], aggs["hist_counts"], width=np.diff(edges), align="edge")
     plt.title("Distribution of Episode Durations (sec)")
     plt.xlabel("Duration (sec)")
-    plt.savefig("reports/duration_hist.png")
+    plt.savefig(out)
+    plt.close()
+
+def _plot_heatmap(aggs, out):
+    import matplotlib.pyplot as plt
+    heat = aggs["hour_heatmap"]
+    plt.figure(figsize=(10, max(3, 0.25 * len(heat))))
+    plt.imshow(heat.to_numpy(), aspect="auto", cmap="Reds")
+    plt.colorbar(label="Episodes")
+    plt.yticks(range(len(heat)), [str(d) for d in heat.index])
+    plt.xticks(range(24))
+    plt.xlabel("Hour of day")
+    plt.title("Drowsy Episodes by Hour of Day")
+    plt.tight_layout()
+    plt.savefig(out)
     plt.close()
 
-    # Interactive dashboard
-    fig = px.bar(daily_counts, title="Daily Drowsy Episodes")
-    fig.write_html("reports/dashboard.html")
+def _plot_dashboard(aggs, out):
+    import plotly.express as px
+    fig = px.bar(aggs["daily_counts"], title="Daily Drowsy Episodes")
+    fig.write_html(out)
+
+FIGURES = {
+    # file name: (aggregate keys it depends on, renderer)
+    "daily_trend.png": (["daily_counts"], _plot_daily),
+    "duration_hist.png": (["hist_counts", "hist_edges"], _plot_hist),
+    "hour_heatmap.png": (["hour_heatmap"], _plot_heatmap),
+    "dashboard.html": (["daily_counts"], _plot_dashboard),
+}
+
+def render_reports(aggs, reports_dir=REPORTS_DIR):
+    """Render figures whose input aggregates changed. Returns (rendered, skipped)."""
+    manifest_path = os.path.join(reports_dir, ".cache", MANIFEST_NAME)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    rendered, skipped = [], []
+    for name, (keys, render) in FIGURES.items():
+        out = os.path.join(reports_dir, name)
+        h = _agg_hash([aggs[k] for k in keys])
+        if manifest.get(name) == h and os.path.exists(out):
+            skipped.append(name)
+            continue
+        render(aggs, out)
+        manifest[name] = h
+        rendered.append(name)
+
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return rendered, skipped
+
+# ----------------------------
+# Main
+# ----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Episode summary and reports")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD), columnar store only")
+    parser.add_argument("--end", help="last day (YYYY-MM-DD), columnar store only")
+    parser.add_argument("--vehicle", action="append", help="restrict to vehicle(s), columnar store only")
+    parser.add_argument("--driver", action="append", help="restrict to driver(s), columnar store only")
+    parser.add_argument("--csv", action="store_true", help="read episodes.csv even if the store exists")
+    args = parser.parse_args(argv)
+
+    # Make sure reports folder exists
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+
+    store_path = os.path.join(columnar_store.STORE_DIR, "episodes")
+    if columnar_store._ARROW_OK and os.path.isdir(store_path) and not args.csv:
+        # Typed timestamps, only the requested date/vehicle partitions are read
+        fingerprint = store_fingerprint(store_path, args.start, args.end, args.vehicle,
+                                        args.driver)
+        load = lambda: columnar_store.ColumnarStore().read_episodes(
+            args.start, args.end, args.vehicle, columns=["start", "end"], drivers=args.driver
+        )
+    else:
+        # --- Safety check ---
+        if not os.path.exists(EPISODES_PATH) or os.path.getsize(EPISODES_PATH) == 0:
+            print("⚠️ episodes.csv is missing or empty. Run analyze_logs.py first.")
+            return
+        fingerprint = csv_fingerprint(EPISODES_PATH)
+        load = lambda: load_episodes_csv(EPISODES_PATH)
+
+    try:
+        aggs, hit = cached_aggregates(fingerprint, load)
+    except pd.errors.EmptyDataError:
+        print("⚠️ episodes.csv is empty or corrupted. Run analyze_logs.py again.")
+        return
+
+    total_episodes = aggs["total"]
+
+    # ---------------------- SUMMARY ----------------------
+    print("\n📊 Episode Summary:" + (" (cached)" if hit else ""))
+    print(f"✅ Total Episodes: {total_episodes}")
+    if total_episodes == 0:
+        print("\n⚠️ No valid episodes to analyze. Check episodes.csv")
+        return
+    print(f"⏱️ Average Duration: {aggs['avg_duration']:.2f} sec")
+    print(f"⏰ Longest Episode: {aggs['longest']:.2f} sec")
+    print(f"📅 Most Drowsy Day: {aggs['most_drowsy_day']}")
+
+    # ---------------------- VISUALS ----------------------
+    rendered, skipped = render_reports(aggs)
+    print(f"\n📂 Reports in '{REPORTS_DIR}' folder:")
+    for name in FIGURES:
+        print(f"   - {name}" + (" (unchanged)" if name in skipped else ""))
 
-    print("\n📂 Reports generated in 'reports' folder:")
-    print("   - daily_trend.png")
-    print("   - duration_hist.png")
-    print("   - dashboard.html")
-else:
-    print("\n⚠️ No valid episodes to analyze. Check episodes.csv")
+if __name__ == "__main__":
+    main()
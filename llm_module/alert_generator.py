@@ -1,29 +1,379 @@
 ﻿import os
-from transformers import pipeline
+import hashlib
+import json
+import threading
+import queue
+from collections import OrderedDict
+from time import monotonic
 
-# Initialize summarization model (can change model if needed)
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+# Models are loaded lazily on first use, never at import.
+# Set ALERT_MODEL=stub to run fully offline (deterministic template model).
+SUMMARY_MODEL = os.environ.get("SUMMARY_MODEL", "facebook/bart-large-cnn")
+ALERT_MODEL = os.environ.get("ALERT_MODEL", "google/flan-t5-small")
 
-def generate_alert_summary(log_file="data/logs/alerts.log"):
-    """Read alerts log and summarize driver behavior"""
+# ------------------ MODEL LOADING ------------------
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+def get_summarizer():
+    """Summarization pipeline, created on first call."""
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            from transformers import pipeline
+            _summarizer = pipeline("summarization", model=SUMMARY_MODEL)
+        return _summarizer
+
+class StubModel:
+    """Offline stand-in for the text model: fills a fixed template."""
+
+    def __call__(self, prompt, **kwargs):
+        subject = prompt.split(".")[0].strip().rstrip("!")
+        return [{"generated_text": f"Alert: {subject}. Please pull over safely and rest."}]
+
+def load_alert_model(name=ALERT_MODEL):
+    if name == "stub":
+        return StubModel()
+    from transformers import pipeline
+    return pipeline("text2text-generation", model=name)
+
+# ------------------ ALERT MESSAGES ------------------
+# Shown immediately until the model has produced a message for the context
+DEFAULT_MESSAGES = {
+    "drowsiness": "Drowsiness detected! Take a break.",
+    "yawn": "Frequent yawning. Consider a rest stop soon.",
+    "stress": "High stress detected. Slow down and breathe.",
+    "fatigue": "Signs of fatigue are building up. Plan a break soon.",
+}
+
+PROMPTS = {
+    "drowsiness": "The driver shows signs of drowsiness{ctx}. Write one short, calm safety instruction.",
+    "yawn": "The driver is yawning repeatedly{ctx}. Write one short safety suggestion.",
+    "stress": "The driver sounds stressed{ctx}. Write one short calming driving tip.",
+    "fatigue": "The driver shows growing fatigue (long eye closures, yawns, nodding){ctx}. Write one short safety suggestion.",
+}
+
+def _ear_bucket(ear):
+    if ear < 0.15:
+        return "eyes nearly shut"
+    if ear < 0.22:
+        return "eyes half closed"
+    return "eyes open"
+
+def _duration_bucket(secs):
+    if secs < 2:
+        return "brief"
+    if secs < 5:
+        return "short"
+    if secs < 15:
+        return "long"
+    return "very long"
+
+def _hour_bucket(hour):
+    if hour < 6 or hour >= 22:
+        return "night"
+    if hour < 12:
+        return "morning"
+    if hour < 18:
+        return "afternoon"
+    return "evening"
+
+def _count_bucket(n):
+    return "first" if n <= 1 else ("repeated" if n <= 3 else "frequent")
+
+def context_key(event, ear=None, duration=None, hour=None, count=None):
+    """
+    Cache key: event type plus the coarse context buckets the prompt uses,
+    so nearby situations (EAR 0.181 vs 0.186, 3 s vs 4 s) share one
+    generated message.
+    """
+    return (
+        event,
+        None if ear is None else _ear_bucket(ear),
+        None if duration is None else _duration_bucket(duration),
+        None if hour is None else _hour_bucket(hour),
+        None if count is None else _count_bucket(count),
+    )
+
+def build_prompt(key):
+    event, ear, duration, hour, count = key
+    parts = []
+    if ear is not None:
+        parts.append(ear)
+    if duration is not None:
+        parts.append(f"{duration} eye closure")
+    if hour is not None:
+        parts.append(f"at {hour}")
+    if count is not None:
+        parts.append(f"{count} occurrence")
+    ctx = f" ({', '.join(parts)})" if parts else ""
+    template = PROMPTS.get(event, "{event}{ctx}. Write one short driver safety alert.")
+    return template.format(ctx=ctx, event=event)
+
+class AlertGenerator:
+    """
+    Non-blocking alert text.
+
+    ``get()`` returns at once: the cached message for the context bucket, or
+    a default while a background worker generates one. Entries older than
+    ``refresh_secs`` are served and regenerated asynchronously. The cache is
+    an LRU of at most ``max_entries`` keys.
+    """
+
+    def __init__(self, model=None, max_entries=128, refresh_secs=600.0, max_length=40):
+        self._model_spec = ALERT_MODEL if model is None else model
+        self._model = None
+        self.max_entries = max_entries
+        self.refresh_secs = refresh_secs
+        self.max_length = max_length
+        self._cache = OrderedDict()     # key -> (message, created monotonic)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._q = queue.Queue()
+        self.generated = 0
+        self.errors = 0
+        self._worker = threading.Thread(target=self._run, name="alert-llm", daemon=True)
+        self._worker.start()
+
+    def _model_fn(self):
+        if self._model is None:
+            spec = self._model_spec
+            self._model = load_alert_model(spec) if isinstance(spec, str) else spec
+        return self._model
+
+    def get(self, event="drowsiness", **context):
+        key = context_key(event, **context)
+        now = monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+                msg, created = hit
+                if now - created < self.refresh_secs:
+                    return msg
+            else:
+                msg = DEFAULT_MESSAGES.get(event, event)
+            if key not in self._pending:
+                self._pending.add(key)
+                self._q.put(key)
+        return msg
+
+    def _run(self):
+        while True:
+            key = self._q.get()
+            if key is None:
+                break
+            try:
+                out = self._model_fn()(build_prompt(key), max_length=self.max_length, do_sample=False)
+                text = (out[0].get("generated_text") or out[0].get("summary_text", "")).strip()
+                if text:
+                    with self._lock:
+                        self._cache[key] = (text, monotonic())
+                        self._cache.move_to_end(key)
+                        while len(self._cache) > self.max_entries:
+                            self._cache.popitem(last=False)
+                    self.generated += 1
+            except Exception:
+                # Keep serving defaults if the model can't load or run
+                self.errors += 1
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+                self._q.task_done()
+
+    def wait_idle(self):
+        """Block until queued generations finish (tests / warm-up)."""
+        self._q.join()
+
+    def warm_up(self, events=tuple(DEFAULT_MESSAGES)):
+        """Precompute messages for the context-free key of each event type."""
+        for event in events:
+            self.get(event)
+
+    def close(self):
+        self._q.put(None)
+        self._worker.join(timeout=2.0)
+
+_generator = None
+_generator_lock = threading.Lock()
+
+def get_alert_generator():
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = AlertGenerator()
+        return _generator
+
+def generate_alert(event="drowsiness", **context):
+    """Alert text for ``event`` without blocking (see AlertGenerator.get)."""
+    return get_alert_generator().get(event, **context)
+
+# ------------------ LOG SUMMARY ------------------
+# Map-reduce over the log: it is streamed in token-budgeted chunks, each chunk
+# summary is cached on disk by content hash, and only chunks appended since
+# the last call are summarized before the reduce step. Only complete chunks
+# are cached: a growing tail chunk and the reduce steps change on every call.
+SUMMARY_CACHE_DIR = "data/logs/.summary_cache"
+CHUNK_TOKENS = 700          # BART accepts ~1024 input tokens; leave headroom
+MAX_CACHED_SUMMARIES = 512  # chunk summaries kept on disk (least recently used evicted)
+
+def _estimate_tokens(text):
+    # ~4 characters per token for English / log text
+    return len(text) // 4 + 1
+
+def _log_line_text(line):
+    """Compact, model-friendly text for one events.jsonl (or legacy) line."""
+    line = line.strip()
+    if not line.startswith("{"):
+        return line
+    try:
+        e = json.loads(line)
+    except ValueError:
+        return ""
+    parts = [e.get("time", ""), str(e.get("type", "")).replace("_", " ")]
+    for k in ("ear", "mar"):
+        if e.get(k) is not None:
+            parts.append(f"{k.upper()} {e[k]:.2f}")
+    if e.get("kind"):
+        parts.append(f"{e['kind']} episode {(e.get('end') or 0) - (e.get('start') or 0):.0f}s")
+    return " ".join(p for p in parts if p)
+
+def iter_log_chunks(path, offset=0, budget=CHUNK_TOKENS):
+    """
+    Yield ``(text, start_offset, end_offset, complete)`` chunks of whole lines
+    from byte ``offset``. Only the last chunk can be incomplete (under budget).
+    """
+    lines, tokens, start = [], 0, offset
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break   # line still being written
+            text = _log_line_text(raw.decode("utf-8", errors="replace"))
+            t = _estimate_tokens(text) if text else 0
+            if lines and tokens + t > budget:
+                yield "\n".join(lines), start, offset, True
+                lines, tokens, start = [], 0, offset
+            offset += len(raw)
+            if text:
+                lines.append(text)
+                tokens += t
+    if lines:
+        yield "\n".join(lines), start, offset, False
+
+def summarize_cached(text, cache_dir=SUMMARY_CACHE_DIR, max_length=120, min_length=30,
+                     store=True):
+    """
+    Summary of ``text``, memoized on disk by SHA-1 of the input. With
+    ``store=False`` an existing entry is still used but a new one is not
+    written (for text that will not be seen again).
+    """
+    key = hashlib.sha1(f"{SUMMARY_MODEL}|{max_length}|{text}".encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, key + ".txt")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            summary = f.read()
+        try:
+            os.utime(path)   # mark as recently used for eviction
+        except OSError:
+            pass
+        return summary
+    min_length = min(min_length, max(5, _estimate_tokens(text) // 2))
+    summary = get_summarizer()(
+        text, max_length=max_length, min_length=min_length, do_sample=False
+    )[0]["summary_text"]
+    if store:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(summary)
+        evict_summaries(cache_dir)
+    return summary
+
+def evict_summaries(cache_dir=SUMMARY_CACHE_DIR, keep=None):
+    """Delete all but the ``keep`` (default MAX_CACHED_SUMMARIES) most recently used summaries."""
+    keep = MAX_CACHED_SUMMARIES if keep is None else keep
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".txt"):
+            p = os.path.join(cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(p), p))
+            except OSError:
+                continue
+    entries.sort(reverse=True)
+    for _, p in entries[keep:]:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+def _reduce(summaries, cache_dir, budget=CHUNK_TOKENS):
+    """Summarize summaries in budgeted groups until one text fits the budget."""
+    while True:
+        joined = "\n".join(summaries)
+        if len(summaries) == 1 or _estimate_tokens(joined) <= budget:
+            return summarize_cached(joined, cache_dir, store=False) if len(summaries) > 1 else summaries[0]
+        groups, cur, cur_t = [], [], 0
+        for s in summaries:
+            t = _estimate_tokens(s)
+            if cur and cur_t + t > budget:
+                groups.append(cur)
+                cur, cur_t = [], 0
+            cur.append(s)
+            cur_t += t
+        groups.append(cur)
+        summaries = [summarize_cached("\n".join(g), cache_dir, store=False) for g in groups]
+
+def _load_summary_state(state_path, log_file):
+    """
+    Saved map state if it still describes ``log_file``: same path, not
+    truncated, and (like analyze_logs) the same inode and already-read head.
+    """
+    from analyze_logs import file_identity
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("log_file") == log_file and os.path.getsize(log_file) >= state["offset"]:
+            ident = file_identity(log_file, state["head_len"])
+            if ident["inode"] == state["inode"] and ident["head_sha1"] == state["head_sha1"]:
+                return state
+    except (OSError, ValueError, KeyError):
+        pass
+    # first run, or the log was truncated / rotated / replaced
+    return {"log_file": log_file, "offset": 0, "chunks": []}
+
+def generate_alert_summary(log_file="data/logs/events.jsonl", cache_dir=SUMMARY_CACHE_DIR):
+    """Summarize the whole alerts log, re-summarizing only new chunks."""
     if not os.path.exists(log_file):
         return "⚠️ No logs found yet."
 
-    with open(log_file, "r", encoding="utf-8") as f:
-        logs = f.read()
+    state_path = os.path.join(cache_dir, "state.json")
+    state = _load_summary_state(state_path, log_file)
 
-    if not logs.strip():
-        return "⚠️ Log file is empty."
+    # Map: summarize chunks appended since the last call. Complete chunks are
+    # committed to the state; a trailing partial chunk is re-read next time
+    # and re-summarized without being cached (it changes as the log grows).
+    partial = None
+    for text, start, end, complete in iter_log_chunks(log_file, state["offset"]):
+        summary = summarize_cached(text, cache_dir, store=complete)
+        if complete:
+            state["chunks"].append(summary)
+            state["offset"] = end
+        else:
+            partial = summary
 
-    # Keep only the recent logs to avoid model overload
-    logs = logs[-2000:]  
+    summaries = state["chunks"] + ([partial] if partial else [])
+    if not summaries:
+        return "⚠️ Log file is empty."
 
-    # Generate summary
-    summary = summarizer(
-        logs, max_length=120, min_length=30, do_sample=False
-    )
+    from analyze_logs import file_identity
+    state.update(file_identity(log_file, state["offset"]))
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
 
-    return summary[0]["summary_text"]
+    # Reduce
+    return _reduce(summaries, cache_dir)
 
 
 # ------------------ MAIN EXECUTION ------------------
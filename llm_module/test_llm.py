@@ -1,4 +1,7 @@
 # llm_module/test_llm.py
-from llm_module.alert_generator import generate_alert
+# Run offline with: ALERT_MODEL=stub python -m llm_module.test_llm
+from llm_module.alert_generator import generate_alert, get_alert_generator
 
-generate_alert("Driver appears drowsy!")
+print(generate_alert("Driver appears drowsy!"))   # immediate default text
+get_alert_generator().wait_idle()
+print(generate_alert("Driver appears drowsy!"))   # generated + cached
@@ -0,0 +1,2 @@
+# log_module/__init__.py
+# Makes log_module a Python package
@@ -0,0 +1,198 @@
+# log_module/bench_ingest.py
+"""
+Load generator for the fleet ingestion service (localhost stand-in).
+
+    python -m log_module.bench_ingest                         # 4 senders x 10 s
+    python -m log_module.bench_ingest --senders 8 --batch 1000 --dup 0.1
+    python -m log_module.bench_ingest --outage                # spool + replay check
+
+Starts the service in a subprocess on a free localhost port, writing to a
+temporary directory. Then ``--senders`` processes post pre-built batches
+over keep-alive connections as fast as the service acks them. A ``--dup``
+fraction of the batches are re-posted to exercise dedup. The run reports
+sustained accepted events/s, request latency percentiles and 503s, and
+checks that the stored event count equals the number of unique events
+sent.
+
+``--outage`` instead drives ``IngestClient`` against a service that is not
+running yet. Everything it sends is spooled, the service is started, and
+the run checks that the replayed events land exactly once.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing as mp
+import os
+import shutil
+import socket
+import tempfile
+import time
+from time import perf_counter
+
+import numpy as np
+
+from log_module import event_sink as ev
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(port, root, ready):
+    import asyncio
+    from log_module.ingest_service import serve
+    try:
+        asyncio.run(serve("127.0.0.1", port, root, ready=lambda addr: ready.set()))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_service(port, root):
+    ready = mp.Event()
+    proc = mp.Process(target=_serve, args=(port, root, ready), daemon=True)
+    proc.start()
+    if not ready.wait(10):
+        raise RuntimeError("ingest service did not start")
+    return proc
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    conn.request("GET", path)
+    out = json.loads(conn.getresponse().read())
+    conn.close()
+    return out
+
+
+def make_batch(sender, n, start_seq, now):
+    types = ev.EVENT_TYPES[:7]
+    lines = []
+    for i in range(n):
+        seq = start_seq + i
+        lines.append(json.dumps({"id": f"s{sender}-{seq}", "vehicle": f"truck-{seq % 50:03d}",
+                                 "ts": round(now - (seq % 3600), 3),
+                                 "type": types[seq % len(types)], "ear": 0.21},
+                                separators=(",", ":")))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _sender(idx, port, secs, batch, dup, out):
+    rng = np.random.default_rng(idx)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    now = time.time()
+    unique = posted = rejected = 0
+    lat = []
+    prev = None
+    end = time.monotonic() + secs
+    while time.monotonic() < end:
+        if prev is not None and rng.random() < dup:
+            body, fresh = prev, 0                 # retry of an already-acked batch
+        else:
+            body, fresh = make_batch(idx, batch, unique, now), batch
+        t0 = perf_counter()
+        conn.request("POST", "/events", body, {"Content-Type": "application/x-ndjson"})
+        resp = conn.getresponse()
+        resp.read()
+        lat.append(perf_counter() - t0)
+        if resp.status == 503:
+            rejected += 1
+            time.sleep(0.05)
+            continue
+        unique += fresh
+        posted += batch
+        prev = body
+    conn.close()
+    out.put({"unique": unique, "posted": posted, "rejected": rejected, "lat": lat})
+
+
+def load_test(args, port, root):
+    proc = start_service(port, root)
+    out = mp.Queue()
+    senders = [mp.Process(target=_sender, args=(i, port, args.secs, args.batch, args.dup, out))
+               for i in range(args.senders)]
+    t0 = perf_counter()
+    for p in senders:
+        p.start()
+    results = [out.get() for _ in senders]
+    elapsed = perf_counter() - t0
+    for p in senders:
+        p.join()
+    stats = get_json(port, "/stats")
+    proc.terminate()
+    proc.join()
+
+    unique = sum(r["unique"] for r in results)
+    posted = sum(r["posted"] for r in results)
+    lat = 1000 * np.concatenate([r["lat"] for r in results])
+    p50, p99 = np.percentile(lat, [50, 99])
+    print(f"📤 {args.senders} senders x {args.secs:g}s, batch {args.batch}, dup {args.dup:.0%}")
+    print(f"📥 {stats['accepted']:,} accepted ({stats['accepted'] / elapsed:,.0f} events/s), "
+          f"{stats['duplicates']:,} duplicates dropped, {stats['commits']:,} commits, "
+          f"{sum(r['rejected'] for r in results)} x 503")
+    print(f"⏱️ Request latency p50 {p50:.1f} ms  p99 {p99:.1f} ms ({len(lat):,} requests, "
+          f"{posted:,} events posted)")
+    stored = count_stored(root)
+    ok = stored == unique == stats["accepted"]
+    print(f"{'✅' if ok else '❌'} Stored {stored:,} events, {unique:,} unique sent")
+    return ok
+
+
+def count_stored(root):
+    n = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            with open(os.path.join(dirpath, name), "rb") as f:
+                n += sum(1 for _ in f)
+    return n
+
+
+def outage_test(port, root, n=5000):
+    from log_module.ingest_client import IngestClient
+    spool = os.path.join(root, "..", "spool")
+    client = IngestClient(f"http://127.0.0.1:{port}/events", vehicle="truck-001",
+                          spool_dir=spool, batch_size=500, flush_interval=0.1,
+                          timeout=0.5, max_retries=1, backoff=0.2, max_backoff=0.5)
+    now = time.time()
+    for i in range(0, n, 100):
+        client.send_batch([{"ts": now + j * 1e-3, "type": ev.HEAD_NOD} for j in range(i, i + 100)])
+    time.sleep(1.0)
+    print(f"📴 Service down: {client.stats['spooled']:,} events spooled "
+          f"in {client.spool_pending} file(s)")
+
+    proc = start_service(port, root)
+    deadline = time.monotonic() + 15
+    while client.spool_pending and time.monotonic() < deadline:
+        time.sleep(0.1)
+    client.close()
+    stats = get_json(port, "/stats")
+    proc.terminate()
+    proc.join()
+    stored = count_stored(root)
+    ok = stored == n and client.spool_pending == 0
+    print(f"{'✅' if ok else '❌'} Service up: {client.stats['replayed']:,} replayed, "
+          f"{stats['duplicates']} duplicates, {stored:,}/{n:,} stored once")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--senders", type=int, default=4)
+    parser.add_argument("--secs", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--dup", type=float, default=0.05, help="fraction of re-posted batches")
+    parser.add_argument("--outage", action="store_true", help="spool/replay check instead")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="dsa_ingest_")
+    root = os.path.join(tmp, "events")
+    try:
+        ok = outage_test(free_port(), root) if args.outage else load_test(args, free_port(), root)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,345 @@
+# log_module/columnar_store.py
+"""
+Columnar (Parquet) store for episodes and per-frame telemetry.
+
+Data lives under ``data/store/<table>/`` as a hive-partitioned Parquet
+dataset::
+
+    data/store/episodes/date=2024-06-10/vehicle=truck-12/driver=alice/part-<uuid>.parquet
+    data/store/telemetry/date=2024-06-10/vehicle=truck-12/driver=alice/part-<uuid>.parquet
+
+Timestamps are stored as typed ``timestamp[ms]`` columns in naive *local*
+time, the same wall clock as episodes.csv and the ingest service's
+``date=`` partitions, so a day means the same thing in every table.
+Nothing is re-parsed on read. ``read_*`` push date-range, vehicle and
+driver filters down to the partition level: a query over one month only
+opens that month's files. Rows without a driver go to
+``driver=unknown``.
+
+Every append writes a new part file, so small flushes would pile up. Once
+a partition holds ``COMPACT_MIN_FILES`` files smaller than
+``COMPACT_MAX_BYTES``, they are merged into one. Large compacted files are
+left alone, so a file is rewritten only a few times.
+
+``export_episodes_csv`` writes the legacy episodes.csv layout for tools that
+still expect it.
+
+Requires ``pyarrow`` (``pip install pyarrow``).
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    _ARROW_OK = True
+except ImportError:
+    _ARROW_OK = False
+
+STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "store")
+DEFAULT_VEHICLE = "default"
+DEFAULT_DRIVER = "unknown"
+
+COMPACT_MIN_FILES = 16                  # small part files per partition before merging
+COMPACT_MAX_BYTES = 32 * 1024 * 1024    # files at least this big are not rewritten
+_COMPACTED_FROM = b"dsa.compacted_from"
+
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+if _ARROW_OK:
+    PARTITIONING = ds.partitioning(
+        pa.schema([("date", pa.string()), ("vehicle", pa.string()), ("driver", pa.string())]),
+        flavor="hive",
+    )
+
+    EPISODE_SCHEMA = pa.schema([
+        ("start", pa.timestamp("ms")),
+        ("end", pa.timestamp("ms")),
+        ("duration_sec", pa.float64()),
+        ("kind", pa.string()),
+    ])
+
+    TELEMETRY_SCHEMA = pa.schema([
+        ("ts", pa.timestamp("ms")),
+        ("ear", pa.float32()),
+        ("smooth_ear", pa.float32()),
+        ("mar", pa.float32()),
+        ("state", pa.dictionary(pa.int8(), pa.string())),
+    ])
+
+
+def _require_arrow():
+    if not _ARROW_OK:
+        raise ImportError("columnar_store requires pyarrow: pip install pyarrow")
+
+
+def _bound(v):
+    """Normalize a range bound to None, a ``date`` (whole day) or a ``datetime``."""
+    if v is None or isinstance(v, date):
+        return v
+    ts = pd.Timestamp(v)
+    if isinstance(v, str) and len(v.strip()) <= 10:
+        return ts.date()
+    return ts.to_pydatetime()
+
+
+def _day(v):
+    return v.date() if isinstance(v, datetime) else v
+
+
+def _partition_name(v, default):
+    if v is None or (isinstance(v, float) and v != v):
+        return default
+    v = str(v)
+    if not _SAFE_NAME.match(v) or v in (".", ".."):
+        raise ValueError(f"not a valid partition name: {v!r}")
+    return v
+
+
+def local_times(epoch_secs):
+    """
+    Epoch seconds → naive local datetimes (what ``datetime.fromtimestamp``
+    gives). The UTC offset is looked up once per hour, because DST
+    transitions fall on the hour.
+    """
+    s = pd.Series(epoch_secs, dtype="float64")
+    hours = (s // 3600).astype("int64")
+    offsets = {h: time.localtime(h * 3600).tm_gmtoff for h in hours.unique()}
+    return pd.to_datetime(s + hours.map(offsets), unit="s")
+
+
+class ColumnarStore:
+    def __init__(self, root=STORE_DIR):
+        _require_arrow()
+        self.root = root
+
+    def _table_dir(self, table):
+        return os.path.join(self.root, table)
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def _append(self, table, df, time_col, schema, vehicle):
+        if df.empty:
+            return 0
+        vehicle = _partition_name(vehicle, DEFAULT_VEHICLE)
+        df = df.copy()
+        for name in schema.names:
+            if name not in df.columns:
+                df[name] = None
+            elif pa.types.is_timestamp(schema.field(name).type):
+                # Stored at millisecond precision
+                df[name] = pd.to_datetime(df[name]).dt.floor("ms")
+        drivers = df["driver"] if "driver" in df.columns else pd.Series(None, index=df.index)
+        drivers = drivers.map(lambda d: _partition_name(d, DEFAULT_DRIVER))
+        dates = df[time_col].dt.strftime("%Y-%m-%d")
+        df = df[schema.names]
+        written = 0
+        # One new file per (date, vehicle, driver) partition
+        for (day, driver), part in df.groupby([dates, drivers], sort=False):
+            out_dir = os.path.join(self._table_dir(table), f"date={day}",
+                                   f"vehicle={vehicle}", f"driver={driver}")
+            os.makedirs(out_dir, exist_ok=True)
+            t = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+            pq.write_table(t, os.path.join(out_dir, f"part-{uuid.uuid4().hex}.parquet"),
+                           compression="zstd")
+            written += len(part)
+            self.compact_partition(out_dir, schema)
+        return written
+
+    def compact_partition(self, part_dir, schema, min_files=COMPACT_MIN_FILES,
+                          max_bytes=COMPACT_MAX_BYTES):
+        """
+        Merge the small part files of one partition into a single file once
+        there are ``min_files`` of them; returns the number merged (0 if none).
+
+        The merged file is written under a hidden name (readers skip
+        ``.``-prefixed files), renamed into place, then the sources are
+        deleted. It records their names, so sources left behind by an
+        interrupted compaction are removed on the next pass.
+        """
+        names = sorted(n for n in os.listdir(part_dir) if n.endswith(".parquet"))
+        gone = set()
+        for name in names:
+            if name in gone:
+                continue
+            done = pq.read_schema(os.path.join(part_dir, name)).metadata or {}
+            for src in done.get(_COMPACTED_FROM, b"").decode().split():
+                if src in names and src != name and src not in gone:
+                    os.remove(os.path.join(part_dir, src))
+                    gone.add(src)
+        names = [n for n in names if n not in gone]
+        small = [n for n in names if os.path.getsize(os.path.join(part_dir, n)) < max_bytes]
+        if len(small) < min_files:
+            return 0
+        table = pa.concat_tables(
+            pq.read_table(os.path.join(part_dir, n), schema=schema) for n in small
+        )
+        table = table.replace_schema_metadata({_COMPACTED_FROM: " ".join(small).encode()})
+        name = f"part-{uuid.uuid4().hex}.parquet"
+        tmp = os.path.join(part_dir, f".{name}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, os.path.join(part_dir, name))
+        for n in small:
+            os.remove(os.path.join(part_dir, n))
+        return len(small)
+
+    def compact(self, table, **kw):
+        """Compact every partition of ``table``; returns the number of files merged."""
+        schema = {"episodes": EPISODE_SCHEMA, "telemetry": TELEMETRY_SCHEMA}[table]
+        merged = 0
+        for root, _, files in os.walk(self._table_dir(table)):
+            if any(f.endswith(".parquet") for f in files):
+                merged += self.compact_partition(root, schema, **kw)
+        return merged
+
+    def append_episodes(self, df, vehicle=DEFAULT_VEHICLE):
+        """
+        Append episodes (``start``, ``end`` as naive local time, optional
+        ``duration_sec``/``kind``/``driver``).
+        """
+        df = df.copy()
+        df["start"] = pd.to_datetime(df["start"])
+        df["end"] = pd.to_datetime(df["end"])
+        if "duration_sec" not in df.columns:
+            df["duration_sec"] = (df["end"] - df["start"]).dt.total_seconds()
+        if "kind" not in df.columns:
+            df["kind"] = "drowsy"
+        return self._append("episodes", df, "start", EPISODE_SCHEMA, vehicle)
+
+    def append_telemetry(self, df, vehicle=DEFAULT_VEHICLE):
+        """
+        Append per-frame rows (``ts`` as naive local time, ``ear``,
+        ``smooth_ear``, ``mar``, ``state``, optional ``driver``).
+        """
+        return self._append("telemetry", df, "ts", TELEMETRY_SCHEMA, vehicle)
+
+    def drop_vehicle(self, table, vehicle):
+        """Delete every partition of ``vehicle`` in ``table`` (before a full rebuild)."""
+        import shutil
+        base = self._table_dir(table)
+        if not os.path.isdir(base):
+            return
+        for day_dir in os.listdir(base):
+            target = os.path.join(base, day_dir, f"vehicle={vehicle}")
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+
+    # ----------------------------
+    # Reads (partition + predicate pushdown)
+    # ----------------------------
+    def _read(self, table, time_col, start=None, end=None, vehicles=None, columns=None,
+              drivers=None):
+        path = self._table_dir(table)
+        if not os.path.isdir(path):
+            return pd.DataFrame()
+        dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+        expr = None
+
+        def _and(e):
+            nonlocal expr
+            expr = e if expr is None else expr & e
+
+        start, end = _bound(start), _bound(end)
+        # Partition-level pruning on the date key (ISO strings sort correctly)
+        if start is not None:
+            _and(ds.field("date") >= _day(start).isoformat())
+        if end is not None:
+            _and(ds.field("date") <= _day(end).isoformat())
+        if vehicles is not None:
+            _and(ds.field("vehicle").isin(list(vehicles)))
+        if drivers is not None:
+            _and(ds.field("driver").isin(list(drivers)))
+        # Exact bounds: row-level filter on the typed timestamp (row-group stats)
+        if isinstance(start, datetime):
+            _and(ds.field(time_col) >= pa.scalar(start, type=pa.timestamp("ms")))
+        if isinstance(end, datetime):
+            _and(ds.field(time_col) <= pa.scalar(end, type=pa.timestamp("ms")))
+        return dataset.to_table(filter=expr, columns=columns).to_pandas()
+
+    def read_episodes(self, start=None, end=None, vehicles=None, columns=None, drivers=None):
+        """
+        Episodes whose start falls in [start, end]. ``date`` bounds are
+        inclusive whole days; ``datetime`` bounds are exact.
+        """
+        return self._read("episodes", "start", start, end, vehicles, columns, drivers)
+
+    def read_telemetry(self, start=None, end=None, vehicles=None, columns=None, drivers=None):
+        return self._read("telemetry", "ts", start, end, vehicles, columns, drivers)
+
+    # ----------------------------
+    # CSV compatibility
+    # ----------------------------
+    def import_episodes_csv(self, path, vehicle=DEFAULT_VEHICLE):
+        df = pd.read_csv(path)
+        df["start"] = pd.to_datetime(df["start"], errors="coerce")
+        df["end"] = pd.to_datetime(df["end"], errors="coerce")
+        df = df.dropna(subset=["start", "end"])
+        return self.append_episodes(df, vehicle=vehicle)
+
+    def export_episodes_csv(self, path, start=None, end=None, vehicles=None):
+        """Write the legacy ``start,end,duration_sec`` episodes.csv layout."""
+        df = self.read_episodes(start, end, vehicles, columns=["start", "end", "duration_sec"])
+        if df.empty:
+            df = pd.DataFrame(columns=["start", "end", "duration_sec"])
+        else:
+            df = df.sort_values("start")
+            df["start"] = df["start"].dt.strftime(TIME_FMT)
+            df["end"] = df["end"].dt.strftime(TIME_FMT)
+        df.to_csv(path, index=False)
+        return len(df)
+
+
+class TelemetryRecorder:
+    """
+    Buffers per-frame telemetry rows and appends them to the store in
+    batches of ``batch_rows`` on a background thread. ``ts`` is epoch
+    seconds and is stored as local time, like the episodes.
+    """
+
+    def __init__(self, store=None, vehicle=DEFAULT_VEHICLE, driver=None, batch_rows=9000):
+        self.store = store if store is not None else ColumnarStore()
+        self.vehicle = vehicle
+        self.driver = driver
+        self.batch_rows = batch_rows
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flushers = []
+
+    def record(self, ts, ear, smooth_ear, mar, state):
+        self._rows.append((ts, ear, smooth_ear, mar, state))
+        if len(self._rows) >= self.batch_rows:
+            self.flush(block=False)
+
+    def flush(self, block=True):
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        df = pd.DataFrame(rows, columns=["ts", "ear", "smooth_ear", "mar", "state"])
+        df["ts"] = local_times(df["ts"])
+        df["driver"] = self.driver
+
+        def _write():
+            with self._lock:
+                self.store.append_telemetry(df, vehicle=self.vehicle)
+
+        if block:
+            _write()
+        else:
+            t = threading.Thread(target=_write, name="telemetry-flush", daemon=True)
+            t.start()
+            self._flushers = [f for f in self._flushers if f.is_alive()] + [t]
+
+    def close(self):
+        for t in self._flushers:
+            t.join()
+        self.flush(block=True)
@@ -0,0 +1,229 @@
+# log_module/event_sink.py
+"""
+Buffered, asynchronous structured event log.
+
+Detectors call ``emit()`` (or ``snapshot()``) from the frame loop; both only
+enqueue and return. A writer thread drains the queue, appends events as JSON
+lines to ``events.jsonl`` in batches and flushes every ``flush_interval``
+seconds or ``max_batch`` events, whichever comes first. Snapshots are encoded
+as JPEG/WebP on a separate thread.
+
+Durability: ``close()`` (also registered with ``atexit``) drains everything,
+so a clean exit loses nothing; a crash loses at most the events buffered in
+the last ``flush_interval`` seconds / ``max_batch`` events.
+
+With ``DSA_INGEST_URL`` set, ``get_event_sink()`` also forwards every
+written batch to the fleet ingestion service through an ``IngestClient``
+(see ``ingest_client``), which retries and spools to disk on its own thread.
+
+Event record (one JSON object per line)::
+
+    {"ts": 1718000000.123, "time": "2024-06-10 08:13:20", "type": "drowsiness_detected",
+     "ear": 0.191, "mar": null, "snapshot": "drowsy_20240610_081320_123000.jpg", ...}
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "logs")
+EVENTS_FILE = "events.jsonl"
+SNAP_DIR = "snaps"
+
+# Event types
+DROWSINESS_DETECTED = "drowsiness_detected"
+EYES_OPEN = "eyes_open"
+YAWN_DETECTED = "yawn_detected"
+YAWN_ENDED = "yawn_ended"
+HEAD_NOD = "head_nod"
+FATIGUE_DETECTED = "fatigue_detected"
+FATIGUE_CLEARED = "fatigue_cleared"
+EPISODE = "episode"
+CLIP_SAVED = "clip_saved"          # pre/post-event clip written (cv_module.clip_recorder)
+
+EVENT_TYPES = (DROWSINESS_DETECTED, EYES_OPEN, YAWN_DETECTED, YAWN_ENDED, HEAD_NOD,
+               FATIGUE_DETECTED, FATIGUE_CLEARED, EPISODE, CLIP_SAVED)
+
+# Legacy alerts.log state strings -> event types
+STATE_EVENTS = {
+    "Drowsiness detected": DROWSINESS_DETECTED,
+    "Eyes open": EYES_OPEN,
+    "Yawning detected": YAWN_DETECTED,
+    "Yawn ended": YAWN_ENDED,
+    "Head nod detected": HEAD_NOD,
+    "Fatigue detected": FATIGUE_DETECTED,
+    "Fatigue cleared": FATIGUE_CLEARED,
+}
+
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+_STOP = object()
+
+
+def _round(v):
+    return None if v is None else round(float(v), 4)
+
+
+class EventSink:
+    def __init__(self, log_dir=LOG_DIR, events_file=EVENTS_FILE,
+                 flush_interval=1.0, max_batch=256, snapshot_format="jpg",
+                 snapshot_quality=85, max_pending_snapshots=8, forwarder=None):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, events_file)
+        self.snap_dir = os.path.join(log_dir, SNAP_DIR)
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.snapshot_format = snapshot_format.lower().lstrip(".")
+        self.snapshot_quality = snapshot_quality
+        self.forwarder = forwarder       # optional IngestClient: send_batch(events)
+        self.written = 0
+        self.snapshots_written = 0
+        self.snapshots_dropped = 0
+
+        os.makedirs(self.snap_dir, exist_ok=True)
+        self._events = queue.Queue()
+        self._snaps = queue.Queue(maxsize=max_pending_snapshots)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="event-writer", daemon=True)
+        self._encoder = threading.Thread(target=self._snap_loop, name="snapshot-encoder", daemon=True)
+        self._writer.start()
+        self._encoder.start()
+        atexit.register(self.close)
+
+    # ----------------------------
+    # Producer API (hot path)
+    # ----------------------------
+    def emit(self, event_type, ear=None, mar=None, snapshot=None, ts=None, **fields):
+        """Queue one structured event of ``event_type``; never blocks on I/O."""
+        ts = time.time() if ts is None else ts
+        event = {
+            "ts": round(ts, 3),
+            "time": datetime.fromtimestamp(ts).strftime(TIME_FMT),
+            "type": event_type,
+            "ear": _round(ear),
+            "mar": _round(mar),
+            "snapshot": snapshot,
+        }
+        event.update(fields)
+        self._events.put(event)
+
+    def snapshot(self, frame, event_type):
+        """
+        Queue ``frame`` for off-thread encoding and return the file name it
+        will be written under (None if no frame or the encoder is backlogged).
+        """
+        if frame is None:
+            return None
+        name = f"{event_type}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.{self.snapshot_format}"
+        try:
+            # copy: the caller keeps drawing on / reusing its frame buffer
+            self._snaps.put_nowait((name, frame.copy()))
+        except queue.Full:
+            self.snapshots_dropped += 1
+            return None
+        return name
+
+    # ----------------------------
+    # Background threads
+    # ----------------------------
+    def _write_loop(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                timeout = max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                if item is not None and item is not _STOP:
+                    batch.append(item)
+                if item is _STOP or len(batch) >= self.max_batch or time.monotonic() >= deadline:
+                    if batch:
+                        f.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in batch))
+                        f.flush()
+                        self.written += len(batch)
+                        if self.forwarder is not None:
+                            self.forwarder.send_batch(batch)
+                        batch = []
+                    deadline = time.monotonic() + self.flush_interval
+                if item is _STOP:
+                    return
+
+    def _encode(self, frame):
+        import cv2
+        if self.snapshot_format == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.snapshot_quality]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.snapshot_quality]
+        ok, buf = cv2.imencode("." + self.snapshot_format, frame, params)
+        return buf.tobytes() if ok else None
+
+    def _snap_loop(self):
+        while True:
+            item = self._snaps.get()
+            if item is _STOP:
+                return
+            name, frame = item
+            try:
+                data = self._encode(frame)
+                if data is not None:
+                    with open(os.path.join(self.snap_dir, name), "wb") as f:
+                        f.write(data)
+                    self.snapshots_written += 1
+            except Exception:
+                # A failed snapshot must never take the logger down
+                pass
+
+    # ----------------------------
+    # Shutdown
+    # ----------------------------
+    def close(self):
+        """Drain both queues and stop the threads. Safe to call twice."""
+        if self._closed:
+            return
+        self._closed = True
+        self._events.put(_STOP)
+        self._snaps.put(_STOP)
+        self._writer.join()
+        self._encoder.join()
+        if self.forwarder is not None:
+            self.forwarder.close()
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_event_sink():
+    """
+    Process-wide sink writing to data/logs/events.jsonl, created on first use
+    (and forwarding to the ingestion service when DSA_INGEST_URL is set).
+    """
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            from log_module.ingest_client import get_ingest_client
+            _sink = EventSink(forwarder=get_ingest_client())
+        return _sink
+
+
+def set_event_sink(sink):
+    global _sink
+    with _sink_lock:
+        _sink = sink
+    return sink
+
+
+def read_events(path=None):
+    """Yield event dicts from a JSON-lines file, skipping partial/corrupt lines."""
+    path = path or os.path.join(LOG_DIR, EVENTS_FILE)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,296 @@
+# log_module/ingest_client.py
+"""
+Detector-side client for the fleet ingestion service.
+
+``send_batch(events)`` only enqueues, never blocking on the network. A
+background thread batches events (``batch_size`` or ``flush_interval``) and
+POSTs them over one keep-alive connection.
+
+Each event is stamped with ``vehicle`` and a unique ``id``
+(``<vehicle>-<boot>-<seq>``), which the service deduplicates on. Retries
+and spool replays can therefore resend freely: delivery is at-least-once
+and storage is exactly-once within the service's dedup window.
+
+Failures:
+
+* 503 (backpressure), 5xx, 404 and connection errors are retried with
+  exponential backoff and jitter, up to ``max_retries`` times. A 404
+  means the endpoint is not there yet (wrong route, service mid-deploy),
+  not that the events are bad
+* if the batch still fails, it is appended to an on-disk spool
+  (``data/spool/spool-<ns>.jsonl``) and the client stops sending live.
+  New batches go straight to the spool until a probe after ``backoff``
+  seconds succeeds; the backoff doubles up to ``max_backoff``
+* after any successful post, spool files are replayed oldest first, one
+  file per loop iteration, so live traffic is never starved
+* 400 (malformed batch) is dropped and counted, not retried forever
+* the spool is capped at ``MAX_SPOOL_BYTES``; the oldest files go first
+"""
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+SPOOL_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "spool")
+INGEST_URL = os.environ.get("DSA_INGEST_URL")          # e.g. http://10.0.0.5:8765/events
+VEHICLE = os.environ.get("DSA_VEHICLE", "default")
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 1.0
+TIMEOUT = 3.0
+MAX_RETRIES = 3
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+MAX_QUEUE = 100_000
+MAX_SPOOL_BYTES = 512 * 1024 * 1024
+
+_STOP = object()
+
+
+class IngestError(Exception):
+    """Post failed in a way worth retrying (network, 5xx, 404, backpressure)."""
+
+
+class IngestClient:
+    def __init__(self, url=INGEST_URL, vehicle=VEHICLE, spool_dir=SPOOL_DIR,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, timeout=TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF, max_backoff=MAX_BACKOFF,
+                 max_queue=MAX_QUEUE, max_spool_bytes=MAX_SPOOL_BYTES):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = parts.path or "/events"
+        self.vehicle = vehicle
+        self.spool_dir = spool_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_spool_bytes = max_spool_bytes
+        self.stats = {"sent": 0, "duplicates": 0, "spooled": 0, "replayed": 0,
+                      "rejected": 0, "retries": 0, "spool_dropped": 0}
+
+        os.makedirs(spool_dir, exist_ok=True)
+        self._boot = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._conn = None
+        self._down_until = 0.0          # circuit open: spool instead of posting
+        self._delay = backoff
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="ingest-client", daemon=True)
+        self._thread.start()
+
+    # ----------------------------
+    # Producer API
+    # ----------------------------
+    def _stamp(self, events):
+        with self._seq_lock:
+            seq, self._seq = self._seq, self._seq + len(events)
+        out = []
+        for i, e in enumerate(events):
+            e = dict(e)
+            e.setdefault("vehicle", self.vehicle)
+            e.setdefault("id", f"{self.vehicle}-{self._boot}-{seq + i}")
+            out.append(e)
+        return out
+
+    def send(self, event):
+        self.send_batch([event])
+
+    def send_batch(self, events):
+        """Queue events for delivery; spools instead if the queue is full."""
+        overflow = []
+        for e in self._stamp(events):
+            try:
+                self._queue.put_nowait(e)
+            except queue.Full:
+                overflow.append(e)
+        if overflow:
+            self._spool(overflow)
+
+    # ----------------------------
+    # Delivery thread
+    # ----------------------------
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._deliver(batch, final=stop)
+            if not stop and time.monotonic() >= self._down_until:
+                self._replay_one()
+        # Anything still queued after _STOP
+        rest = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                rest.append(item)
+        if rest:
+            self._spool(rest)
+        self._disconnect()
+
+    def _deliver(self, batch, final=False):
+        if time.monotonic() < self._down_until:
+            self._spool(batch)
+            return False
+        try:
+            self._post_with_retry(batch, retries=0 if final else self.max_retries)
+        except IngestError:
+            self._spool(batch)
+            self._down_until = time.monotonic() + self._delay
+            self._delay = min(self.max_backoff, self._delay * 2)
+            return False
+        self._delay = self.backoff
+        return True
+
+    def _post_with_retry(self, batch, retries):
+        for attempt in range(retries + 1):
+            try:
+                return self._post(batch)
+            except IngestError:
+                if attempt == retries:
+                    raise
+                self.stats["retries"] += 1
+                time.sleep(min(self.max_backoff, self.backoff * 2 ** attempt)
+                           * random.uniform(0.5, 1.0))
+
+    def _post(self, batch):
+        body = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in batch).encode("utf-8")
+        try:
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._conn.request("POST", self.path, body,
+                               {"Content-Type": "application/x-ndjson"})
+            resp = self._conn.getresponse()
+            payload = resp.read()
+        except (OSError, http.client.HTTPException) as exc:
+            self._disconnect()
+            raise IngestError(str(exc)) from exc
+        if resp.status == 200:
+            result = json.loads(payload)
+            self.stats["sent"] += result.get("accepted", 0)
+            self.stats["duplicates"] += result.get("duplicates", 0)
+            self.stats["rejected"] += result.get("invalid", 0)
+            return result
+        if resp.status == 413 and len(batch) > 1:
+            half = len(batch) // 2
+            self._post(batch[:half])
+            return self._post(batch[half:])
+        if resp.status in (400, 413):
+            # The batch itself is bad: retrying would fail the same way
+            self.stats["rejected"] += len(batch)
+            return None
+        raise IngestError(f"HTTP {resp.status}")
+
+    def _disconnect(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ----------------------------
+    # Spool
+    # ----------------------------
+    def _spool_files(self):
+        return sorted(f for f in os.listdir(self.spool_dir)
+                      if f.startswith("spool-") and f.endswith(".jsonl"))
+
+    def _spool(self, events):
+        data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events)
+        with self._spool_lock:
+            name = f"spool-{time.time_ns()}.jsonl"
+            tmp = os.path.join(self.spool_dir, name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.spool_dir, name))
+            self.stats["spooled"] += len(events)
+            self._trim_spool()
+
+    def _trim_spool(self):
+        files = self._spool_files()
+        sizes = [os.path.getsize(os.path.join(self.spool_dir, f)) for f in files]
+        total = sum(sizes)
+        for f, size in zip(files, sizes):
+            if total <= self.max_spool_bytes:
+                break
+            os.remove(os.path.join(self.spool_dir, f))
+            total -= size
+            self.stats["spool_dropped"] += 1
+
+    def _replay_one(self):
+        """Resend the oldest spool file; delete it once every batch is through."""
+        with self._spool_lock:
+            files = self._spool_files()
+        if not files:
+            return
+        path = os.path.join(self.spool_dir, files[0])
+        events = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+        for i in range(0, len(events), self.batch_size):
+            try:
+                self._post(events[i:i + self.batch_size])
+            except IngestError:
+                # Keep the file; the part already sent is deduplicated on the next replay
+                self._down_until = time.monotonic() + self._delay
+                self._delay = min(self.max_backoff, self._delay * 2)
+                return
+        with self._spool_lock:
+            if os.path.exists(path):      # may have been trimmed meanwhile
+                os.remove(path)
+        self.stats["replayed"] += len(events)
+
+    @property
+    def spool_pending(self):
+        return len(self._spool_files())
+
+    # ----------------------------
+    # Shutdown
+    # ----------------------------
+    def close(self):
+        """Send (or spool) everything queued and stop the thread. Safe to call twice."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_ingest_client():
+    """Process-wide client for ``DSA_INGEST_URL``, or None when it is not set."""
+    global _client
+    if not INGEST_URL:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = IngestClient()
+        return _client
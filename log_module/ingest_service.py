@@ -0,0 +1,442 @@
+# log_module/ingest_service.py
+"""
+Fleet ingestion service for detector events.
+
+An asyncio HTTP/1.1 server (stdlib only) that in-cab detectors post
+batches of structured events to::
+
+    POST /events      body: JSON array or JSON lines of event dicts
+    GET  /stats       counters as JSON
+    GET  /healthz
+
+    python -m log_module.ingest_service --port 8765
+
+Every event must carry ``id`` (unique per event, assigned by
+``IngestClient``), ``vehicle``, ``ts`` and a known ``type``. Per batch:
+
+* validate   malformed events, and JSON lines that do not parse, are
+             counted and dropped; the rest of the batch is still accepted
+* dedup      ids seen within the last ``DEDUP_WINDOW`` events are dropped,
+             so client retries are idempotent. On startup the window is
+             reloaded from the newest partitions, which covers a restart
+             between write and ack.
+* write      events are appended to hive-partitioned JSON lines, the same
+             layout as ``columnar_store``::
+
+                 data/ingest/events/date=2024-06-10/vehicle=truck-12/events-<node>.jsonl
+
+* ack        the response is sent only after the batch has been written.
+             A group-commit writer drains the queue in one executor call,
+             so concurrent batches share one write and flush.
+
+Backpressure: at most ``MAX_PENDING`` events may wait for the writer. A
+batch that would exceed that gets ``503`` + ``Retry-After``, and the
+client backs off or spools to disk instead of the server buffering
+without bound.
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from log_module import event_sink as ev
+
+INGEST_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "ingest", "events")
+HOST = "127.0.0.1"
+PORT = 8765
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH = 5000              # events per request
+MAX_PENDING = 50000           # events queued for the writer before 503
+DEDUP_WINDOW = 1_000_000      # most recent event ids remembered
+MAX_OPEN_FILES = 256
+FSYNC = False                 # flush() only; fsync every commit costs ~ms per partition
+RETRY_AFTER_SECS = 1
+
+NODE = re.sub(r"[^A-Za-z0-9_.-]", "_", socket.gethostname()) or "node"
+EVENT_TYPES = frozenset(ev.EVENT_TYPES)
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+_TS_MIN = datetime(2000, 1, 1).timestamp()
+
+
+# ----------------------------
+# Validation / dedup
+# ----------------------------
+_known_vehicles = set()         # names that already passed the regex
+
+
+def validate(e, now=None):
+    """None if ``e`` is a well-formed event, otherwise the reason it is not."""
+    if not isinstance(e, dict):
+        return "not an object"
+    eid = e.get("id")
+    if not isinstance(eid, str) or not 0 < len(eid) <= 128:
+        return "bad id"
+    vehicle = e.get("vehicle")
+    if vehicle not in _known_vehicles:
+        # Becomes a directory name: no separators, no "." / ".."
+        if not isinstance(vehicle, str) or not _SAFE_NAME.match(vehicle) or vehicle in (".", ".."):
+            return "bad vehicle"
+        if len(_known_vehicles) < 100_000:
+            _known_vehicles.add(vehicle)
+    ts = e.get("ts")
+    now = time.time() if now is None else now
+    if (not isinstance(ts, (int, float)) or isinstance(ts, bool) or not math.isfinite(ts)
+            or not _TS_MIN <= ts <= now + 86400):
+        return "bad ts"
+    if e.get("type") not in EVENT_TYPES:
+        return "unknown type"
+    return None
+
+
+class DedupWindow:
+    """Membership over the last ``size`` ids (O(1) add / lookup / evict)."""
+
+    def __init__(self, size=DEDUP_WINDOW):
+        self.size = size
+        self._ids = OrderedDict()
+
+    def __contains__(self, eid):
+        return eid in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, eid):
+        self._ids[eid] = None
+        if len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+
+    def discard(self, eid):
+        self._ids.pop(eid, None)
+
+
+# ----------------------------
+# Partitioned storage
+# ----------------------------
+_day_of_hour = {}
+
+
+def local_day(ts):
+    """Local ``YYYY-MM-DD`` of ``ts``, cached per hour."""
+    hour = int(ts // 3600)
+    day = _day_of_hour.get(hour)
+    if day is None:
+        if len(_day_of_hour) > 100_000:
+            _day_of_hour.clear()
+        day = _day_of_hour[hour] = datetime.fromtimestamp(hour * 3600).strftime("%Y-%m-%d")
+    return day
+
+
+def partition_dir(root, ts, vehicle):
+    return os.path.join(root, f"date={local_day(ts)}", f"vehicle={vehicle}")
+
+
+class PartitionWriter:
+    """Appends events to per-(date, vehicle) files; keeps an LRU of open handles."""
+
+    def __init__(self, root=INGEST_DIR, node=NODE, max_open=MAX_OPEN_FILES, fsync=FSYNC):
+        self.root = root
+        self.node = node
+        self.max_open = max_open
+        self.fsync = fsync
+        self._files = OrderedDict()
+        self.written = 0
+
+    def _file(self, path):
+        f = self._files.get(path)
+        if f is not None:
+            self._files.move_to_end(path)
+            return f
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = self._files[path] = open(path, "a", encoding="utf-8")
+        if len(self._files) > self.max_open:
+            _, old = self._files.popitem(last=False)
+            old.close()
+        return f
+
+    def write(self, events, lines=None):
+        """
+        Append validated events; one write + flush per partition. ``lines``
+        optionally holds each event's original JSON text (None entries are
+        re-serialized), which skips a json.dumps per event.
+        """
+        groups = {}
+        paths = {}
+        for i, e in enumerate(events):
+            key = (local_day(e["ts"]), e["vehicle"])
+            path = paths.get(key)
+            if path is None:
+                path = paths[key] = os.path.join(self.root, f"date={key[0]}",
+                                                 f"vehicle={key[1]}", f"events-{self.node}.jsonl")
+            line = lines[i] if lines is not None else None
+            if line is None:
+                line = json.dumps(e, separators=(",", ":"))
+            groups.setdefault(path, []).append(line + "\n")
+        for path, lines in groups.items():
+            f = self._file(path)
+            f.write("".join(lines))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.written += len(events)
+        return len(events)
+
+    def recent_ids(self, limit=DEDUP_WINDOW, days=2):
+        """Event ids from the newest ``days`` date partitions (dedup warm-up)."""
+        try:
+            dates = sorted(d for d in os.listdir(self.root) if d.startswith("date="))[-days:]
+        except OSError:
+            return []
+        ids = []
+        for d in dates:
+            day_dir = os.path.join(self.root, d)
+            for vdir in os.listdir(day_dir):
+                vpath = os.path.join(day_dir, vdir)
+                for name in os.listdir(vpath):
+                    with open(os.path.join(vpath, name), "r", encoding="utf-8") as f:
+                        for line in f:
+                            try:
+                                ids.append(json.loads(line)["id"])
+                            except (ValueError, KeyError, TypeError):
+                                continue
+        return ids[-limit:]
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+# ----------------------------
+# Service
+# ----------------------------
+def parse_body(body):
+    """
+    ``(events, lines, bad)`` from a JSON array or JSON-lines body. ``lines``
+    are the original line texts (JSON lines only), reused when writing.
+    A JSON-lines body is parsed line by line: ``bad`` counts the lines that
+    are not valid JSON (or UTF-8), and the rest are kept. A JSON array is
+    one document and raises ``ValueError`` if it does not parse.
+    """
+    if body.lstrip().startswith(b"["):
+        events = json.loads(body.decode("utf-8"))
+        if not isinstance(events, list):
+            raise ValueError("expected a JSON array")
+        return events, None, 0
+    events, lines, bad = [], [], 0
+    for raw in body.splitlines():
+        if not raw.strip():
+            continue
+        try:
+            line = raw.decode("utf-8")
+            events.append(json.loads(line))
+        except ValueError:          # includes UnicodeDecodeError
+            bad += 1
+            continue
+        lines.append(line)
+    return events, lines, bad
+
+
+class IngestService:
+    def __init__(self, root=INGEST_DIR, max_pending=MAX_PENDING, dedup_window=DEDUP_WINDOW,
+                 fsync=FSYNC):
+        self.writer = PartitionWriter(root, fsync=fsync)
+        self.max_pending = max_pending
+        self.dedup = DedupWindow(dedup_window)
+        self.stats = {"requests": 0, "accepted": 0, "duplicates": 0, "invalid": 0,
+                      "rejected_batches": 0, "written": 0, "commits": 0}
+        self._pending = 0
+        self._queue = None
+        self._server = None
+        self._commit_task = None
+
+    # ---- lifecycle ----
+    async def start(self, host=HOST, port=PORT):
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        for eid in await loop.run_in_executor(None, self.writer.recent_ids, self.dedup.size):
+            self.dedup.add(eid)
+        self._commit_task = asyncio.create_task(self._commit_loop())
+        self._server = await asyncio.start_server(self._handle, host, port,
+                                                  limit=MAX_BODY_BYTES)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._commit_task is not None:
+            await self._queue.join()
+            self._commit_task.cancel()
+        self.writer.close()
+
+    # ---- batches ----
+    async def ingest(self, events, lines=None, bad=0):
+        """
+        Validate, dedup and durably write one batch. Returns ``(status, body)``:
+        200 with per-batch counts, or 503 when the writer is backed up.
+        ``bad`` lines that did not parse are counted as invalid.
+        """
+        if len(events) > MAX_BATCH:
+            return 413, {"error": f"batch larger than {MAX_BATCH}"}
+        if self._pending + len(events) > self.max_pending:
+            self.stats["rejected_batches"] += 1
+            return 503, {"error": "backpressure", "retry_after": RETRY_AFTER_SECS}
+
+        now = time.time()
+        fresh, fresh_lines, invalid, dups = [], [], bad, 0
+        batch_ids = set()
+        for i, e in enumerate(events):
+            if validate(e, now) is not None:
+                invalid += 1
+            elif e["id"] in self.dedup or e["id"] in batch_ids:
+                dups += 1
+            else:
+                batch_ids.add(e["id"])
+                fresh.append(e)
+                fresh_lines.append(lines[i] if lines is not None else None)
+        self.stats["invalid"] += invalid
+        self.stats["duplicates"] += dups
+
+        if fresh:
+            # Reserve the ids now so a concurrent retry of this batch is a duplicate
+            for e in fresh:
+                self.dedup.add(e["id"])
+            self._pending += len(fresh)
+            done = asyncio.get_running_loop().create_future()
+            await self._queue.put((fresh, fresh_lines, done))
+            try:
+                await done
+            except Exception as exc:
+                # Not written: forget the ids so the client's retry is accepted
+                for e in fresh:
+                    self.dedup.discard(e["id"])
+                return 500, {"error": f"write failed: {exc}"}
+            self.stats["accepted"] += len(fresh)
+        return 200, {"accepted": len(fresh), "duplicates": dups, "invalid": invalid}
+
+    async def _commit_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            events = [e for batch, _, _ in items for e in batch]
+            lines = [line for _, batch_lines, _ in items for line in batch_lines]
+            try:
+                await loop.run_in_executor(None, self.writer.write, events, lines)
+                self.stats["written"] += len(events)
+                self.stats["commits"] += 1
+                for _, _, done in items:
+                    done.set_result(None)
+            except Exception as exc:
+                for _, _, done in items:
+                    done.set_exception(exc)
+            finally:
+                self._pending -= len(events)
+                for _ in items:
+                    self._queue.task_done()
+
+    # ---- HTTP ----
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, False)
+                    return
+                headers = {}
+                for h in lines[1:]:
+                    if ":" in h:
+                        k, v = h.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "bad content-length"}, False)
+                    return
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, {"error": "body too large"}, False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                self.stats["requests"] += 1
+                status, payload = await self._route(method, path, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if method == "POST" and path == "/events":
+            try:
+                events, lines, bad = parse_body(body)
+            except ValueError as exc:
+                return 400, {"error": f"bad body: {exc}"}
+            return await self.ingest(events, lines, bad)
+        if method == "GET" and path == "/stats":
+            return 200, {**self.stats, "pending": self._pending, "dedup_ids": len(self.dedup)}
+        if method == "GET" and path == "/healthz":
+            return 200, {"ok": True}
+        return 404, {"error": "not found"}
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+                  500: "Internal Server Error", 503: "Service Unavailable"}.get(status, "")
+        body = json.dumps(payload).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {reason}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            head.append(f"Retry-After: {RETRY_AFTER_SECS}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host=HOST, port=PORT, root=INGEST_DIR, ready=None, **kwargs):
+    """Run a service until cancelled; ``ready(address)`` is called once listening."""
+    service = IngestService(root, **kwargs)
+    address = await service.start(host, port)
+    if ready is not None:
+        ready(address)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.stop()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Fleet ingestion service for detector events")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--root", default=INGEST_DIR, help="partitioned event storage")
+    parser.add_argument("--fsync", action="store_true", help="fsync every commit")
+    args = parser.parse_args(argv)
+    ready = lambda addr: print(f"📥 Ingesting on http://{addr[0]}:{addr[1]}/events -> {args.root}")
+    try:
+        asyncio.run(serve(args.host, args.port, args.root, ready=ready, fsync=args.fsync))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
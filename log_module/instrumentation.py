@@ -0,0 +1,333 @@
+# log_module/instrumentation.py
+"""
+Lightweight hot-path instrumentation: stage timers, histograms, counters.
+
+Frame loops time their stages with ``now()`` / ``lap()``::
+
+    m = get_metrics()
+    t = m.now()
+    ok, frame = cap.read()
+    t = m.lap("capture", t)
+    results = face_mesh.process(rgb)
+    t = m.lap("facemesh", t)
+    m.inc("face_lost")
+
+When instrumentation is off, ``get_metrics()`` returns a ``NullMetrics``.
+All of its methods are constant no-ops (``now()`` does not even read the
+clock), so a disabled loop pays a few empty method calls per frame.
+
+Enable it with ``start_metrics(port=..., log_every=...)`` or by setting the
+environment variables ``DSA_METRICS_PORT`` and/or ``DSA_METRICS_LOG_SECS``.
+``start_metrics`` serves Prometheus text at ``http://127.0.0.1:<port>/metrics``
+(JSON at ``/metrics.json``) and prints a compact summary line every
+``log_every`` seconds::
+
+    [metrics] 29.8 fps | capture 4.10/6.02/9.21 | facemesh 18.31/24.90/31.04 | ... | face_lost 12
+
+Stage values in the log line are p50/p95/p99 in ms over the last
+``log_every`` seconds, so a slowdown shows up in the next line instead of
+being averaged into hours of history. ``/metrics`` exports the cumulative
+histograms (Prometheus computes windows from them), and ``/metrics.json``
+quantiles cover the process lifetime.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+PREFIX = "dsa"
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = int(os.environ.get("DSA_METRICS_PORT", "0")) or None
+METRICS_LOG_SECS = float(os.environ.get("DSA_METRICS_LOG_SECS", "0")) or None
+
+# Histogram bucket upper bounds (seconds): 1 us .. ~15 s, ratio 1.25 (quantile error < 12%)
+BUCKETS = tuple(float(f"{1e-6 * 1.25 ** i:.3g}") for i in range(75))
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def quantile_of(bounds, counts, q):
+    """Approximate ``q`` quantile (seconds) of bucket ``counts``, interpolated within its bucket."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, c in enumerate(counts):
+        if c and seen + c >= rank:
+            lo = bounds[i - 1] if i > 0 else 0.0
+            hi = bounds[i] if i < len(bounds) else bounds[-1]
+            return lo + (hi - lo) * (rank - seen) / c
+        seen += c
+    return bounds[-1]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; O(log buckets) record, approximate quantiles."""
+
+    def __init__(self, bounds=BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        i = bisect.bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def bucket_counts(self):
+        with self._lock:
+            return list(self.counts)
+
+    def quantile(self, q, since=None):
+        """
+        Approximate ``q`` quantile (seconds) over the lifetime, or only over
+        samples recorded after ``since`` (an earlier ``bucket_counts()``).
+        """
+        counts = self.bucket_counts()
+        if since is not None:
+            counts = [c - s for c, s in zip(counts, since)]
+        return quantile_of(self.bounds, counts, q)
+
+
+class Metrics:
+    """Registry of stage histograms, counters and gauges for one process."""
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    # ---- hot path ----
+    def now(self):
+        return perf_counter()
+
+    def lap(self, stage, t0):
+        """Record ``now - t0`` for ``stage``; returns now (start of the next stage)."""
+        t = perf_counter()
+        self.observe(stage, t - t0)
+        return t
+
+    def observe(self, stage, seconds):
+        h = self.stages.get(stage)
+        if h is None:
+            with self._lock:
+                h = self.stages.setdefault(stage, Histogram())
+        h.record(seconds)
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    # ---- reporting ----
+    def snapshot(self):
+        """JSON-ready view: per-stage count/mean/quantiles (ms), counters, gauges."""
+        stages = {}
+        for name, h in list(self.stages.items()):
+            stages[name] = {"count": h.count,
+                            "mean_ms": round(1000.0 * h.sum / h.count, 3) if h.count else 0.0}
+            for q in QUANTILES:
+                stages[name][f"p{int(q * 100)}_ms"] = round(1000.0 * h.quantile(q), 3)
+        return {"uptime_secs": round(time.time() - self.started, 1), "stages": stages,
+                "counters": dict(self.counters), "gauges": dict(self.gauges)}
+
+    def prometheus_text(self):
+        lines = [f"# TYPE {PREFIX}_stage_seconds histogram"]
+        for name, h in list(self.stages.items()):
+            with h._lock:
+                counts, total, s = list(h.counts), h.count, h.sum
+            cum = 0
+            for bound, c in zip(h.bounds, counts):
+                cum += c
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cum}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {total}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {s}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {total}')
+        lines.append(f"# TYPE {PREFIX}_stage_quantile_seconds gauge")
+        for name, h in list(self.stages.items()):
+            for q in QUANTILES:
+                lines.append(f'{PREFIX}_stage_quantile_seconds{{stage="{name}",quantile="{q}"}} '
+                             f"{h.quantile(q):.6f}")
+        for name, v in sorted(self.counters.items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {v}")
+        for name, v in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {v}")
+        return "\n".join(lines) + "\n"
+
+    def bucket_counts(self):
+        """Per-stage bucket counts, to window a later ``summary_line``."""
+        return {name: h.bucket_counts() for name, h in list(self.stages.items())}
+
+    def summary_line(self, fps=None, since=None, counts=None):
+        """
+        One-line summary. With ``since`` (an earlier ``bucket_counts()``) the
+        stage quantiles cover only the samples recorded after it, up to
+        ``counts`` (read now if None), and stages without new samples are
+        left out.
+        """
+        parts = [f"{fps:.1f} fps"] if fps is not None else []
+        now = self.bucket_counts() if counts is None else counts
+        for name, counts in now.items():
+            if since is not None:
+                before = since.get(name)
+                if before is not None:
+                    counts = [c - b for c, b in zip(counts, before)]
+                if not any(counts):
+                    continue
+            bounds = self.stages[name].bounds
+            p = "/".join(f"{1000.0 * quantile_of(bounds, counts, q):.2f}" for q in QUANTILES)
+            parts.append(f"{name} {p}")
+        parts += [f"{k} {v}" for k, v in sorted(self.counters.items())]
+        parts += [f"{k} {v:.3f}" if isinstance(v, float) else f"{k} {v}"
+                  for k, v in sorted(self.gauges.items())]
+        return "[metrics] " + " | ".join(parts)
+
+
+class NullMetrics:
+    """Disabled instrumentation: every call is a constant no-op."""
+
+    enabled = False
+
+    def now(self):
+        return 0.0
+
+    def lap(self, stage, t0):
+        return 0.0
+
+    def observe(self, stage, seconds):
+        pass
+
+    def inc(self, name, n=1):
+        pass
+
+    def set(self, name, value):
+        pass
+
+    def snapshot(self):
+        return {}
+
+
+# ----------------------------
+# Exporters
+# ----------------------------
+class _Handler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = json.dumps(self.metrics.snapshot()), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = self.metrics.prometheus_text(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass   # keep scrapes out of the console
+
+
+def serve_metrics(metrics, port=METRICS_PORT, host=METRICS_HOST):
+    """Serve ``metrics`` over HTTP on a daemon thread; returns the server."""
+    handler = type("MetricsHandler", (_Handler,), {"metrics": metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class MetricsReporter:
+    """Prints ``summary_line()`` every ``every`` seconds on a daemon thread."""
+
+    def __init__(self, metrics, every=10.0, log=print, frames_counter="frames"):
+        self.metrics = metrics
+        self.every = every
+        self.log = log
+        self.frames_counter = frames_counter
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-log", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        last_t, last_n = perf_counter(), self.metrics.counters.get(self.frames_counter, 0)
+        last_counts = self.metrics.bucket_counts()
+        while not self._stop.wait(self.every):
+            t, n = perf_counter(), self.metrics.counters.get(self.frames_counter, 0)
+            counts = self.metrics.bucket_counts()
+            # Quantiles over this interval only, not the process lifetime
+            self.log(self.metrics.summary_line(fps=(n - last_n) / (t - last_t),
+                                               since=last_counts, counts=counts))
+            last_t, last_n, last_counts = t, n, counts
+
+    def stop(self):
+        self._stop.set()
+
+
+# ----------------------------
+# Process-wide instance
+# ----------------------------
+_metrics = NullMetrics()
+_server = None
+_reporter = None
+
+
+def get_metrics():
+    """Process-wide metrics (a no-op ``NullMetrics`` until ``start_metrics``)."""
+    return _metrics
+
+
+def start_metrics(port=METRICS_PORT, log_every=METRICS_LOG_SECS, host=METRICS_HOST):
+    """
+    Enable instrumentation; with ``port`` serve /metrics, with ``log_every``
+    print a summary line periodically. Returns the live ``Metrics``.
+    """
+    global _metrics, _server, _reporter
+    if not _metrics.enabled:
+        _metrics = Metrics()
+    if port and _server is None:
+        _server = serve_metrics(_metrics, port, host)
+        print(f"📈 Metrics on http://{host}:{_server.server_address[1]}/metrics")
+    if log_every and _reporter is None:
+        _reporter = MetricsReporter(_metrics, log_every).start()
+    return _metrics
+
+
+def start_metrics_from_env():
+    """``start_metrics`` if DSA_METRICS_PORT / DSA_METRICS_LOG_SECS ask for it."""
+    if METRICS_PORT or METRICS_LOG_SECS:
+        return start_metrics()
+    return _metrics
+
+
+def stop_metrics():
+    global _server, _reporter
+    if _reporter is not None:
+        _reporter.stop()
+        _reporter = None
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -1,52 +1,122 @@
 # main.py
 import cv2
-from cv_module.face_landmark_utils import eye_aspect_ratio, mouth_aspect_ratio
+from datetime import datetime
 from audio_module.audio_alert import play_beep
-from llm_module.alert_generator import generate_alert
+from cv_module.drowsiness_detector import create_face_mesh, log_state
+from cv_module.fatigue import FatigueFSM
+from cv_module.metrics import landmarks_to_array
+from llm_module.alert_generator import generate_alert, get_alert_generator
+from log_module.instrumentation import start_metrics_from_env
 
-# Thresholds
-EYE_AR_THRESH = 0.25
-MOUTH_AR_THRESH = 0.7
-CONSEC_FRAMES = 15
+# Voice stress analysis from the microphone on a background thread
+STRESS_ANALYSIS = True
+
+# FSM transitions that raise an AI alert -> alert_generator event type
+ALERT_EVENTS = {
+    "Drowsiness detected": "drowsiness",
+    "Head nod detected": "drowsiness",
+    "Yawning detected": "yawn",
+    "Fatigue detected": "fatigue",
+}
+
+def start_stress_analysis():
+    """Background mic analyzer, or None when no audio input is available."""
+    if not STRESS_ANALYSIS:
+        return None
+    try:
+        from audio_module.stress_analysis import MicSource, StressAnalyzer
+        return StressAnalyzer(MicSource()).start()
+    except Exception as e:
+        # ImportError / OSError without PortAudio, sd.PortAudioError without a usable input
+        print(f"⚠️ Stress analysis disabled: {e}")
+        return None
 
 def drowsiness_monitor():
     print("🚗 Starting Driver Safety Assistant with AI alerts...")
 
+    # Precompute alert texts in the background; the loop never waits on the LLM
+    get_alert_generator().warm_up()
+
+    # Stage timers / counters; enabled by DSA_METRICS_PORT or DSA_METRICS_LOG_SECS
+    m = start_metrics_from_env()
+
+    # Eye closure, PERCLOS, blink rate, yawns and head nods in one state machine
+    events = []
+    fsm = FatigueFSM(on_event=lambda event, now, ear: events.append(event))
+    face_mesh = create_face_mesh()
+    stress = start_stress_analysis()
+    stress_level = None
+
     cap = cv2.VideoCapture(0)  # Webcam
-    frame_counter = 0
+    pts = None  # reused (N, 3) landmark buffer
     alert_text = ""
 
     while True:
+        t = m.now()
         ret, frame = cap.read()
         if not ret:
             break
+        t = m.lap("capture", t)
+        m.inc("frames")
 
-        # EAR & MAR (dummy for now – replace with real values later)
-        ear = eye_aspect_ratio()
-        mar = mouth_aspect_ratio()
+        results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        t = m.lap("facemesh", t)
 
-        # Check drowsiness
-        if ear < EYE_AR_THRESH or mar > MOUTH_AR_THRESH:
-            frame_counter += 1
-            if frame_counter >= CONSEC_FRAMES:
-                # 🔹 Generate LLM-based alert instead of static text
-                alert_text = generate_alert("Drowsiness detected. Suggest safe advice.")
-                play_beep()
+        if not results.multi_face_landmarks:
+            fsm.reset_face_lost()
+            m.inc("face_lost")
+            sig = None
         else:
-            frame_counter = 0
+            h, w = frame.shape[:2]
+            pts = landmarks_to_array(results.multi_face_landmarks[0], w, h, out=pts)
+            sig = fsm.update_frame(pts)   # EAR, MAR, pitch from one pass + fusion
+            t = m.lap("fatigue", t)
+
+        for event in events:
+            log_state(event, sig["smooth_ear"] if sig else None)
+            if event in ALERT_EVENTS:
+                # 🔹 LLM-based alert: cached text returned at once, refreshed off-thread
+                alert_text = generate_alert(ALERT_EVENTS[event], ear=sig["ear"],
+                                            hour=datetime.now().hour)
+                play_beep()
+                m.inc("alerts")
+        events.clear()
+        t = m.lap("events", t)   # event log + alert text lookup + queued beep
+
+        # Voice stress: read the analyzer's latest score, never wait on it
+        if stress is not None and stress.latest is not None:
+            level = stress.latest["level"]
+            if level == "high stress" and stress_level != level:
+                alert_text = generate_alert("stress", hour=datetime.now().hour)
+                play_beep()
+                m.inc("alerts")
+            stress_level = level
+            m.set("stress_score", stress.latest["score"])
+        if not (fsm.state == "DROWSY" or fsm.yawning or fsm.fatigued
+                or stress_level == "high stress"):
             alert_text = ""
+        t = m.lap("stress", t)
 
-        # Overlay alert on video
+        # Overlay alert and fused signals on video
         if alert_text:
             cv2.putText(frame, alert_text, (50, 100),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        if sig:
+            cv2.putText(frame, f"PERCLOS {sig['perclos']:.0%} | blinks {sig['blink_rate']:.0f}/min "
+                               f"| fatigue {sig['fatigue_score']:.2f}",
+                        (10, frame.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        t = m.lap("overlay", t)
 
         cv2.imshow("Driver Safety Assistant", frame)
 
         # Quit with 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        key = cv2.waitKey(1) & 0xFF
+        m.lap("display", t)   # imshow + waitKey (includes the GUI event loop)
+        if key == ord('q'):
             break
 
+    if stress is not None:
+        stress.stop()
     cap.release()
     cv2.destroyAllWindows()
 
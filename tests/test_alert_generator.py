@@ -0,0 +1,119 @@
+# tests/test_alert_generator.py
+"""Alert cache keys, and the incremental map-reduce log summary."""
+import json
+import os
+
+import pytest
+
+from llm_module import alert_generator as ag
+
+
+def test_every_key_bucket_reaches_the_prompt():
+    key = ag.context_key("drowsiness", ear=0.12, duration=6.0, hour=23, count=4)
+    prompt = ag.build_prompt(key)
+    for bucket in key[1:]:
+        assert bucket in prompt
+
+
+def test_nearby_ears_share_a_key():
+    assert ag.context_key("drowsiness", ear=0.181) == ag.context_key("drowsiness", ear=0.186)
+    assert ag.context_key("drowsiness", ear=0.12) != ag.context_key("drowsiness", ear=0.20)
+
+
+def test_generated_message_is_cached_per_key():
+    gen = ag.AlertGenerator(model=ag.StubModel())
+    try:
+        assert gen.get("yawn", ear=0.2) == ag.DEFAULT_MESSAGES["yawn"]
+        gen.wait_idle()
+        assert gen.get("yawn", ear=0.19).startswith("Alert: The driver is yawning")
+        assert gen.generated == 1
+    finally:
+        gen.close()
+
+
+# ------------------ LOG SUMMARY ------------------
+class _CountingSummarizer:
+    """Stands in for the BART pipeline: echoes the first line, counts calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, **kwargs):
+        self.calls += 1
+        return [{"summary_text": f"S{self.calls}: {text.splitlines()[0][:20]}"}]
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    fake = _CountingSummarizer()
+    monkeypatch.setattr(ag, "_summarizer", fake)
+    return fake
+
+
+def _write_events(path, n, start=0, mode="a"):
+    with open(path, mode, encoding="utf-8") as f:
+        for i in range(start, start + n):
+            f.write(json.dumps({"time": f"2024-06-10 08:{i // 60:02d}:{i % 60:02d}",
+                                "type": "drowsiness_detected", "ear": 0.18}) + "\n")
+
+
+def _cached(cache_dir):
+    return sorted(n for n in os.listdir(cache_dir) if n.endswith(".txt"))
+
+
+def test_episode_line_without_start():
+    text = ag._log_line_text(json.dumps({"type": "episode", "kind": "drowsy", "start": None, "end": 4.0}))
+    assert "drowsy episode 4s" in text
+
+
+def test_chunks_are_whole_lines_within_budget(tmp_path):
+    log = tmp_path / "events.jsonl"
+    _write_events(log, 50)
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"type": "half written')       # no newline yet
+    chunks = list(ag.iter_log_chunks(str(log), budget=60))
+    assert all(c[3] for c in chunks[:-1]) and not chunks[-1][3]
+    assert all(ag._estimate_tokens(c[0]) <= 60 for c in chunks)
+    assert [c[1] for c in chunks[1:]] == [c[2] for c in chunks[:-1]]   # contiguous
+    assert sum(len(c[0].splitlines()) for c in chunks) == 50
+    assert chunks[-1][2] == os.path.getsize(log) - len('{"type": "half written')
+
+
+def test_summary_resumes_and_caches_only_complete_chunks(tmp_path, summarizer):
+    log, cache = tmp_path / "events.jsonl", str(tmp_path / "cache")
+    _write_events(log, 200)
+    ag.generate_alert_summary(str(log), cache)
+    state = json.load(open(os.path.join(cache, "state.json")))
+    assert state["offset"] > 0 and state["chunks"]
+    assert len(_cached(cache)) == len(state["chunks"])     # no tail / reduce entries
+
+    _write_events(log, 5, start=200)
+    before = summarizer.calls
+    ag.generate_alert_summary(str(log), cache)
+    # Committed chunks come from the state: only the new tail and the reduce run
+    assert summarizer.calls - before == 2
+    assert json.load(open(os.path.join(cache, "state.json")))["chunks"][:len(state["chunks"])] == state["chunks"]
+
+
+def test_replaced_log_is_summarized_from_scratch(tmp_path, summarizer):
+    log, cache = tmp_path / "events.jsonl", str(tmp_path / "cache")
+    _write_events(log, 40)
+    ag.generate_alert_summary(str(log), cache)
+    # Same path, new content at least as long: size alone cannot tell
+    os.replace(log, tmp_path / "events.jsonl.1")
+    with open(log, "w", encoding="utf-8") as f:
+        for i in range(40):
+            f.write(json.dumps({"time": f"2024-06-11 09:00:{i % 60:02d}", "type": "yawn_detected",
+                                "mar": 0.7}) + "\n")
+    state_path = os.path.join(cache, "state.json")
+    assert ag._load_summary_state(state_path, str(log))["offset"] == 0
+
+
+def test_summary_cache_is_bounded(tmp_path, summarizer, monkeypatch):
+    monkeypatch.setattr(ag, "MAX_CACHED_SUMMARIES", 3)
+    cache = str(tmp_path / "cache")
+    for i in range(6):
+        ag.summarize_cached(f"chunk {i}", cache)
+    assert len(_cached(cache)) == 3
+    ag.summarize_cached("tail", cache, store=False)
+    assert len(_cached(cache)) == 3
@@ -0,0 +1,52 @@
+# tests/test_analyze_logs.py
+"""Incremental episode extraction notices a rotated log."""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import analyze_logs
+from log_module.event_sink import DROWSINESS_DETECTED
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    for name, file in (("EVENTS_FILE", "events.jsonl"), ("LOG_FILE", "alerts.log"),
+                       ("OUT_FILE", "episodes.csv"), ("STATE_FILE", ".state.json")):
+        monkeypatch.setattr(analyze_logs, name, str(tmp_path / file))
+    return tmp_path
+
+
+def _write(path, alert_times, filler=0):
+    with open(path, "w", encoding="utf-8") as f:
+        for ts in alert_times:
+            f.write(json.dumps({"type": DROWSINESS_DETECTED, "ts": ts}) + "\n")
+            for i in range(filler):
+                f.write(json.dumps({"type": "eyes_open", "ts": ts + 0.5, "pad": i}) + "\n")
+
+
+def _starts():
+    return list(pd.read_csv(analyze_logs.OUT_FILE)["start"])
+
+
+def test_rotation_to_a_longer_file_rebuilds(logs):
+    t0 = 1_718_000_000.0
+    _write(analyze_logs.EVENTS_FILE, [t0, t0 + 1, t0 + 60])
+    analyze_logs.analyze(use_store=False, now=t0 + 1000)
+    assert len(_starts()) == 2
+    # Rotate: the new log is already longer than the saved offset
+    os.replace(analyze_logs.EVENTS_FILE, str(logs / "events.jsonl.1"))
+    _write(analyze_logs.EVENTS_FILE, [t0 + 3600, t0 + 7200], filler=5)
+    analyze_logs.analyze(use_store=False, now=t0 + 10_000)
+    assert _starts() == [analyze_logs.episode_row(t, t)["start"] for t in (t0 + 3600, t0 + 7200)]
+
+
+def test_appends_are_incremental(logs):
+    t0 = 1_718_000_000.0
+    _write(analyze_logs.EVENTS_FILE, [t0])
+    analyze_logs.analyze(use_store=False, now=t0 + 100)
+    with open(analyze_logs.EVENTS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"type": DROWSINESS_DETECTED, "ts": t0 + 200}) + "\n")
+    closed = analyze_logs.analyze(use_store=False, now=t0 + 300)
+    assert len(closed) == 1 and len(_starts()) == 2
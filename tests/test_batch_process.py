@@ -0,0 +1,54 @@
+# tests/test_batch_process.py
+"""Chunked batch processing gives the same episodes as a single pass."""
+import cv2
+import numpy as np
+import pytest
+
+import batch_process as bp
+from cv_module.replay import synthetic_face
+
+FPS = 10.0
+GRAY_PER_EAR = 500.0          # frame gray level encodes the EAR to draw
+
+
+class GrayTracker:
+    """FaceMesh stand-in: landmarks whose EAR is the frame's gray level / 500."""
+
+    def process(self, frame, out=None):
+        return synthetic_face(float(frame.mean()) / GRAY_PER_EAR, out=out)
+
+    def reset(self):
+        pass
+
+
+@pytest.fixture
+def long_closure_video(tmp_path):
+    # 30 s open, 150 s closed (longer than the old 120 s cap), 30 s open, 5 s closed, 10 s open
+    path = str(tmp_path / "drive.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (32, 32))
+    assert writer.isOpened()
+    for secs, ear in [(30, 0.30), (150, 0.12), (30, 0.30), (5, 0.12), (10, 0.30)]:
+        frame = np.full((32, 32, 3), round(ear * GRAY_PER_EAR), np.uint8)
+        for _ in range(int(secs * FPS)):
+            writer.write(frame)
+    writer.release()
+    return path
+
+
+def run_chunks(path, chunk_frames):
+    bp._worker["tracker"] = GrayTracker()
+    chunks, fps = bp.plan_chunks(path, chunk_frames)
+    warm = bp.warmup_frames(fps)
+    episodes = []
+    for s, e in chunks:
+        episodes += bp.process_chunk(path, s, e, warm)["episodes"]
+    return [(round(ep["start_sec"], 2), round(ep["end_sec"], 2))
+            for ep in bp.merge_episodes(episodes)]
+
+
+def test_long_episode_matches_single_pass(long_closure_video):
+    single = run_chunks(long_closure_video, 10 ** 9)
+    chunked = run_chunks(long_closure_video, 400)
+    assert len(single) == 2
+    assert single[0][1] - single[0][0] > 120        # not truncated
+    assert chunked == single
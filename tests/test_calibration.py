@@ -0,0 +1,65 @@
+# tests/test_calibration.py
+"""Per-driver EAR calibration: a bounded phase that never loosens close_th."""
+import numpy as np
+
+from cv_module import calibration as cal
+from cv_module.drowsiness_detector import DrowsinessFSM
+
+
+def _open_eyes(n, mean=0.30, std=0.012, seed=0):
+    return mean + std * np.random.default_rng(seed).standard_normal(n)
+
+
+def test_calibrates_from_open_eyes_and_saves(tmp_path):
+    fsm = DrowsinessFSM(on_event=lambda *a: None)
+    c = cal.EARCalibrator("alice", profile_dir=str(tmp_path))
+    ears = _open_eyes(cal.MIN_SAMPLES + 50)
+    ears[::20] = 0.08                       # blinks are rejected, not averaged in
+    for ear in ears:
+        c.update(float(ear), fsm)
+    assert c.calibrated and c.rejected >= len(ears) // 20
+    assert abs(c.stats.mean - 0.30) < 0.005
+    assert (fsm.close_th, fsm.open_th) == c.thresholds
+    assert cal.load_profile("alice", str(tmp_path))["thresholds"] == list(c.thresholds)
+    # The next session starts from the stored profile
+    assert cal.EARCalibrator("alice", profile_dir=str(tmp_path)).thresholds == c.thresholds
+
+
+def test_frozen_after_calibration_phase(tmp_path):
+    c = cal.EARCalibrator("bob", profile_dir=str(tmp_path), calibration_frames=600)
+    for ear in _open_eyes(600):
+        c.update(float(ear))
+    assert c.frozen
+    n, before = c.stats.n, c.thresholds
+    for ear in _open_eyes(5000, mean=0.36, seed=1):
+        assert not c.update(float(ear))
+    assert c.stats.n == n and c.thresholds == before
+
+
+def test_slow_droop_never_lowers_close_th(tmp_path):
+    """Eyes drooping over the drive must not make the detector less sensitive."""
+    fps = 30
+    fsm = DrowsinessFSM(on_event=lambda *a: None)
+    c = cal.EARCalibrator("carol", profile_dir=str(tmp_path))
+    # 30 s alert, then the open-eye EAR sags from 0.30 to 0.22 over 10 minutes
+    ears = np.concatenate([_open_eyes(30 * fps),
+                           np.linspace(0.30, 0.22, 600 * fps) + _open_eyes(600 * fps, 0.0, seed=2)])
+    history = []
+    for ear in ears:
+        c.update(float(ear), fsm)
+        if c.calibrated:
+            history.append(c.thresholds[0])
+    assert c.frozen
+    assert all(b >= a for a, b in zip(history, history[1:]))
+    assert fsm.close_th == history[0] == c.thresholds[0]
+
+
+def test_refinement_within_phase_only_tightens(tmp_path):
+    c = cal.EARCalibrator("dan", profile_dir=str(tmp_path), rederive_every=100)
+    for ear in _open_eyes(cal.MIN_SAMPLES + 50):
+        c.update(float(ear))
+    first = c.thresholds[0]
+    for ear in _open_eyes(1000, mean=0.26, seed=3):     # lower, still open-eye
+        c.update(float(ear))
+    assert c.thresholds[0] >= first
+    assert cal.derive_thresholds(0.26, 0.01)[0] < first   # unclamped it would have dropped
@@ -0,0 +1,143 @@
+# tests/test_clip_recorder.py
+"""Clip recording: ring retention, trigger windows, flushing, atomic writes."""
+import time
+
+import numpy as np
+import pytest
+
+from cv_module import clip_recorder as cr
+
+
+class _NullSink:
+    def emit(self, *args, **kwargs):
+        pass
+
+
+class _ListSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, *args, **kwargs):
+        self.events.append(kwargs)
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    rec = cr.ClipRecorder(clip_dir=str(tmp_path), store="raw", events=_NullSink())
+    yield rec
+    rec.close()
+
+
+def _frames(n, shape=(48, 64, 3)):
+    return [(i / 15.0, np.full(shape, i, np.uint8)) for i in range(n)]
+
+
+def test_clip_is_written_atomically(recorder, tmp_path):
+    clip = cr._Clip(f"ok.{recorder.ext}", "drowsy", 0.0, 1.0, 0.5)
+    path = recorder._write_clip(clip, _frames(10))
+    assert [p.name for p in tmp_path.iterdir()] == [clip.name]
+    assert path.endswith(clip.name)
+
+
+def test_failed_clip_removes_part_file(recorder, tmp_path):
+    frames = _frames(10)
+    frames[5] = (frames[5][0], None)           # decode/write blows up mid-clip
+    real = recorder._decode
+    recorder._decode = lambda payload: real(payload) if payload is not None else 1 / 0
+    clip = cr._Clip(f"bad.{recorder.ext}", "drowsy", 0.0, 1.0, 0.5)
+    with pytest.raises(ZeroDivisionError):
+        recorder._write_clip(clip, frames)
+    assert list(tmp_path.iterdir()) == []
+
+
+# ----------------------------
+# Buffering and triggers (explicit timestamps, 10 fps, every frame kept)
+# ----------------------------
+T0 = 1_000_000.0
+FRAME = np.zeros((48, 64, 3), np.uint8)
+FRAME_BYTES = 24 * 32 * 3                    # after BUFFER_SCALE = 0.5
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _feed(rec, i0, i1):
+    """Add frames ``T0 + i / 10`` for i in [i0, i1) and wait until they are buffered."""
+    target = rec.frames_added + (i1 - i0)
+    for i in range(i0, i1):
+        assert rec.add(FRAME, ts=T0 + i / 10)
+        if (i - i0) % 20 == 19:
+            _wait(lambda: rec._incoming.empty())
+    _wait(lambda: rec.frames_added == target)
+
+
+@pytest.fixture
+def make_recorder(tmp_path):
+    made = []
+
+    def make(**kwargs):
+        sink = _ListSink()
+        kwargs = {"clip_dir": str(tmp_path), "store": "raw", "buffer_fps": 0, **kwargs}
+        rec = cr.ClipRecorder(events=sink, **kwargs)
+        rec.sink = sink
+        made.append(rec)
+        return rec
+
+    yield make
+    for rec in made:
+        rec.close()
+
+
+def test_ring_keeps_only_the_pre_window(make_recorder):
+    rec = make_recorder(pre_secs=2.0)
+    _feed(rec, 0, 100)
+    _wait(lambda: rec.stats()["buffer_frames"] <= 21)    # eviction follows the append
+    st = rec.stats()
+    assert st["frames_added"] == 100
+    assert st["buffer_frames"] == 21 and st["buffer_secs"] == 2.0
+    assert st["frames_evicted_early"] == 0
+    assert st["buffer_mb"] == round(21 * FRAME_BYTES / 1e6, 2)
+
+
+def test_trigger_extends_up_to_max_clip_secs(make_recorder, tmp_path):
+    rec = make_recorder(pre_secs=1.0, post_secs=1.0, max_clip_secs=3.0)
+    _feed(rec, 0, 21)
+    name = rec.trigger("drowsy", ts=T0 + 2.0)             # [T0+1, T0+3]
+    _feed(rec, 21, 29)
+    assert rec.trigger("drowsy", ts=T0 + 2.8) == name     # extended to T0+3.8
+    _feed(rec, 29, 36)
+    assert rec.trigger("drowsy", ts=T0 + 3.5) == name     # capped at start + 3 s
+    _feed(rec, 36, 60)
+    _wait(lambda: rec.sink.events)
+    (saved,) = rec.sink.events
+    assert saved["clip"] == name and saved["ts"] == T0 + 2.0
+    assert (saved["start"], saved["end"]) == (T0 + 1.0, T0 + 4.0)
+    assert saved["frames"] == 31
+    assert (tmp_path / name).exists()
+    assert rec.stats()["clips_written"] == 1 and rec.stats()["clips_dropped"] == 0
+
+
+def test_stalled_stream_flushes_open_clip(make_recorder):
+    rec = make_recorder(pre_secs=1.0, post_secs=0.3)
+    _feed(rec, 0, 20)
+    rec.trigger("drowsy", ts=T0 + 1.9)
+    # No frame ever reaches T0 + 2.2: the clip goes out once the stream has
+    # been idle for the post window, with the frames it has
+    _wait(lambda: rec.sink.events)
+    (saved,) = rec.sink.events
+    assert (saved["start"], saved["end"]) == (T0 + 0.9, T0 + 1.9)
+    assert saved["frames"] == 11
+
+
+def test_memory_cap_evicts_early(make_recorder):
+    rec = make_recorder(pre_secs=10.0, max_buffer_mb=5 * FRAME_BYTES / 1024 / 1024)
+    _feed(rec, 0, 30)
+    _wait(lambda: rec.stats()["buffer_frames"] <= 5)
+    st = rec.stats()
+    assert st["buffer_frames"] == 5
+    assert st["frames_evicted_early"] == 25
+    assert st["buffer_mb"] <= st["buffer_cap_mb"]
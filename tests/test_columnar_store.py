@@ -0,0 +1,89 @@
+# tests/test_columnar_store.py
+"""Columnar store: local-time telemetry, driver partitions, compaction."""
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from log_module import columnar_store as cs
+
+
+def _parts(root):
+    return sorted(os.path.relpath(os.path.join(d, f), root)
+                  for d, _, files in os.walk(root) for f in files if f.endswith(".parquet"))
+
+
+@pytest.fixture
+def eastern(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_telemetry_is_local_time_like_episodes(tmp_path, eastern):
+    store = cs.ColumnarStore(str(tmp_path))
+    # Shortly before local midnight: naive UTC would disagree on the day in most zones
+    t = time.mktime(datetime(2024, 6, 10, 23, 59, 30).timetuple())
+    rec = cs.TelemetryRecorder(store, vehicle="truck-1", driver="alice")
+    rec.record(t, 0.3, 0.3, 0.1, "awake")
+    rec.close()
+    store.append_episodes(pd.DataFrame({"start": [datetime.fromtimestamp(t)],
+                                        "end": [datetime.fromtimestamp(t + 20)],
+                                        "driver": ["alice"]}), vehicle="truck-1")
+    assert _parts(tmp_path / "telemetry")[0].startswith(
+        os.path.join("date=2024-06-10", "vehicle=truck-1", "driver=alice"))
+    assert _parts(tmp_path / "episodes")[0].startswith(
+        os.path.join("date=2024-06-10", "vehicle=truck-1", "driver=alice"))
+    tel = store.read_telemetry()
+    assert tel["ts"].iloc[0] == pd.Timestamp(datetime(2024, 6, 10, 23, 59, 30))
+    assert store.read_episodes()["start"].iloc[0] == tel["ts"].iloc[0]
+
+
+def test_driver_partition_filter(tmp_path):
+    store = cs.ColumnarStore(str(tmp_path))
+    df = pd.DataFrame({"start": pd.to_datetime(["2024-06-10 08:00:00"] * 3),
+                       "end": pd.to_datetime(["2024-06-10 08:00:05"] * 3),
+                       "driver": ["alice", "bob", None]})
+    assert store.append_episodes(df, vehicle="van") == 3
+    assert len(store.read_episodes(drivers=["alice"])) == 1
+    assert set(store.read_episodes()["driver"]) == {"alice", "bob", cs.DEFAULT_DRIVER}
+    with pytest.raises(ValueError):
+        store.append_episodes(df.assign(driver="../x"))
+
+
+def test_small_appends_are_compacted(tmp_path):
+    store = cs.ColumnarStore(str(tmp_path))
+    for i in range(cs.COMPACT_MIN_FILES + 3):
+        ts = pd.Timestamp("2024-06-10 08:00:00") + pd.Timedelta(seconds=10 * i)
+        store.append_episodes(pd.DataFrame({"start": [ts], "end": [ts + pd.Timedelta(seconds=3)]}))
+    # One merged file plus the appends since the merge
+    assert len(_parts(tmp_path)) == 4
+    df = store.read_episodes().sort_values("start")
+    assert len(df) == cs.COMPACT_MIN_FILES + 3
+    assert df["start"].is_unique
+
+
+def test_interrupted_compaction_is_finished(tmp_path, monkeypatch):
+    store = cs.ColumnarStore(str(tmp_path))
+    for i in range(3):
+        ts = pd.Timestamp("2024-06-10 08:00:00") + pd.Timedelta(seconds=10 * i)
+        store.append_episodes(pd.DataFrame({"start": [ts], "end": [ts]}))
+    part_dir = os.path.dirname(os.path.join(tmp_path, _parts(tmp_path)[0]))
+    before = sorted(os.listdir(part_dir))
+    # Simulate a crash after the merged file was renamed into place
+    with monkeypatch.context() as m:
+        m.setattr(cs.os, "remove", lambda path: None)
+        store.compact_partition(part_dir, cs.EPISODE_SCHEMA, min_files=3)
+    assert len(os.listdir(part_dir)) == 4
+    assert store.compact("episodes", min_files=99) == 0
+    left = os.listdir(part_dir)
+    assert len(left) == 1 and left[0] not in before
+    assert len(store.read_episodes()) == 3
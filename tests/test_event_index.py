@@ -0,0 +1,33 @@
+# tests/test_event_index.py
+"""Dashboard event index: episode pairing from start / end events."""
+from dashboard.event_index import EventIndex
+from log_module import event_sink as ev
+
+
+def _episodes(index):
+    rows = index.episodes.range()
+    return list(zip(index.episodes.column("start", rows), index.episodes.column("end", rows)))
+
+
+def test_lost_end_does_not_stretch_the_next_episode():
+    index = EventIndex(retention_days=1)
+    t = 1_700_000_000.0
+    index.ingest([
+        {"ts": t, "type": ev.DROWSINESS_DETECTED},            # its eyes_open was lost
+        {"ts": t + 3600, "type": ev.DROWSINESS_DETECTED},
+        {"ts": t + 3604, "type": ev.EYES_OPEN},
+    ])
+    assert _episodes(index) == [(t + 3600, t + 3604)]
+
+
+def test_streams_pair_independently():
+    index = EventIndex(retention_days=1)
+    t = 1_700_000_000.0
+    index.ingest([
+        {"ts": t, "type": ev.YAWN_DETECTED, "stream": "cab"},
+        {"ts": t + 1, "type": ev.YAWN_DETECTED, "stream": "van"},
+        {"ts": t + 2, "type": ev.YAWN_ENDED, "stream": "cab"},
+        {"ts": t + 5, "type": ev.YAWN_ENDED, "stream": "van"},
+    ])
+    df = index.recent_episodes(now=t + 10)
+    assert sorted(zip(df["stream"], df["duration_sec"])) == [("cab", 2.0), ("van", 4.0)]
@@ -0,0 +1,44 @@
+# tests/test_fatigue.py
+"""Yawn hold/hysteresis (shared by FatigueFSM and driver_safety) and metric kernels."""
+import numpy as np
+
+from cv_module import fatigue, metrics
+
+
+def _run(detector, mars, fps=30.0):
+    return [(i / fps, e) for i, mar in enumerate(mars)
+            if (e := detector.update(mar, i / fps)) is not None]
+
+
+def test_brief_mouth_opening_is_not_a_yawn():
+    # Talking: MAR above the threshold for 0.5 s at a time
+    mars = ([0.7] * 15 + [0.3] * 15) * 4
+    assert _run(fatigue.YawnDetector(), mars) == []
+
+
+def test_yawn_needs_hold_and_ends_below_close_th():
+    yawn = fatigue.YawnDetector()
+    # 1.5 s open, dips to 0.5 (between close and open thresholds), then closes
+    mars = [0.3] * 30 + [0.7] * 45 + [0.5] * 15 + [0.3] * 10
+    events = _run(yawn, mars)
+    assert [e for _, e in events] == ["Yawning detected", "Yawn ended"]
+    assert abs(events[0][0] - (1.0 + fatigue.YAWN_HOLD_SECS)) < 1e-9
+    assert abs(events[1][0] - 3.0) < 1e-9
+
+
+def test_fatigue_fsm_counts_yawns_through_detector():
+    seen = []
+    fsm = fatigue.FatigueFSM(on_event=lambda e, now, ear: seen.append(e))
+    for i in range(90):
+        fsm.update_signals(0.3, 0.7 if 10 <= i < 70 else 0.3, 0.0, now=i / 30)
+    assert seen.count("Yawning detected") == 1 and seen.count("Yawn ended") == 1
+    assert not fsm.yawning and fsm._yawns.count(3.0) == 1
+
+
+def test_face_signals_use_the_public_kernels():
+    pts = np.random.default_rng(0).random((5, 478, 3)).astype(np.float32) * 400
+    sig = metrics.face_signals(pts)
+    assert np.allclose(sig[:, :2], metrics.eye_aspect_ratios(pts))
+    assert np.allclose(sig[:, 2], metrics.mouth_aspect_ratio(pts))
+    assert np.allclose(sig[:, 3], metrics.head_pitch(pts))
+    assert np.allclose(metrics.gathered_signals(pts[:, metrics.SIGNAL_IDX]), sig)
@@ -0,0 +1,35 @@
+# tests/test_filters.py
+"""Vectorized ``batch`` paths match feeding samples one by one through ``update``."""
+import numpy as np
+import pytest
+
+from cv_module import filters
+
+
+def _series(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    xs = 0.3 + 0.02 * rng.standard_normal(n)
+    xs[1000:1060] = 0.12 + 0.01 * rng.standard_normal(60)     # eye closure
+    ts = 100.0 + np.cumsum(rng.uniform(1 / 40, 1 / 20, n))    # jittery frame clock
+    return xs, ts
+
+
+@pytest.mark.parametrize("kind", sorted(filters.FILTERS))
+@pytest.mark.parametrize("timed", [False, True], ids=["untimed", "timed"])
+def test_batch_matches_update_loop(kind, timed):
+    xs, ts = _series()
+    live = filters.make_filter(kind)
+    expected = [live.update(x, t if timed else None) for x, t in zip(xs, ts)]
+    got = filters.filter_series(xs, kind, ts=ts if timed else None)
+    assert got.shape == xs.shape
+    np.testing.assert_allclose(got, expected, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("kind", sorted(filters.FILTERS))
+def test_batch_of_nothing(kind):
+    assert len(filters.filter_series([], kind)) == 0
+
+
+def test_unknown_filter():
+    with pytest.raises(ValueError):
+        filters.make_filter("median")
@@ -0,0 +1,58 @@
+# tests/test_frame_bus.py
+"""Shared-memory frame bus: seqlock validity, skip counting, close."""
+import numpy as np
+import pytest
+
+from cv_module import frame_bus as fb
+
+SHAPE = (4, 6, 3)
+
+
+@pytest.fixture
+def bus():
+    bus = fb.FrameBus.create(SHAPE, slots=2)
+    reader = fb.FrameBusReader(bus.name, timeout=1.0)
+    yield bus, reader
+    reader.close()
+    bus.unlink()
+
+
+def _frame(v):
+    return np.full(SHAPE, v, np.uint8)
+
+
+def test_ref_is_invalid_once_its_slot_is_overwritten(bus):
+    bus, reader = bus
+    bus.write(_frame(1), ts=10.0)
+    ref = reader.latest(timeout=0.1)
+    assert (ref.seq, ref.ts) == (1, 10.0) and ref.valid()
+    assert (ref.copy() == 1).all()
+
+    bus.write(_frame(2))                     # other slot: ref still good
+    assert ref.valid() and (ref.copy() == 1).all()
+    bus.next_slot()                          # producer starts writing into ref's slot
+    assert not ref.valid() and ref.copy() is None
+    bus.publish()
+    assert not ref.valid() and ref.copy() is None
+
+
+def test_skipped_frames_are_counted(bus):
+    bus, reader = bus
+    bus.write(_frame(1))
+    assert reader.latest(timeout=0.1).seq == 1
+    for v in range(2, 6):
+        bus.write(_frame(v))
+    ref = reader.latest(timeout=0.1)
+    assert ref.seq == 5 and (ref.frame == 5).all()
+    assert (reader.received, reader.skipped) == (2, 3)
+    assert reader.latest(timeout=0.01) is None            # nothing newer yet
+    assert reader.latest(newer=False).seq == 5
+
+
+def test_latest_is_none_after_close(bus):
+    bus, reader = bus
+    bus.write(_frame(1))
+    bus.close()
+    assert reader.closed
+    assert reader.latest(timeout=0.1).seq == 1            # already published: still delivered
+    assert reader.latest() is None                        # no timeout needed: never blocks
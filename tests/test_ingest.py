@@ -0,0 +1,85 @@
+# tests/test_ingest.py
+"""Ingest service request handling and client retry classification."""
+import asyncio
+import http.server
+import json
+import threading
+import time
+
+from log_module import ingest_client, ingest_service
+
+
+def _event(i, **kw):
+    return {"id": f"v1-test-{i}", "vehicle": "v1", "ts": time.time(), "type": "drowsiness_detected",
+            **kw}
+
+
+def test_bad_ndjson_lines_are_counted_not_fatal():
+    body = (json.dumps(_event(0)) + "\n{not json\n\xff\n" + json.dumps(_event(1)) + "\n").encode(
+        "utf-8") + b"\xff\xfe\n"
+    events, lines, bad = ingest_service.parse_body(body)
+    assert [e["id"] for e in events] == ["v1-test-0", "v1-test-1"]
+    assert len(lines) == 2 and bad == 3
+
+
+async def _exchange(service, port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+    payload = json.loads(await reader.readexactly(length))
+    writer.close()
+    return int(head.split()[1]), payload
+
+
+def test_service_rejects_bad_content_length_and_keeps_good_lines(tmp_path):
+    async def run():
+        service = ingest_service.IngestService(str(tmp_path))
+        _, port = await service.start("127.0.0.1", 0)
+        try:
+            bad_len = await _exchange(service, port, b"POST /events HTTP/1.1\r\n"
+                                      b"Content-Length: abc\r\n\r\n")
+            body = (json.dumps(_event(0)) + "\n{oops\n" + json.dumps(_event(1)) + "\n").encode()
+            ok = await _exchange(service, port, b"POST /events HTTP/1.1\r\nConnection: close\r\n"
+                                 + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        finally:
+            await service.stop()
+        return bad_len, ok, service.stats
+
+    (s1, _), (s2, p2), stats = asyncio.run(run())
+    assert s1 == 400
+    assert s2 == 200 and p2 == {"accepted": 2, "duplicates": 0, "invalid": 1}
+    assert stats["written"] == 2
+
+
+class _NotFound(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = b'{"error": "not found"}'
+        self.send_response(404)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_client_spools_on_404(tmp_path):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _NotFound)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = ingest_client.IngestClient(
+            f"http://127.0.0.1:{server.server_address[1]}/events", vehicle="v1",
+            spool_dir=str(tmp_path), flush_interval=0.05, max_retries=1, backoff=0.01)
+        client.send_batch([{"type": "drowsiness_detected", "ts": time.time()}] * 3)
+        deadline = time.monotonic() + 5
+        while client.stats["spooled"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.close()
+    finally:
+        server.shutdown()
+    assert client.stats["rejected"] == 0
+    assert client.stats["spooled"] == 3 and client.stats["retries"] == 1
+    assert len(list(tmp_path.glob("spool-*.jsonl"))) == 1
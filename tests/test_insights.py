@@ -0,0 +1,57 @@
+# tests/test_insights.py
+"""Aggregate cache stays bounded; the figure manifest belongs to its reports dir."""
+import os
+
+import pandas as pd
+
+import insights
+
+
+def _episodes():
+    start = pd.to_datetime(["2024-06-10 08:00:00", "2024-06-11 23:30:00"])
+    return pd.DataFrame({"start": start, "end": start + pd.Timedelta(seconds=4)})
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(insights, "CACHE_DIR", str(tmp_path))
+    keep = 4
+    monkeypatch.setattr(insights, "MAX_CACHED_AGGS", keep)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _episodes()
+
+    for i in range(keep):
+        insights.cached_aggregates(f"fp{i}", load)
+        os.utime(tmp_path / f"agg_fp{i}.pkl", (1000 + i, 1000 + i))
+    _, hit = insights.cached_aggregates("fp0", load)      # oldest, but just used
+    assert hit
+    for i in range(keep, keep + 2):
+        insights.cached_aggregates(f"fp{i}", load)
+    left = sorted(p.name for p in tmp_path.glob("agg_*.pkl"))
+    assert len(left) == keep
+    assert "agg_fp0.pkl" in left and "agg_fp1.pkl" not in left and "agg_fp2.pkl" not in left
+    assert len(loads) == keep + 2
+
+
+def test_render_manifest_is_per_reports_dir(tmp_path, monkeypatch):
+    calls = []
+
+    def render(aggs, out):
+        calls.append(out)
+        with open(out, "w") as f:
+            f.write("x")
+
+    monkeypatch.setattr(insights, "FIGURES", {"fig.txt": (["daily_counts"], render)})
+    aggs = {"daily_counts": pd.Series([1, 2])}
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.mkdir()
+    b.mkdir()
+    assert insights.render_reports(aggs, str(a)) == (["fig.txt"], [])
+    assert insights.render_reports(aggs, str(a)) == ([], ["fig.txt"])
+    # Another reports dir has its own manifest: its figure is not skipped
+    assert insights.render_reports(aggs, str(b)) == (["fig.txt"], [])
+    assert (a / ".cache" / insights.MANIFEST_NAME).exists()
+    assert (b / ".cache" / insights.MANIFEST_NAME).exists()
+    assert len(calls) == 2
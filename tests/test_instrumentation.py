@@ -0,0 +1,50 @@
+# tests/test_instrumentation.py
+"""The periodic metrics line reports the last interval, not the lifetime."""
+import time
+
+from log_module.instrumentation import Metrics, MetricsReporter
+
+
+def test_windowed_quantiles_follow_a_slowdown():
+    m = Metrics()
+    for _ in range(1000):
+        m.observe("facemesh", 0.001)
+    before = m.bucket_counts()
+    for _ in range(100):
+        m.observe("facemesh", 0.050)
+    lifetime = m.stages["facemesh"].quantile(0.5)
+    window = m.stages["facemesh"].quantile(0.5, since=before["facemesh"])
+    assert lifetime < 0.002 and 0.04 < window < 0.06
+    line = m.summary_line(since=before)
+    p50 = float(line.split("facemesh ")[1].split("/")[0])
+    assert 40 < p50 < 60
+
+
+def test_idle_stages_drop_out_of_the_window():
+    m = Metrics()
+    m.observe("capture", 0.004)
+    m.observe("facemesh", 0.020)
+    before = m.bucket_counts()
+    m.observe("capture", 0.004)
+    line = m.summary_line(since=before)
+    assert "capture" in line and "facemesh" not in line
+
+
+def test_reporter_logs_interval_quantiles():
+    m = Metrics()
+    for _ in range(500):
+        m.observe("facemesh", 0.001)
+    lines = []
+    rep = MetricsReporter(m, every=0.05, log=lines.append).start()
+    try:
+        while not lines:
+            time.sleep(0.01)
+        n = len(lines)
+        for _ in range(50):
+            m.observe("facemesh", 0.030)
+        while len(lines) < n + 2:
+            time.sleep(0.01)
+    finally:
+        rep.stop()
+    p50s = [float(l.split("facemesh ")[1].split("/")[0]) for l in lines if "facemesh" in l]
+    assert max(p50s) > 20
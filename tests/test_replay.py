@@ -0,0 +1,56 @@
+# tests/test_replay.py
+"""Replay scenarios through the real detector path (make_analyzer -> analyze_frame -> FSM)."""
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+from cv_module import replay
+from cv_module.drowsiness_detector import CLOSE_HOLD_SECS
+
+
+@pytest.mark.parametrize("name", sorted(replay.SCENARIOS))
+def test_scenario_episodes(name):
+    result = replay.replay_scenario(name)
+    assert result["passed"], result["failures"]
+    assert len(result["episodes"]) == len(replay.SCENARIOS[name][2])
+
+
+def test_detect_delay_includes_hold():
+    result = replay.replay_scenario("long_closure")
+    (delay,) = result["detect_delay_s"]
+    assert CLOSE_HOLD_SECS <= delay <= replay.EPISODE_TOLERANCE
+
+
+def test_longer_hold_suppresses_microsleep():
+    result = replay.replay_scenario("microsleep", fsm_kwargs={"hold_secs": 3.0})
+    assert result["episodes"] == []
+    assert not result["passed"]
+
+
+def test_face_loss_resets_close_timer():
+    # 0.5 s closed, face lost, 0.5 s closed: never CLOSE_HOLD_SECS in one run
+    h = replay.ReplayHarness("gap")
+    h.analyzer(tracker=replay.SyntheticTracker())
+    ts, ears = replay.build_series([(2, 0.30), (0.5, 0.12), (0.2, None), (0.5, 0.12), (2, 0.30)],
+                                   noise=0.0)
+    for t, ear in zip(ts.tolist(), ears.tolist()):
+        h.step(t, np.array([ear]))
+    assert h.finish([])["episodes"] == []
+
+
+def test_temp_sink_is_removed():
+    before = set(os.listdir(tempfile.gettempdir()))
+    replay.replay_scenario("microsleep")
+    leaked = [d for d in set(os.listdir(tempfile.gettempdir())) - before if d.startswith("replay_")]
+    assert leaked == []
+
+
+def test_per_stage_breakdown():
+    stages = replay.replay_scenario("microsleep")["stages"]
+    for name in ("facemesh", "ear", "fsm", "analyze", "logging"):
+        assert stages[name]["count"] > 0, name
+    frames = stages["analyze"]["count"]
+    assert stages["facemesh"]["count"] == stages["ear"]["count"] == stages["fsm"]["count"] == frames
+    assert stages["logging"]["count"] == 2          # alert + recovery
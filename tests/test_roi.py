@@ -0,0 +1,45 @@
+# tests/test_roi.py
+"""FaceROITracker routing: full frames and crops go to separate FaceMesh instances."""
+from types import SimpleNamespace
+
+import numpy as np
+
+from cv_module.roi import FaceROITracker
+
+FACE = (300.0, 200.0, 80.0)       # face centre x, y and half-size in original pixels
+
+
+class RecordingMesh:
+    """Returns one face at FACE (as seen through the last crop / resize) and logs input shapes."""
+
+    def __init__(self, tracker=None):
+        self.shapes = []
+        self.tracker = tracker
+
+    def process(self, rgb):
+        self.shapes.append(rgb.shape[:2])
+        cx, cy, r = FACE
+        if rgb.shape[:2] == (360, 640):            # downscaled 720x1280 frame
+            x0, y0, side_x, side_y = 0.0, 0.0, 1280.0, 720.0
+        else:                                       # crop of self.tracker.roi
+            x0, y0, side = self.tracker.roi
+            side_x = side_y = float(side)
+        pts = [((cx + dx - x0) / side_x, (cy + dy - y0) / side_y)
+               for dx in (-r, 0, r) for dy in (-r, 0, r)]
+        lms = [SimpleNamespace(x=x, y=y, z=0.0) for x, y in pts]
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=lms)])
+
+
+def test_crops_use_the_static_mesh():
+    full, crop = RecordingMesh(), RecordingMesh()
+    tracker = FaceROITracker(full, scale=0.5, crop_size=256, redetect_every=5, crop_mesh=crop)
+    crop.tracker = tracker
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    for _ in range(12):
+        pts = tracker.process(frame)
+        np.testing.assert_allclose(pts[:, :2].min(axis=0), [220, 120], atol=1.0)
+        np.testing.assert_allclose(pts[:, :2].max(axis=0), [380, 280], atol=1.0)
+    assert set(full.shapes) == {(360, 640)}
+    assert set(crop.shapes) == {(256, 256)}
+    assert tracker.full_frame_runs == len(full.shapes) == 2
+    assert tracker.roi_runs == len(crop.shapes) == 10
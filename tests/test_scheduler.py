@@ -0,0 +1,47 @@
+# tests/test_scheduler.py
+"""Adaptive inference rate: detection delay stays within latency_bound()."""
+import numpy as np
+import pytest
+
+from cv_module import replay
+from cv_module.drowsiness_detector import make_scheduler
+
+FPS = 30.0
+DROOP = [(0.1, e) for e in (0.28, 0.26, 0.24, 0.22, 0.20, 0.17)]
+
+
+def first_alert(segments, scheduler, seed):
+    h = replay.ReplayHarness("scheduler")
+    h.analyzer(tracker=replay.SyntheticTracker(), scheduler=scheduler)
+    ts, ears = replay.build_series(segments, fps=FPS, seed=seed)
+    frame = np.empty(1)
+    for t, ear in zip(ts.tolist(), ears.tolist()):
+        frame[0] = ear
+        h.step(t, frame)
+    episodes = h.finish()["episodes"]
+    return episodes[0][0] if episodes else None
+
+
+@pytest.mark.parametrize("open_ear", [0.30, 0.36])
+@pytest.mark.parametrize("closure", [[], DROOP], ids=["step", "droop"])
+def test_extra_delay_within_bound(open_ear, closure):
+    bound = make_scheduler().latency_bound(1.0 / FPS)
+    worst = 0.0
+    for phase in range(3):                       # every stride phase at max_stride 3
+        for seed in range(3):
+            segments = [(10 + phase / FPS, open_ear)] + closure + [(3, 0.12), (3, 0.30)]
+            full = first_alert(segments, None, seed)
+            adaptive = first_alert(segments, make_scheduler(), seed)
+            assert full is not None and adaptive is not None
+            worst = max(worst, adaptive - full)
+    assert worst <= bound + 1e-9, f"extra delay {worst:.3f}s > bound {bound:.3f}s"
+
+
+def test_raw_ear_below_open_forces_full_rate():
+    from cv_module.drowsiness_detector import DrowsinessFSM
+    s = make_scheduler()
+    fsm = DrowsinessFSM(on_event=None)
+    s.observe(0.36, fsm, True, raw_ear=0.36)
+    assert s.stride == s.max_stride
+    s.observe(0.31, fsm, True, raw_ear=0.12)     # smoothed still high, raw already closed
+    assert s.stride == 1
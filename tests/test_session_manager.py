@@ -0,0 +1,106 @@
+# tests/test_session_manager.py
+"""Multi-stream sessions: per-stream FSMs on the shared pool, clean shutdown."""
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from cv_module import session_manager as sm
+from cv_module.replay import synthetic_face
+from log_module import event_sink
+
+EARS = {"closed": 0.10, "open": 0.32}
+FRAMES = 150
+
+
+class _FakeCapture:
+    """``cv2.VideoCapture`` stand-in: FRAMES frames at ~100 fps whose pixel value encodes the EAR."""
+
+    def __init__(self, src):
+        self.value = int(EARS[src] * 100)
+        self.left = FRAMES
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return 0.0
+
+    def read(self):
+        if self.left == 0:
+            return False, None
+        self.left -= 1
+        time.sleep(0.01)
+        return True, np.full((48, 64, 3), self.value, dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+class _StubMesh:
+    """FaceMesh stand-in: a face whose eyes have the EAR encoded in the frame."""
+
+    def process(self, rgb):
+        h, w = rgb.shape[:2]
+        pts = synthetic_face(rgb[0, 0, 0] / 100.0)
+        lms = [SimpleNamespace(x=x / w, y=y / h, z=0.0) for x, y, _ in pts]
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=lms)])
+
+
+class _ListSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event_type, **fields):
+        self.events.append((event_type, fields.get("stream")))
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    meshes = []
+    captures = []
+
+    def capture(src):
+        captures.append(_FakeCapture(src))
+        return captures[-1]
+
+    def mesh():
+        meshes.append(_StubMesh())
+        return meshes[-1]
+
+    sink = _ListSink()
+    monkeypatch.setattr(sm.cv2, "VideoCapture", capture)
+    monkeypatch.setattr(sm, "create_face_mesh", mesh)
+    monkeypatch.setattr(event_sink, "_sink", sink)
+    return SimpleNamespace(meshes=meshes, captures=captures, sink=sink)
+
+
+def test_streams_have_isolated_fsms_and_stop_cleanly(fakes):
+    before = set(threading.enumerate())
+    mgr = sm.SessionManager(["closed", "open"], workers=2, beep=False).start()
+    try:
+        deadline = time.monotonic() + 10.0
+        while mgr.active and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not mgr.active
+    finally:
+        mgr.stop()
+
+    closed, opened = mgr.sessions["cam0"], mgr.sessions["cam1"]
+    assert closed.fsm is not opened.fsm and closed.face_mesh is not opened.face_mesh
+    assert len(fakes.meshes) == 2
+    assert closed.fsm.state == "DROWSY"
+    assert opened.fsm.state == "AWAKE"
+    assert [stream for _, stream in fakes.sink.events] == ["cam0"]
+    assert [e for _, e, _ in closed.events] == ["Drowsiness detected"] and not opened.events
+    for s in (closed, opened):
+        st = s.stats()
+        assert st["captured"] == FRAMES and 0 < st["processed"] <= FRAMES
+
+    # Clean shutdown: captures released, no manager threads left behind
+    assert all(c.released for c in fakes.captures)
+    left = [t for t in set(threading.enumerate()) - before if t.is_alive()]
+    assert not left, left
@@ -0,0 +1,65 @@
+# tests/test_stress_analysis.py
+"""Voice stress features, the lock-free sample ring, and offline WAV scoring."""
+import wave
+
+import numpy as np
+import pytest
+
+from audio_module import stress_analysis as sa
+
+
+def _tone(freq, secs, sr=sa.SAMPLE_RATE, amp=0.3):
+    t = np.arange(int(sr * secs)) / sr
+    return (amp * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _write_wav(path, x, sr=sa.SAMPLE_RATE):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes((np.clip(x, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def test_frame_features_on_a_tone():
+    feats = sa.frame_features(_tone(200.0, 1.0), sa.SAMPLE_RATE)
+    assert np.allclose(feats["pitch"], 200.0, rtol=0.02)
+    assert np.allclose(feats["rms"], 0.3 / np.sqrt(2), rtol=0.05)
+    assert np.allclose(feats["centroid"], 200.0, rtol=0.15)
+    # Two zero crossings per period
+    assert np.allclose(feats["zcr"], 2 * 200.0 / sa.SAMPLE_RATE, rtol=0.15)
+
+
+def test_silence_is_unvoiced():
+    feats = sa.frame_features(np.zeros(sa.SAMPLE_RATE // 2, np.float32), sa.SAMPLE_RATE)
+    assert not feats["pitch"].any()
+    assert sa.window_summary(feats)["voiced"] == 0.0
+
+
+def test_ring_buffer_wraparound():
+    ring = sa.RingBuffer(8)
+    ring.write(np.arange(5))
+    assert ring.latest(10).tolist() == [0, 1, 2, 3, 4]
+    ring.write(np.arange(5, 11))                 # wraps: oldest 3 samples overwritten
+    assert ring.written == 11
+    assert ring.latest(8).tolist() == list(range(3, 11))
+    assert ring.latest(4).tolist() == [7, 8, 9, 10]
+    ring.write(np.arange(100, 120))              # longer than the ring: keep the newest
+    assert ring.latest(8).tolist() == list(range(112, 120))
+
+
+def test_analyze_file_scores_every_window(tmp_path):
+    sr = sa.SAMPLE_RATE
+    # Calm speech-like tone, then louder and higher-pitched
+    x = np.concatenate([_tone(140.0, 4.0, amp=0.1), _tone(280.0, 2.0, amp=0.5)])
+    path = tmp_path / "voice.wav"
+    _write_wav(path, x)
+    out = sa.analyze_file(str(path))
+    hop, need = int(sr / sa.RATE_HZ), int(sr * sa.WINDOW_SECS)
+    assert len(out) == (len(x) - need) // hop + 1
+    assert out[0]["t"] == pytest.approx(sa.WINDOW_SECS)
+    calm, stressed = out[len(out) // 3], out[-1]
+    assert calm["pitch"] == pytest.approx(140.0, rel=0.03)
+    assert stressed["pitch"] == pytest.approx(280.0, rel=0.03)
+    assert stressed["score"] > calm["score"]
+    assert sa.analyze_file(str(path)) == out         # deterministic